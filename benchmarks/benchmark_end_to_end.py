@@ -0,0 +1,227 @@
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+import just_bin_it.command_actioner as command_actioner
+import just_bin_it.histograms.histogram_process as histogram_process
+from benchmarks.benchmark_pipeline import HISTOGRAM_CONFIGS, generate_events
+from just_bin_it.endpoints.serialisation import deserialise_hs00, serialise_ev42
+from just_bin_it.histograms.worker_pool import WorkerPool
+from tests.doubles.fake_broker import (
+    FakeConsumer,
+    FakeProducer,
+    fake_kafka_settings_valid,
+    start_fake_broker,
+)
+
+BROKERS = ["fake:9092"]
+CONFIG_TOPIC = "config"
+DATA_TOPIC = "events"
+OUTPUT_TOPIC = "output"
+
+
+def load_main_module():
+    """
+    Load bin/just-bin-it.py, which cannot be imported normally because of its name.
+    """
+    path = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.realpath(__file__))),
+        "bin",
+        "just-bin-it.py",
+    )
+    spec = importlib.util.spec_from_file_location("just_bin_it_main", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def use_fake_kafka(main_module):
+    """
+    Replace the Kafka clients with ones using the fake broker.
+
+    The histogram processes are forked, so they inherit the replacements.
+    """
+    for module in [main_module, histogram_process]:
+        module.Consumer = FakeConsumer
+        module.Producer = FakeProducer
+    main_module.are_kafka_settings_valid = fake_kafka_settings_valid
+    command_actioner.are_kafka_settings_valid = fake_kafka_settings_valid
+
+
+def latest_histogram_sum(consumer):
+    total = None
+    for records in consumer.get_new_messages().values():
+        for record in records:
+            total = deserialise_hs00(record.value)["data"].sum()
+    return total
+
+
+def wait_for_sum(consumer, expected, timeout):
+    """
+    Wait until the published histogram contains the expected number of counts.
+
+    :return: The time it was reached or None if timed out.
+    """
+    give_up = time.monotonic() + timeout
+    while time.monotonic() < give_up:
+        total = latest_histogram_sum(consumer)
+        if total is not None and total >= expected:
+            return time.monotonic()
+        time.sleep(0.01)
+    return None
+
+
+def run(
+    hist_name,
+    num_messages,
+    events_per_message,
+    num_partitions,
+    timeout,
+    worker_pool_size=0,
+):
+    """
+    Run the whole of just-bin-it against the fake broker and time how long it
+    takes for the published histogram to contain all the events sent.
+
+    :param hist_name: The histogram type to benchmark, see HISTOGRAM_CONFIGS.
+    :param num_messages: The number of event messages to send.
+    :param events_per_message: The number of events in each message.
+    :param num_partitions: The number of partitions for the data topic.
+    :param timeout: How long to wait for all the events in seconds.
+    :param worker_pool_size: The number of pooled workers, 0 for no pool.
+    :return: The events per second or None if timed out.
+    """
+    manager, broker = start_fake_broker(BROKERS[0])
+    broker.create_topic(CONFIG_TOPIC)
+    broker.create_topic(DATA_TOPIC, num_partitions)
+    broker.create_topic(OUTPUT_TOPIC)
+
+    main_module = load_main_module()
+    use_fake_kafka(main_module)
+    worker_pool = WorkerPool(worker_pool_size) if worker_pool_size else None
+    main = main_module.Main(BROKERS, CONFIG_TOPIC, False, worker_pool=worker_pool)
+    threading.Thread(target=main.run, daemon=True).start()
+
+    # Serialise up front so only just-bin-it is timed.
+    buffers = []
+    for i in range(min(num_messages, 100)):
+        tofs, dets = generate_events(events_per_message, seed=i)
+        buffers.append(serialise_ev42("source", i, i * 1000, tofs, dets))
+
+    histogram = dict(HISTOGRAM_CONFIGS[hist_name], topic=OUTPUT_TOPIC)
+    config = {
+        "cmd": "config",
+        "data_brokers": BROKERS,
+        "data_topics": [DATA_TOPIC],
+        "histograms": [histogram],
+    }
+    # Only the events within the histogram's range are counted.
+    hist = histogram_process.HistogramFactory.generate([histogram])[0]
+    for i in range(num_messages):
+        tofs, dets = generate_events(events_per_message, seed=i % len(buffers))
+        hist.add_data(0, tofs, dets)
+    expected = hist.data.sum()
+
+    output = FakeConsumer(BROKERS, [OUTPUT_TOPIC])
+    config_time = time.monotonic()
+    broker.produce(CONFIG_TOPIC, json.dumps(config).encode())
+
+    # Only send the data once the histogram process is publishing, otherwise
+    # it would start consuming after some of the data.
+    events_per_second = None
+    try:
+        first_publish_time = wait_for_sum(output, 0, timeout)
+        if first_publish_time is None:
+            print("Histogram process did not start")
+            return None
+        print(f"Config to first publish: {first_publish_time - config_time:.3f} s")
+
+        start_time = time.monotonic()
+        for i in range(num_messages):
+            broker.produce(DATA_TOPIC, buffers[i % len(buffers)])
+        print(f"Sent {num_messages} messages in {time.monotonic() - start_time:.2f} s")
+
+        end_time = wait_for_sum(output, expected, timeout)
+        if end_time is None:
+            print("Timed out waiting for all the events to be histogrammed")
+        else:
+            events_per_second = (
+                num_messages * events_per_message / (end_time - start_time)
+            )
+    finally:
+        broker.produce(CONFIG_TOPIC, json.dumps({"cmd": "stop"}).encode())
+        # Give the main loop time to stop the processes.
+        time.sleep(1)
+        main.stop()
+        if worker_pool:
+            worker_pool.shutdown()
+        manager.shutdown()
+
+    return events_per_second
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "-ht",
+        "--hist-type",
+        type=str,
+        default="hist1d",
+        choices=list(HISTOGRAM_CONFIGS),
+        help="the histogram type to benchmark",
+    )
+
+    parser.add_argument(
+        "-n",
+        "--num_messages",
+        type=int,
+        default=1000,
+        help="the number of messages to send",
+    )
+
+    parser.add_argument(
+        "-ne",
+        "--num_events",
+        type=int,
+        default=10_000,
+        help="the number of events per message",
+    )
+
+    parser.add_argument(
+        "-p", "--partitions", type=int, default=1, help="the number of partitions"
+    )
+
+    parser.add_argument(
+        "-w",
+        "--worker-pool",
+        type=int,
+        default=0,
+        help="the number of pooled histogramming processes (0 = no pool)",
+    )
+
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=300,
+        help="how long to wait for the events to be histogrammed in seconds",
+    )
+
+    args = parser.parse_args()
+
+    rate = run(
+        args.hist_type,
+        args.num_messages,
+        args.num_events,
+        args.partitions,
+        args.timeout,
+        args.worker_pool,
+    )
+    if rate is None:
+        sys.exit(1)
+    print(f"{args.hist_type}: {rate:,.0f} events/s end-to-end")
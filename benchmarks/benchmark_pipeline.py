@@ -0,0 +1,309 @@
+import argparse
+import json
+import os
+import platform
+import queue
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from just_bin_it.endpoints.histogram_sink import HistogramSink
+from just_bin_it.endpoints.serialisation import (
+    deserialise_ev42,
+    serialise_ev42,
+    serialise_hs00,
+)
+from just_bin_it.endpoints.sources import EventSource
+from just_bin_it.histograms.histogram_factory import HistogramFactory
+from just_bin_it.histograms.histogram_process import Processor
+from just_bin_it.histograms.histogrammer import Histogrammer
+from tests.doubles.consumer import StubConsumer
+from tests.doubles.producers import SpyProducer
+
+TOF_RANGE = (0, 100_000_000)
+DET_RANGE = (1, 10_000)
+WIDTH = 100
+HEIGHT = 100
+
+HISTOGRAM_CONFIGS = {
+    "hist1d": {"type": "hist1d", "tof_range": TOF_RANGE, "num_bins": 1000},
+    "hist1d_det_range": {
+        "type": "hist1d",
+        "tof_range": TOF_RANGE,
+        "det_range": DET_RANGE,
+        "num_bins": 1000,
+    },
+    "hist2d": {
+        "type": "hist2d",
+        "tof_range": TOF_RANGE,
+        "det_range": DET_RANGE,
+        "num_bins": 500,
+    },
+    "dethist": {
+        "type": "dethist",
+        "tof_range": TOF_RANGE,
+        "det_range": DET_RANGE,
+        "width": WIDTH,
+        "height": HEIGHT,
+    },
+}
+
+
+def generate_events(num_events, seed=0):
+    rng = np.random.default_rng(seed)
+    tofs = rng.uniform(TOF_RANGE[0], TOF_RANGE[1], num_events).astype(np.uint32)
+    dets = rng.integers(DET_RANGE[0], DET_RANGE[1] + 1, num_events).astype(np.uint32)
+    return tofs, dets
+
+
+def create_histogram(name, topic="output"):
+    config = dict(HISTOGRAM_CONFIGS[name])
+    config["topic"] = topic
+    return HistogramFactory.generate([config])[0]
+
+
+def measure(func, events_per_call, repeats, warmup=3, memory=True):
+    """
+    Time a function and report its throughput, latency and peak memory.
+
+    The memory is measured in a separate run because tracing allocations
+    distorts the timings.
+
+    :param func: The function to benchmark, takes no arguments.
+    :param events_per_call: The number of events processed by each call.
+    :param repeats: How many times to call the function.
+    :param warmup: How many untimed calls to make first.
+    :param memory: Whether to measure the peak memory.
+    :return: Dictionary of results.
+    """
+    for _ in range(warmup):
+        func()
+
+    durations = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        func()
+        durations[i] = time.perf_counter() - start
+
+    result = {
+        "events_per_call": events_per_call,
+        "repeats": repeats,
+        "events_per_second": events_per_call * repeats / durations.sum(),
+        "latency_ms": {
+            "mean": durations.mean() * 1000,
+            "p50": np.percentile(durations, 50) * 1000,
+            "p90": np.percentile(durations, 90) * 1000,
+            "p99": np.percentile(durations, 99) * 1000,
+            "max": durations.max() * 1000,
+        },
+    }
+
+    if memory:
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_memory_mb"] = peak / 1_000_000
+
+    return result
+
+
+def bench_deserialise_ev42(num_events, repeats):
+    tofs, dets = generate_events(num_events)
+    buf = serialise_ev42("source", 1, 0, tofs, dets)
+    return measure(lambda: deserialise_ev42(buf), num_events, repeats)
+
+
+def bench_histogram_add_data(hist_name, num_events, repeats):
+    hist = create_histogram(hist_name)
+    tofs, dets = generate_events(num_events)
+    return measure(lambda: hist.add_data(0, tofs, dets), num_events, repeats)
+
+
+def _create_event_buffer(num_messages, events_per_message):
+    event_buffer = []
+    for i in range(num_messages):
+        tofs, dets = generate_events(events_per_message, seed=i)
+        data = deserialise_ev42(serialise_ev42("source", i, i * 1000, tofs, dets))
+        event_buffer.append((i, i, data))
+    return event_buffer
+
+
+def bench_histogrammer_add_data(num_histograms, num_events, repeats):
+    names = list(HISTOGRAM_CONFIGS)
+    histograms = [
+        create_histogram(names[i % len(names)], f"topic{i}")
+        for i in range(num_histograms)
+    ]
+    histogrammer = Histogrammer(HistogramSink(SpyProducer()), histograms)
+    # Split the events across several messages like a real poll would.
+    num_messages = 10
+    event_buffer = _create_event_buffer(num_messages, num_events // num_messages)
+    return measure(
+        lambda: histogrammer.add_data(event_buffer),
+        num_events * num_histograms,
+        repeats,
+    )
+
+
+def bench_serialise_hs00(hist_name, repeats):
+    hist = create_histogram(hist_name)
+    tofs, dets = generate_events(100_000)
+    hist.add_data(0, tofs, dets)
+    return measure(lambda: serialise_hs00(hist, 0, "{}"), hist.data.size, repeats)
+
+
+def bench_processor(hist_name, num_messages, events_per_message, repeats):
+    buffers = []
+    for i in range(num_messages):
+        tofs, dets = generate_events(events_per_message, seed=i)
+        buffers.append((i, i, serialise_ev42("source", i, i * 1000, tofs, dets)))
+
+    producer = SpyProducer()
+    consumer = StubConsumer(["broker"], ["topic"])
+    event_source = EventSource(consumer, None)
+    histogrammer = Histogrammer(HistogramSink(producer), [create_histogram(hist_name)])
+    # Publish every call so the serialisation and publishing costs are included.
+    processor = Processor(
+        histogrammer, event_source, queue.Queue(), queue.Queue(), publish_interval=1
+    )
+
+    def run():
+        consumer.add_messages(buffers)
+        processor.time_to_publish = 0
+        processor.run_processing()
+        producer.messages.clear()
+        while not processor.stats_queue.empty():
+            processor.stats_queue.get()
+
+    return measure(run, num_messages * events_per_message, repeats)
+
+
+def run_benchmarks(quick=False):
+    """
+    Run all the benchmarks.
+
+    :param quick: Use fewer events and repeats, for checking the benchmarks work.
+    :return: Dictionary of results keyed on benchmark name.
+    """
+    event_counts = [1_000, 10_000] if quick else [1_000, 10_000, 100_000, 1_000_000]
+    repeats = 5 if quick else 50
+    results = {}
+
+    for num_events in event_counts:
+        results[f"deserialise_ev42[{num_events}]"] = bench_deserialise_ev42(
+            num_events, repeats
+        )
+
+    for hist_name in HISTOGRAM_CONFIGS:
+        for num_events in event_counts:
+            results[f"add_data[{hist_name},{num_events}]"] = bench_histogram_add_data(
+                hist_name, num_events, repeats
+            )
+
+    for num_histograms in [1, 4]:
+        name = f"histogrammer_add_data[{num_histograms},{event_counts[-1]}]"
+        results[name] = bench_histogrammer_add_data(
+            num_histograms, event_counts[-1], repeats
+        )
+
+    for hist_name in HISTOGRAM_CONFIGS:
+        results[f"serialise_hs00[{hist_name}]"] = bench_serialise_hs00(
+            hist_name, repeats
+        )
+
+    for hist_name in HISTOGRAM_CONFIGS:
+        results[f"run_processing[{hist_name}]"] = bench_processor(
+            hist_name, 10, event_counts[-1] // 10, repeats
+        )
+
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Find the benchmarks that are slower than the baseline.
+
+    :param results: The new results.
+    :param baseline: The baseline results.
+    :param tolerance: The allowed fractional drop in throughput.
+    :return: List of (name, baseline rate, new rate).
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old_rate = baseline[name]["events_per_second"]
+        new_rate = result["events_per_second"]
+        if new_rate < old_rate * (1 - tolerance):
+            regressions.append((name, old_rate, new_rate))
+    return regressions
+
+
+def print_results(results):
+    print(
+        f"{'benchmark':<45} {'events/s':>14} {'p50 ms':>10} {'p99 ms':>10} {'peak MB':>9}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<45} {result['events_per_second']:>14,.0f} "
+            f"{result['latency_ms']['p50']:>10.3f} {result['latency_ms']['p99']:>10.3f} "
+            f"{result.get('peak_memory_mb', 0):>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "-s", "--save", type=str, help="save the results as a JSON baseline file"
+    )
+
+    parser.add_argument(
+        "-c", "--compare", type=str, help="compare the results with a baseline file"
+    )
+
+    parser.add_argument(
+        "-t",
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="allowed fractional drop in events/second before it is a regression",
+    )
+
+    parser.add_argument(
+        "-q",
+        "--quick",
+        action="store_true",
+        help="use fewer events and repeats",
+    )
+
+    args = parser.parse_args()
+
+    bench_results = run_benchmarks(args.quick)
+    print_results(bench_results)
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "numpy": np.__version__,
+                    "machine": platform.machine(),
+                    "results": bench_results,
+                },
+                file,
+                indent=2,
+            )
+
+    if args.compare:
+        with open(args.compare, "r") as file:
+            baseline_results = json.load(file)["results"]
+        slower = compare_with_baseline(bench_results, baseline_results, args.tolerance)
+        for bench_name, old, new in slower:
+            print(f"REGRESSION {bench_name}: {old:,.0f} -> {new:,.0f} events/s")
+        if slower:
+            sys.exit(1)
@@ -0,0 +1,120 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from just_bin_it.endpoints.event_file import EventFileWriter
+from just_bin_it.endpoints.kafka_consumer import Consumer
+
+
+def main(brokers, topic, filename, start=None, duration=0, append=False):
+    """
+    Record the raw messages from a topic to a capture file.
+
+    :param brokers: The brokers to connect to.
+    :param topic: The topic to record.
+    :param filename: The capture file to write.
+    :param start: Record from this time (ms since epoch) rather than from now.
+    :param duration: How long to record for in seconds (0 = until interrupted).
+    :param append: Whether to add to an existing capture file.
+    """
+    consumer = Consumer(brokers, [topic])
+
+    if start:
+        offsets = consumer.offset_for_time(start)
+        highest = [high for _, high in consumer.get_offset_range()]
+        consumer.seek_by_offsets(
+            [
+                high if offset is None else offset
+                for offset, high in zip(offsets, highest)
+            ]
+        )
+
+    num_messages = 0
+    num_bytes = 0
+    start_time = time.monotonic()
+    next_report = start_time + 1
+
+    with EventFileWriter(filename, append=append) as writer:
+        try:
+            while duration == 0 or time.monotonic() - start_time < duration:
+                for _, records in consumer.get_new_messages().items():
+                    for record in records:
+                        writer.write_message(
+                            record.timestamp,
+                            record.offset,
+                            record.partition,
+                            record.value,
+                        )
+                        num_bytes += len(record.value)
+                    num_messages += len(records)
+
+                now = time.monotonic()
+                if now >= next_report:
+                    elapsed = now - start_time
+                    print(
+                        f"{num_messages} messages, {num_bytes / 1_000_000:.1f} MB "
+                        f"({num_messages / elapsed:.0f} msgs/s, "
+                        f"{num_bytes / elapsed / 1_000_000:.1f} MB/s)"
+                    )
+                    next_report = now + 1
+        except KeyboardInterrupt:
+            pass
+
+    print(f"Recorded {num_messages} messages to {filename}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+
+    required_args = parser.add_argument_group("required arguments")
+    required_args.add_argument(
+        "-b",
+        "--brokers",
+        type=str,
+        nargs="+",
+        help="the broker addresses",
+        required=True,
+    )
+
+    required_args.add_argument(
+        "-t", "--topic", type=str, help="the topic to record", required=True
+    )
+
+    required_args.add_argument(
+        "-f", "--event-file", type=str, help="the file to write to", required=True
+    )
+
+    parser.add_argument(
+        "-s",
+        "--start",
+        type=int,
+        help="record from this time (ms since epoch) rather than from now",
+    )
+
+    parser.add_argument(
+        "-d",
+        "--duration",
+        type=float,
+        default=0,
+        help="how long to record for in seconds (0 = until interrupted)",
+    )
+
+    parser.add_argument(
+        "-a",
+        "--append",
+        action="store_true",
+        help="add to an existing capture file",
+    )
+
+    args = parser.parse_args()
+
+    main(
+        args.brokers,
+        args.topic,
+        args.event_file,
+        args.start,
+        args.duration,
+        args.append,
+    )
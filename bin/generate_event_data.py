@@ -1,13 +1,20 @@
 import argparse
+import multiprocessing as mp
 import os
 import sys
 import time
 
+import numpy as np
+from kafka import KafkaProducer
+
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
-from just_bin_it.endpoints.kafka_producer import Producer
 from just_bin_it.endpoints.serialisation import serialise_ev42
 from just_bin_it.utilities import time_in_ns
-from just_bin_it.utilities.fake_data_generation import generate_fake_data
+from just_bin_it.utilities.fake_data_generation import (
+    DISTRIBUTIONS,
+    generate_fake_data,
+    generate_fake_detector_data,
+)
 
 TOF_RANGE = (0, 100_000_000)
 DET_RANGE = (1, 10000)
@@ -15,55 +22,213 @@ DET_WIDTH = 100
 DET_HEIGHT = 100
 
 
-def generate_data(source, message_id, num_points):
-    tofs, dets = generate_fake_data(TOF_RANGE, DET_RANGE, num_points)
+def create_message_pool(sources, pool_size, num_events, det_hist=False):
+    """
+    Create the event data to send.
 
-    time_stamp = time_in_ns()
+    Generating the random events is much slower than serialising them, so it is
+    done once up front and the events are then sent repeatedly. They are
+    converted to the types used in ev42 messages so serialising is quick.
 
-    data = serialise_ev42(source, message_id, time_stamp, tofs, dets)
-    return time_stamp, data
+    :param sources: The source names to use, spread evenly over the pool.
+    :param pool_size: The number of messages to create.
+    :param num_events: The number of events in each message.
+    :param det_hist: Whether the data is for a detector histogram.
+    :return: List of (source name, time-of-flights, detector IDs).
+    """
+    pool = []
+    for i in range(pool_size):
+        if det_hist:
+            tofs, _ = generate_fake_data(TOF_RANGE, DET_RANGE, num_events)
+            dets = generate_fake_detector_data(
+                DET_WIDTH, DET_HEIGHT, num_events, DISTRIBUTIONS["GAUSSIAN"]
+            )
+        else:
+            tofs, dets = generate_fake_data(TOF_RANGE, DET_RANGE, num_events)
+        pool.append(
+            (
+                sources[i % len(sources)],
+                tofs.astype(np.uint32),
+                dets.astype(np.uint32),
+            )
+        )
+    return pool
 
 
-def generate_dethist_data(source, message_id, num_points):
-    dets = []
+def produce(
+    brokers,
+    topic,
+    message_rate,
+    num_messages,
+    num_events,
+    sources,
+    pool_size,
+    det_hist,
+    process_index,
+    num_processes,
+    counters,
+    stop_event,
+):
+    """
+    The target for each producer process.
 
-    for h in range(DET_HEIGHT):
-        _, new_dets = generate_fake_data(TOF_RANGE, (0, DET_WIDTH), num_points)
-        for det in new_dets:
-            dets.append(h * DET_WIDTH + det)
+    :param brokers: The brokers to connect to.
+    :param topic: The topic to write to.
+    :param message_rate: The messages per second to send (0 = as fast as possible).
+    :param num_messages: The number of messages to send (0 = until stopped).
+    :param num_events: The number of events per message.
+    :param sources: The source names to use.
+    :param pool_size: The number of pre-serialised messages.
+    :param det_hist: Whether the data is for a detector histogram.
+    :param process_index: Which process this is, so the partitions used and
+        message IDs are spread out.
+    :param num_processes: The total number of producer processes.
+    :param counters: Shared values for the messages and bytes sent.
+    :param stop_event: Set to stop producing.
+    """
+    pool = create_message_pool(sources, pool_size, num_events, det_hist)
+    # Batch messages rather than flushing each one.
+    producer = KafkaProducer(
+        bootstrap_servers=brokers,
+        max_request_size=100_000_000,
+        linger_ms=5,
+        batch_size=1_000_000,
+    )
+    partitions = sorted(producer.partitions_for(topic) or [0])
 
-    time_stamp = time_in_ns()
+    sent = 0
+    sent_bytes = 0
+    start_time = time.monotonic()
+    try:
+        while not stop_event.is_set() and (num_messages == 0 or sent < num_messages):
+            if message_rate:
+                # Wait until this message is due.
+                due = start_time + sent / message_rate
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
 
-    data = serialise_ev42(source, message_id, time_stamp, [], dets)
-    return time_stamp, data
+            # Every message gets a unique ID and the current time as its pulse time.
+            source, tofs, dets = pool[sent % len(pool)]
+            message_id = sent * num_processes + process_index + 1
+            message = serialise_ev42(source, message_id, time_in_ns(), tofs, dets)
+            partition = partitions[(process_index + sent) % len(partitions)]
+            producer.send(topic, message, partition=partition)
+            sent += 1
+            sent_bytes += len(message)
 
+            if sent % 100 == 0:
+                with counters.get_lock():
+                    counters[0] += 100
+                    counters[1] += sent_bytes
+                sent_bytes = 0
+    except KeyboardInterrupt:
+        # Ctrl-C goes to all the processes; still send what has been queued.
+        pass
 
-def main(brokers, topic, num_msgs, num_points, det_hist=False):
-    producer = Producer(brokers)
-    count = 0
-    message_id = 1
-    start_time = None
-    end_time = None
+    producer.flush()
+    with counters.get_lock():
+        counters[0] += sent % 100
+        counters[1] += sent_bytes
 
-    while num_msgs == 0 or count < num_msgs:
-        if det_hist:
-            timestamp, data = generate_dethist_data(
-                "just-bin-it", message_id, num_points
+
+def main(
+    brokers,
+    topic,
+    num_msgs,
+    num_points,
+    det_hist=False,
+    event_rate=0,
+    num_processes=1,
+    num_sources=1,
+    pool_size=100,
+):
+    """
+    Send fake event data to Kafka and report the rate achieved.
+
+    :param brokers: The brokers to connect to.
+    :param topic: The topic to write to.
+    :param num_msgs: The total number of messages to send (0 = until interrupted).
+    :param num_points: The number of events per message.
+    :param det_hist: Whether the data is for a detector histogram.
+    :param event_rate: The target total events per second (0 = as fast as possible).
+    :param num_processes: The number of producer processes.
+    :param num_sources: The number of different source names to use.
+    :param pool_size: The number of pre-generated messages per process.
+    """
+    sources = (
+        ["just-bin-it"]
+        if num_sources == 1
+        else [f"just-bin-it-{i}" for i in range(num_sources)]
+    )
+    if num_msgs:
+        # Otherwise some processes would have no messages, which means run forever.
+        num_processes = min(num_processes, num_msgs)
+
+    message_rate = event_rate / num_points / num_processes if event_rate else 0
+    # Messages sent and bytes sent.
+    counters = mp.Array("q", 2)
+    stop_event = mp.Event()
+
+    processes = []
+    for i in range(num_processes):
+        # Share out the messages, any remainder goes to the first process.
+        process_msgs = num_msgs // num_processes
+        if num_msgs and i == 0:
+            process_msgs += num_msgs % num_processes
+        processes.append(
+            mp.Process(
+                target=produce,
+                args=(
+                    brokers,
+                    topic,
+                    message_rate,
+                    process_msgs,
+                    num_points,
+                    sources,
+                    pool_size,
+                    det_hist,
+                    i,
+                    num_processes,
+                    counters,
+                    stop_event,
+                ),
             )
-        else:
-            timestamp, data = generate_data("just-bin-it", message_id, num_points)
-        producer.publish_message(topic, data)
-        message_id += 1
-        count += 1
+        )
 
-        if not start_time:
-            start_time = timestamp
-        end_time = timestamp
+    for process in processes:
+        process.start()
 
-        time.sleep(1)
+    start_time = time.monotonic()
+    last_time = start_time
+    last_msgs = 0
+    last_bytes = 0
+    try:
+        while any(process.is_alive() for process in processes):
+            time.sleep(1)
+            now = time.monotonic()
+            with counters.get_lock():
+                msgs, num_bytes = counters[0], counters[1]
+            elapsed = now - last_time
+            print(
+                f"{(msgs - last_msgs) / elapsed:.0f} msgs/s, "
+                f"{(msgs - last_msgs) * num_points / elapsed:.0f} events/s, "
+                f"{(num_bytes - last_bytes) / elapsed / 1_000_000:.1f} MB/s"
+            )
+            last_time, last_msgs, last_bytes = now, msgs, num_bytes
+    except KeyboardInterrupt:
+        stop_event.set()
+
+    for process in processes:
+        process.join()
 
-    print(f"Num messages = {num_msgs}, total events = {num_msgs * num_points}")
-    print(f"Start timestamp = {start_time}, end_timestamp = {end_time}")
+    elapsed = time.monotonic() - start_time
+    total_msgs = counters[0]
+    print(f"Num messages = {total_msgs}, total events = {total_msgs * num_points}")
+    print(
+        f"Average = {total_msgs / elapsed:.0f} msgs/s, "
+        f"{total_msgs * num_points / elapsed:.0f} events/s"
+    )
 
 
 if __name__ == "__main__":
@@ -99,10 +264,52 @@ if __name__ == "__main__":
         help="the number of events per message",
     )
 
+    parser.add_argument(
+        "-r",
+        "--event-rate",
+        type=int,
+        default=1000,
+        help="the target number of events per second (0 = as fast as possible)",
+    )
+
+    parser.add_argument(
+        "-p",
+        "--processes",
+        type=int,
+        default=1,
+        help="the number of producer processes",
+    )
+
+    parser.add_argument(
+        "-s",
+        "--sources",
+        type=int,
+        default=1,
+        help="the number of different source names to use",
+    )
+
+    parser.add_argument(
+        "-ps",
+        "--pool-size",
+        type=int,
+        default=100,
+        help="the number of pre-generated messages per process",
+    )
+
     parser.add_argument(
         "-dh", "--det-hist", action="store_true", help="output the data as a det hist"
     )
 
     args = parser.parse_args()
 
-    main(args.brokers, args.topic, args.num_messages, args.num_events, args.det_hist)
+    main(
+        args.brokers,
+        args.topic,
+        args.num_messages,
+        args.num_events,
+        args.det_hist,
+        args.event_rate,
+        args.processes,
+        args.sources,
+        args.pool_size,
+    )
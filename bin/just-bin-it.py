@@ -2,7 +2,9 @@ import argparse
 import json
 import logging
 import os
+import queue
 import sys
+import threading
 import time
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
@@ -12,8 +14,14 @@ from just_bin_it.endpoints.heartbeat_publisher import HeartbeatPublisher
 from just_bin_it.endpoints.kafka_consumer import Consumer
 from just_bin_it.endpoints.kafka_producer import Producer
 from just_bin_it.endpoints.kafka_tools import are_kafka_settings_valid
-from just_bin_it.endpoints.statistics_publisher import StatisticsPublisher
+from just_bin_it.endpoints.statistics_publisher import (
+    BatchedGraphiteSender,
+    GraphiteSender,
+    StatisticsPublisher,
+)
+from just_bin_it.histograms.worker_pool import WorkerPool
 from just_bin_it.utilities import time_in_ns
+from just_bin_it.utilities.periodic_thread import PeriodicThread
 
 
 def load_json_config_file(file):
@@ -42,6 +50,7 @@ class Main:
         initial_config=None,
         stats_publisher=None,
         response_topic=None,
+        worker_pool=None,
     ):
         """
         Constructor.
@@ -52,6 +61,8 @@ class Main:
         :param heartbeat_topic: The topic where to publish heartbeat messages.
         :param initial_config: A histogram configuration to start with.
         :param stats_publisher: Publisher for the histograms statistics.
+        :param response_topic: The topic to publish command responses to.
+        :param worker_pool: Optional WorkerPool to run the histogramming on.
         """
         self.config_topic = config_topic
         self.simulation = simulation
@@ -60,15 +71,28 @@ class Main:
         self.config_brokers = config_brokers
         self.stats_publisher = stats_publisher
         self.response_topic = response_topic
+        self.worker_pool = worker_pool
         self.config_listener = None
         self.heartbeat_publisher = None
         self.hist_processes = []
         self.producer = None
         self.command_actioner = None
+        # Commands waiting to be handled, as (time received, command).
+        self._commands = queue.Queue()
+        # Protects the histogram processes as commands and stats are handled on
+        # separate threads.
+        self._processes_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._threads = []
 
     def run(self):
         """
-        The main loop for listening to messages and handling them.
+        Listen for messages and handle them until stopped.
+
+        Listening for commands, handling them, publishing the heartbeat and
+        publishing statistics each run on their own thread, so that, for
+        example, slow Kafka calls while handling a command do not delay the
+        heartbeat.
         """
         if self.simulation:
             logging.warning("RUNNING IN SIMULATION MODE!")
@@ -77,31 +101,87 @@ class Main:
         self.create_config_listener()
         self.create_publishers()
 
+        if self.initial_config:
+            self._commands.put((time.monotonic(), self.initial_config))
+            self.initial_config = None
+
+        self._threads = [
+            # Polling Kafka only waits a few milliseconds, so it needs an
+            # interval of its own to avoid a busy loop.
+            PeriodicThread("config-listener", self.listen_for_commands, 0.1),
+            PeriodicThread("commands", self.handle_commands, 0.05),
+        ]
+        if self.heartbeat_publisher:
+            self._threads.append(
+                PeriodicThread("heartbeat", self.publish_heartbeat, 0.1)
+            )
+        if self.stats_publisher:
+            self._threads.append(PeriodicThread("stats", self.publish_stats, 0.1))
+            self._threads.append(
+                PeriodicThread(
+                    "control-stats",
+                    self.publish_control_stats,
+                    self.stats_publisher.stats_interval_ms / 1000,
+                )
+            )
+
+        for thread in self._threads:
+            thread.start()
+
+        self._stop_event.wait()
+
+        for thread in self._threads:
+            # Waits for any call in progress, e.g. a slow Kafka request.
+            thread.stop(timeout=10)
+
+        if self.stats_publisher:
+            # Sends anything left and stops the sender's own thread, if it has one.
+            self.stats_publisher.sender.close()
+
+    def stop(self):
+        """
+        Make run return; the histogram processes are left running.
+        """
+        self._stop_event.set()
+
+    def listen_for_commands(self):
+        if self.config_listener.check_for_messages():
+            msg = self.config_listener.consume_message()
+            logging.warning("New command received")
+            logging.warning("%s", msg)
+            self._commands.put((time.monotonic(), msg))
+
+    def handle_commands(self):
         while True:
-            # Handle configuration messages
-            if self.initial_config or self.config_listener.check_for_messages():
-                if self.initial_config:
-                    # If initial configuration supplied, use it only once.
-                    msg = self.initial_config
-                    self.initial_config = None
-                else:
-                    msg = self.config_listener.consume_message()
-
-                logging.warning("New command received")
-                logging.warning("%s", msg)
+            try:
+                received, msg = self._commands.get_nowait()
+            except queue.Empty:
+                return
+
+            with self._processes_lock:
                 self.command_actioner.handle_command_message(msg, self.hist_processes)
+            logging.info(
+                "Command handled %.3f s after it was received",
+                time.monotonic() - received,
+            )
 
-            # Publishing of statistics and heartbeat
-            curr_time_ms = time_in_ns() // 1_000_000
-            if self.stats_publisher:
-                self.stats_publisher.publish_histogram_stats(
-                    self.hist_processes, curr_time_ms
-                )
+    def publish_heartbeat(self):
+        self.heartbeat_publisher.publish(time_in_ns() // 1_000_000)
 
-            if self.heartbeat_publisher:
-                self.heartbeat_publisher.publish(curr_time_ms)
+    def publish_stats(self):
+        # Publishing can be slow (e.g. sending to Graphite), so don't hold up
+        # handling commands while doing it.
+        with self._processes_lock:
+            hist_processes = list(self.hist_processes)
+        self.stats_publisher.publish_histogram_stats(
+            hist_processes, time_in_ns() // 1_000_000
+        )
 
-            time.sleep(0.1)
+    def publish_control_stats(self):
+        control_stats = {thread.name: thread.get_stats() for thread in self._threads}
+        self.stats_publisher.publish_control_stats(
+            control_stats, time_in_ns() // 1_000_000
+        )
 
     def create_publishers(self):
         """
@@ -109,9 +189,16 @@ class Main:
         """
         self.producer = Producer(self.config_brokers)
 
-        self.command_actioner = CommandActioner(
-            ResponsePublisher(self.producer, self.response_topic), self.simulation
-        )
+        if self.worker_pool:
+            self.command_actioner = CommandActioner(
+                ResponsePublisher(self.producer, self.response_topic),
+                self.simulation,
+                self.worker_pool.create_process,
+            )
+        else:
+            self.command_actioner = CommandActioner(
+                ResponsePublisher(self.producer, self.response_topic), self.simulation
+            )
 
         if self.heartbeat_topic:
             self.heartbeat_publisher = HeartbeatPublisher(
@@ -184,6 +271,14 @@ if __name__ == "__main__":
         help="runs the program in simulation mode",
     )
 
+    parser.add_argument(
+        "-w",
+        "--worker-pool",
+        type=int,
+        default=0,
+        help="the number of histogramming processes to start in advance and reuse",
+    )
+
     parser.add_argument(
         "-l",
         "--log-level",
@@ -201,12 +296,22 @@ if __name__ == "__main__":
     stats_publisher = None
     if args.graphite_config_file:
         graphite_config = load_json_config_file(args.graphite_config_file)
-        stats_publisher = StatisticsPublisher(
-            graphite_config["address"],
-            graphite_config["port"],
-            graphite_config["prefix"],
-            graphite_config["metric"],
-        )
+        # Batching is the default; an interval of 0 sends each metric immediately.
+        batch_interval = graphite_config.get("batch_interval", 1)
+        if batch_interval > 0:
+            sender = BatchedGraphiteSender(
+                graphite_config["address"],
+                graphite_config["port"],
+                graphite_config["prefix"],
+                interval=batch_interval,
+            )
+        else:
+            sender = GraphiteSender(
+                graphite_config["address"],
+                graphite_config["port"],
+                graphite_config["prefix"],
+            )
+        stats_publisher = StatisticsPublisher(sender, graphite_config["metric"])
 
     if 1 <= args.log_level <= 5:
         logging.basicConfig(
@@ -215,6 +320,10 @@ if __name__ == "__main__":
     else:
         logging.basicConfig(format="%(asctime)s - %(message)s", level=logging.INFO)
 
+    # Started before connecting to Kafka so the workers don't inherit the
+    # connections.
+    worker_pool = WorkerPool(args.worker_pool) if args.worker_pool > 0 else None
+
     main = Main(
         args.brokers,
         args.config_topic,
@@ -223,5 +332,6 @@ if __name__ == "__main__":
         init_hist_json,
         stats_publisher,
         args.response_topic,
+        worker_pool,
     )
     main.run()
@@ -0,0 +1,127 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from just_bin_it.endpoints.event_file import LENGTH_PREFIX, EventFileReader
+from just_bin_it.endpoints.histogram_sink import HistogramSink
+from just_bin_it.endpoints.sources import FileEventSource, StopTimeStatus
+from just_bin_it.histograms.histogram_factory import HistogramFactory, parse_config
+from just_bin_it.histograms.histogrammer import Histogrammer
+from just_bin_it.utilities import time_in_ns
+
+
+class FileProducer:
+    """
+    Stands in for the Kafka producer and collects the published messages per topic.
+    """
+
+    def __init__(self):
+        self.messages = {}
+
+    def publish_message(self, topic, message):
+        self.messages.setdefault(topic, []).append(message)
+
+    def write(self, output_dir):
+        """
+        Write the messages as length-prefixed hs00 buffers, one file per topic.
+
+        :param output_dir: The directory to write to.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        for topic, messages in self.messages.items():
+            with open(os.path.join(output_dir, f"{topic}.hs00"), "wb") as file:
+                for msg in messages:
+                    file.write(LENGTH_PREFIX.pack(len(msg)))
+                    file.write(msg)
+
+
+def replay(event_file, configuration, realtime):
+    """
+    Histogram the contents of an event file.
+
+    :param event_file: The file to replay.
+    :param configuration: The histogramming configuration (same as the config command).
+    :param realtime: Whether to replay at the recorded speed.
+    :return: The producer containing the final histograms.
+    """
+    start, stop, hist_configs = parse_config(configuration)
+
+    producer = FileProducer()
+    histograms = HistogramFactory.generate(hist_configs)
+    histogrammer = Histogrammer(HistogramSink(producer), histograms, start, stop)
+
+    with EventFileReader(event_file) as reader:
+        event_source = FileEventSource(reader, start, stop, realtime=realtime)
+        if start:
+            event_source.seek_to_start_time()
+
+        num_messages = 0
+        start_time = time.monotonic()
+
+        while True:
+            event_buffer = event_source.get_new_data()
+            if event_buffer:
+                histogrammer.add_data(event_buffer)
+                num_messages += len(event_buffer)
+            if event_source.stop_time_exceeded() == StopTimeStatus.EXCEEDED:
+                break
+            if realtime and not event_buffer:
+                time.sleep(0.01)
+
+        elapsed = time.monotonic() - start_time
+
+    histogrammer.set_finished()
+    histogrammer.publish_histograms(time_in_ns())
+
+    print(f"Replayed {num_messages} messages in {elapsed:.3f} s")
+    for stats in histogrammer.get_histogram_stats():
+        print(f"Total counts = {stats['sum']}")
+
+    return producer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+
+    required_args = parser.add_argument_group("required arguments")
+    required_args.add_argument(
+        "-f",
+        "--event-file",
+        type=str,
+        help="the event file (capture format or length-prefixed ev42)",
+        required=True,
+    )
+
+    required_args.add_argument(
+        "-c",
+        "--config-file",
+        type=str,
+        help="the histogramming configuration file",
+        required=True,
+    )
+
+    required_args.add_argument(
+        "-o",
+        "--output-dir",
+        type=str,
+        help="the directory to write the final histograms to",
+        required=True,
+    )
+
+    parser.add_argument(
+        "-r",
+        "--realtime",
+        action="store_true",
+        help="replay at the recorded speed rather than as fast as possible",
+    )
+
+    args = parser.parse_args()
+
+    with open(args.config_file, "r") as file:
+        config = json.load(file)
+
+    hist_producer = replay(args.event_file, config, args.realtime)
+    hist_producer.write(args.output_dir)
@@ -6,11 +6,19 @@ from just_bin_it.exceptions import KafkaException
 from just_bin_it.histograms.histogram_factory import parse_config
 from just_bin_it.histograms.histogram_process import HistogramProcess
 
+# The settings that decide what data a process consumes. If these are unchanged
+# then the process can be reconfigured rather than restarted.
+STREAM_SETTINGS = ("data_brokers", "data_topics", "time_cut", "overload")
+
 
 def create_histogram_process(config, start, stop, simulation):
     return HistogramProcess(config, start, stop, simulation=simulation)
 
 
+def _get_id(configuration):
+    return configuration.get("id") if configuration else None
+
+
 class ResponsePublisher:
     def __init__(self, response_producer, response_topic):
         self.response_producer = response_producer
@@ -73,27 +81,145 @@ class CommandActioner:
             self._stop_processes(hist_processes)
         elif message["cmd"] == "config":
             logging.info("Config command received")
-            self._stop_processes(hist_processes)
-
             start, stop, hist_configs = parse_config(message)
+            hist_configs = self._reuse_processes(
+                start, stop, hist_configs, hist_processes
+            )
 
             try:
-                for config in hist_configs:
-                    # Check brokers and data topics exist (skip in simulation)
-                    if not self.simulation and not are_kafka_settings_valid(
-                        config["data_brokers"], config["data_topics"]
-                    ):
-                        raise KafkaException("Invalid Kafka settings")
-
-                    process = self.process_creator(config, start, stop, self.simulation)
-                    hist_processes.append(process)
+                hist_processes.extend(self._start_processes(start, stop, hist_configs))
             except Exception as error:
-                # If one fails then close any that were started then rethrow
+                # If one fails then close any that are running then rethrow
                 self._stop_processes(hist_processes)
                 raise error
+        elif message["cmd"] == "add_histograms":
+            logging.info("Add histograms command received")
+            start, stop, hist_configs = parse_config(message)
+            self._check_ids_can_be_added(hist_configs, hist_processes)
+            # The other histograms carry on undisturbed.
+            hist_processes.extend(self._start_processes(start, stop, hist_configs))
+        elif message["cmd"] == "remove_histograms":
+            logging.info("Remove histograms command received")
+            to_remove = self._find_processes_by_id(message["ids"], hist_processes)
+            hist_processes[:] = [p for p in hist_processes if p not in to_remove]
+            self._stop_processes(to_remove)
         else:
             raise Exception(f"Unknown command type '{message['cmd']}'")
 
+    def _start_processes(self, start, stop, hist_configs):
+        """
+        Start a process for each histogram configuration.
+
+        If one fails then any already started are stopped.
+
+        :param start: The start time.
+        :param stop: The stop time.
+        :param hist_configs: The histogram configurations.
+        :return: The new processes.
+        """
+        new_processes = []
+        try:
+            for config in hist_configs:
+                # Check brokers and data topics exist (skip in simulation)
+                if not self.simulation and not are_kafka_settings_valid(
+                    config["data_brokers"], config["data_topics"]
+                ):
+                    raise KafkaException("Invalid Kafka settings")
+
+                process = self.process_creator(config, start, stop, self.simulation)
+                new_processes.append(process)
+        except Exception as error:
+            self._stop_processes(new_processes)
+            raise error
+        return new_processes
+
+    @staticmethod
+    def _check_ids_can_be_added(hist_configs, hist_processes):
+        existing = {_get_id(p.configuration) for p in hist_processes}
+        new_ids = [config.get("id") for config in hist_configs]
+        if not all(new_ids):
+            raise Exception("Histograms to add must have an 'id'")
+        if len(set(new_ids)) != len(new_ids):
+            raise Exception("Histograms to add have duplicate ids")
+        clashes = existing.intersection(new_ids)
+        if clashes:
+            raise Exception(f"Histograms already exist with ids {sorted(clashes)}")
+
+    @staticmethod
+    def _find_processes_by_id(ids, hist_processes):
+        by_id = {_get_id(p.configuration): p for p in hist_processes}
+        missing = [i for i in ids if i not in by_id]
+        if missing:
+            raise Exception(f"No histograms with ids {missing}")
+        return [by_id[i] for i in ids]
+
+    def _reuse_processes(self, start, stop, hist_configs, hist_processes):
+        """
+        Keep or reconfigure the existing processes where possible and stop the
+        rest.
+
+        Restarting a process means recreating its consumer, so any data that
+        arrives in the meantime would be missed.
+
+        :param start: The new start time.
+        :param stop: The new stop time.
+        :param hist_configs: The new histogram configurations.
+        :param hist_processes: The existing processes, updated in place.
+        :return: The configurations that still need a process.
+        """
+        reusable = []
+        if not self.simulation:
+            reusable = [p for p in hist_processes if self._can_reuse(p, start, stop)]
+        to_stop = [p for p in hist_processes if p not in reusable]
+
+        # Prefer processes with an identical configuration as they need nothing doing.
+        remaining = []
+        for config in hist_configs:
+            for process in reusable:
+                if process.configuration == config:
+                    reusable.remove(process)
+                    break
+            else:
+                remaining.append(config)
+
+        still_needed = []
+        for config in remaining:
+            process = self._find_compatible(config, reusable)
+            if process is not None and process.reconfigure(config):
+                logging.info("Reconfiguring existing histogram process")
+                reusable.remove(process)
+            else:
+                still_needed.append(config)
+
+        to_stop.extend(reusable)
+        hist_processes[:] = [p for p in hist_processes if p not in to_stop]
+        self._stop_processes(to_stop)
+        return still_needed
+
+    @staticmethod
+    def _can_reuse(process, start, stop):
+        configuration = getattr(process, "configuration", None)
+        # A checkpoint belongs to a particular configuration.
+        return (
+            configuration is not None
+            and "checkpoint" not in configuration
+            and process.start_time == start
+            and process.stop_time == stop
+            and process.is_alive()
+        )
+
+    @staticmethod
+    def _find_compatible(config, processes):
+        if "checkpoint" in config:
+            return None
+        for process in processes:
+            if all(
+                process.configuration.get(key) == config.get(key)
+                for key in STREAM_SETTINGS
+            ):
+                return process
+        return None
+
     def _stop_processes(self, hist_processes):
         """
         Request the processes to stop.
@@ -0,0 +1,323 @@
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from just_bin_it.endpoints.serialisation import get_ev42_pulse_time
+from just_bin_it.exceptions import JustBinItException
+
+# Files written by just-bin-it start with this marker, anything else is treated
+# as a plain stream of length-prefixed ev42 buffers.
+CAPTURE_MAGIC = b"JBICAP01"
+
+# Kafka timestamp (ms), offset, partition and payload length.
+CAPTURE_RECORD_HEADER = struct.Struct("<qqiI")
+
+# Payload length only.
+LENGTH_PREFIX = struct.Struct("<I")
+
+# Capture files have a sidecar index with one entry per message, so they can be
+# opened and searched by time without scanning the whole file.
+INDEX_SUFFIX = ".idx"
+INDEX_DTYPE = np.dtype(
+    [
+        ("timestamp", "<i8"),
+        ("offset", "<i8"),
+        ("partition", "<i4"),
+        ("length", "<u4"),
+        ("position", "<i8"),
+    ]
+)
+
+
+class EventFileReader:
+    """
+    Provides random access to the messages stored in an event file.
+
+    Two formats are supported:
+      * capture files which contain the Kafka timestamp, offset and partition
+        for each message (see EventFileWriter);
+      * plain files of little-endian uint32 length-prefixed ev42 buffers, in
+        which case the timestamp is derived from the pulse time.
+
+    The file is memory mapped so only the parts that are read are paged in.
+    """
+
+    def __init__(self, filename):
+        """
+        Constructor.
+
+        :param filename: The file to read.
+        """
+        self.filename = filename
+        self._file = open(filename, "rb")
+        self._map = None
+        if os.fstat(self._file.fileno()).st_size > 0:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.is_capture = (
+            self._map is not None and self._map[: len(CAPTURE_MAGIC)] == CAPTURE_MAGIC
+        )
+
+        self.timestamps = None
+        self.offsets = None
+        self.partitions = None
+        self._positions = None
+        self._lengths = None
+        self._latest_timestamps = None
+
+        # Whether the sidecar index matched the data and was used.
+        self.index_loaded = self.is_capture and self._load_index()
+        if not self.index_loaded:
+            self._build_index()
+
+    def _load_index(self):
+        index_file = self.filename + INDEX_SUFFIX
+        if not os.path.exists(index_file):
+            return False
+        if os.path.getsize(index_file) % INDEX_DTYPE.itemsize:
+            return False
+
+        index = np.fromfile(index_file, dtype=INDEX_DTYPE)
+        if not self._index_matches_data(index):
+            # The index does not match the data (e.g. the capture was killed
+            # mid-write), so fall back to scanning the file.
+            return False
+
+        self.timestamps = index["timestamp"]
+        self.offsets = index["offset"]
+        self.partitions = index["partition"]
+        self._positions = index["position"]
+        self._lengths = index["length"].astype(np.int64)
+        return True
+
+    def _index_matches_data(self, index):
+        # The records are back to back, so every entry must start where the
+        # previous one ended and the last must end at the end of the file.
+        # This also means there is exactly one entry per record.
+        if not len(index):
+            return len(self._map) == len(CAPTURE_MAGIC)
+        record_starts = index["position"] - CAPTURE_RECORD_HEADER.size
+        record_ends = index["position"] + index["length"].astype(np.int64)
+        expected_starts = np.concatenate(([len(CAPTURE_MAGIC)], record_ends[:-1]))
+        return record_ends[-1] == len(self._map) and np.array_equal(
+            record_starts, expected_starts
+        )
+
+    def get_index(self):
+        """
+        Get the index of the messages, in the sidecar index file format.
+
+        :return: The structured array with one entry per message.
+        """
+        index = np.zeros(len(self), dtype=INDEX_DTYPE)
+        index["timestamp"] = self.timestamps
+        index["offset"] = self.offsets
+        index["partition"] = self.partitions
+        index["length"] = self._lengths
+        index["position"] = self._positions
+        return index
+
+    def _build_index(self):
+        timestamps = []
+        offsets = []
+        partitions = []
+        positions = []
+        lengths = []
+
+        if self.is_capture:
+            header = CAPTURE_RECORD_HEADER
+            pos = len(CAPTURE_MAGIC)
+        else:
+            header = LENGTH_PREFIX
+            pos = 0
+
+        size = len(self._map) if self._map is not None else 0
+
+        while pos + header.size <= size:
+            fields = header.unpack_from(self._map, pos)
+            length = fields[-1]
+            start = pos + header.size
+            if start + length > size:
+                # A truncated final record, e.g. the capture was killed.
+                break
+
+            if self.is_capture:
+                timestamps.append(fields[0])
+                offsets.append(fields[1])
+                partitions.append(fields[2])
+            else:
+                pulse_time = get_ev42_pulse_time(self._map[start : start + length])
+                timestamps.append(pulse_time // 1_000_000)
+                offsets.append(len(offsets))
+                partitions.append(0)
+
+            positions.append(start)
+            lengths.append(length)
+            pos = start + length
+
+        self.timestamps = np.array(timestamps, dtype=np.int64)
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.partitions = np.array(partitions, dtype=np.int32)
+        self._positions = np.array(positions, dtype=np.int64)
+        self._lengths = np.array(lengths, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def get_message(self, index):
+        """
+        Get the raw buffer for a message.
+
+        :param index: The index of the message in the file.
+        :return: The raw buffer.
+        """
+        start = self._positions[index]
+        return self._map[start : start + self._lengths[index]]
+
+    def find_index_for_time(self, timestamp):
+        """
+        Find the first message with a timestamp >= the supplied time.
+
+        :param timestamp: The time in milliseconds.
+        :return: The index or None if there is no such message.
+        """
+        # Messages from different partitions may be slightly out of order, so
+        # search the latest timestamp so far, which is sorted, instead.
+        if self._latest_timestamps is None:
+            self._latest_timestamps = np.maximum.accumulate(self.timestamps)
+        index = int(np.searchsorted(self._latest_timestamps, timestamp))
+        return index if index < len(self) else None
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class EventFileWriter:
+    """
+    Writes messages to a capture file that can be replayed by EventFileReader.
+
+    Messages are accumulated in memory and written in bulk, along with the
+    corresponding entries in the sidecar index. The index is always written after
+    the data it refers to, so a crash cannot leave it pointing at missing data.
+    """
+
+    def __init__(self, filename, buffer_size=4 * 1024 * 1024, append=False):
+        """
+        Constructor.
+
+        :param filename: The file to write.
+        :param buffer_size: How many bytes to accumulate before writing.
+        :param append: Whether to add to an existing capture file.
+        """
+        self.filename = filename
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
+        self._index = []
+
+        if append and os.path.exists(filename) and os.path.getsize(filename) > 0:
+            self._position = self._prepare_for_append()
+            self._file = open(filename, "ab")
+            self._index_file = open(filename + INDEX_SUFFIX, "ab")
+        else:
+            self._file = open(filename, "wb")
+            self._index_file = open(filename + INDEX_SUFFIX, "wb")
+            self._file.write(CAPTURE_MAGIC)
+            self._position = len(CAPTURE_MAGIC)
+
+    def _prepare_for_append(self):
+        """
+        Make sure the existing file and index match before adding to them.
+
+        If the index does not match the data (e.g. the capture was killed) then
+        any incomplete final record is removed and the index is rebuilt from the
+        data, otherwise the new entries would point at the wrong messages.
+
+        :return: The position to append at.
+        """
+        with EventFileReader(self.filename) as reader:
+            if not reader.is_capture:
+                raise JustBinItException(f"{self.filename} is not a capture file")
+            if reader.index_loaded:
+                return os.path.getsize(self.filename)
+            index = reader.get_index()
+
+        end = len(CAPTURE_MAGIC)
+        if len(index):
+            end = int(index["position"][-1] + index["length"][-1])
+        os.truncate(self.filename, end)
+        with open(self.filename + INDEX_SUFFIX, "wb") as index_file:
+            index_file.write(index.tobytes())
+        return end
+
+    def write_message(self, timestamp, offset, partition, buffer):
+        """
+        Append a message to the file.
+
+        :param timestamp: The Kafka timestamp in milliseconds.
+        :param offset: The Kafka offset.
+        :param partition: The Kafka partition.
+        :param buffer: The raw message.
+        """
+        length = len(buffer)
+        if length > 0xFFFFFFFF:
+            raise JustBinItException("Message too large to write to event file")
+
+        self._buffer += CAPTURE_RECORD_HEADER.pack(timestamp, offset, partition, length)
+        self._buffer += buffer
+
+        data_position = self._position + len(self._buffer) - length
+        self._index.append((timestamp, offset, partition, length, data_position))
+
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write any buffered messages and their index entries to disk.
+        """
+        if not self._buffer:
+            return
+
+        self._file.write(self._buffer)
+        self._file.flush()
+        self._index_file.write(np.array(self._index, dtype=INDEX_DTYPE).tobytes())
+        self._index_file.flush()
+
+        self._position += len(self._buffer)
+        self._buffer = bytearray()
+        self._index = []
+
+    def close(self):
+        self.flush()
+        self._file.close()
+        self._index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def write_length_prefixed(filename, buffers):
+    """
+    Write buffers to a file as a plain stream of length-prefixed messages.
+
+    :param filename: The file to write.
+    :param buffers: The raw messages.
+    """
+    with open(filename, "wb") as file:
+        for buffer in buffers:
+            file.write(LENGTH_PREFIX.pack(len(buffer)))
+            file.write(buffer)
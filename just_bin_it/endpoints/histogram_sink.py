@@ -2,17 +2,19 @@ from just_bin_it.endpoints.serialisation import serialise_hs00
 
 
 class HistogramSink:
-    def __init__(self, producer, serialise_function=serialise_hs00):
+    def __init__(self, producer, serialise_function=serialise_hs00, timer=None):
         """
         Constructor.
 
         :param producer: The underlying Kafka producer to publish to.
         :param serialise_function: The function to use to serialise the data.
+        :param timer: Optional StageTimer for recording the serialise and publish times.
         """
         if producer is None:
             raise Exception("Histogram sink must have a producer")  # pragma: no mutate
         self.producer = producer
         self.serialise_function = serialise_function
+        self.timer = timer
 
     def send_histogram(self, topic, histogram, timestamp=0, information=""):
         """
@@ -23,6 +25,16 @@ class HistogramSink:
         :param timestamp: The timestamp to set (ns since epoch).
         :param information: The message to write to the 'info' field.
         """
-        self.producer.publish_message(
-            topic, self.serialise_function(histogram, timestamp, information)
-        )
+        if not self.timer:
+            self.producer.publish_message(
+                topic, self.serialise_function(histogram, timestamp, information)
+            )
+            return
+
+        started = self.timer.start()
+        buf = self.serialise_function(histogram, timestamp, information)
+        self.timer.stop("serialise", started)
+
+        started = self.timer.start()
+        self.producer.publish_message(topic, buf)
+        self.timer.stop("publish", started)
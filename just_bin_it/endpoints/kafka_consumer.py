@@ -34,6 +34,20 @@ class Consumer:
     def _create_consumer(self, brokers):
         return KafkaConsumer(bootstrap_servers=brokers)
 
+    def assign_topics(self, topics: List[str]):
+        """
+        Switch to different topics, reusing the connection.
+
+        As when constructed, the position is the end of the topic.
+
+        :param topics: The names of the data topics.
+        """
+        self.topic_partitions = []
+        try:
+            self._assign_topics(topics)
+        except KafkaError as error:
+            raise KafkaException(error)
+
     def _assign_topics(self, topics):
         # Only use the first topic
         topic = topics[0]
@@ -51,21 +65,22 @@ class Consumer:
         self.consumer.assign(self.topic_partitions)
         self.consumer.seek_to_end()
 
-    def _get_new_messages(self):
-        data = self.consumer.poll(5)
+    def _get_new_messages(self, max_records=None):
+        data = self.consumer.poll(5, max_records=max_records)
         for tp in self.topic_partitions:
             logging.debug(
                 "%s - current position: %s", tp.topic, self.consumer.position(tp)
             )
         return data
 
-    def get_new_messages(self):
+    def get_new_messages(self, max_records=None):
         """
         Get any new messages.
 
+        :param max_records: The most messages to get, None for the default.
         :return: The dict containing the messages.
         """
-        return self._get_new_messages()
+        return self._get_new_messages(max_records)
 
     def offset_for_time(self, start_time: int):
         """
@@ -118,6 +133,20 @@ class Consumer:
 
         return offset_ranges
 
+    def get_end_offsets(self):
+        """
+        Get the offsets after the last message for each partition.
+
+        This is cheaper than get_offset_range as it is only one request.
+
+        :return: List of offsets.
+        """
+        return self._get_end_offsets()
+
+    def _get_end_offsets(self):
+        highest = self.consumer.end_offsets(self.topic_partitions)
+        return [highest[tp] for tp in self.topic_partitions]
+
     def get_positions(self):
         """
         Get the position of the consumer for each partition.
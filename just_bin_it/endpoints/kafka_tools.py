@@ -1,41 +1,112 @@
 import logging
+import time
 
 from kafka import KafkaConsumer
 from kafka.errors import KafkaError
 
 
-def are_kafka_settings_valid(brokers, topics):
+class TopicMetadataCache:
+    """
+    Caches the topics that exist for each set of brokers.
+
+    Checking a configuration with many histograms would otherwise connect to
+    the brokers and fetch all the metadata once per histogram. A connection is
+    kept per set of brokers and reused when the cached topics expire.
+    """
+
+    def __init__(self, ttl=30, consumer_factory=None, clock=time.monotonic):
+        """
+        Constructor.
+
+        :param ttl: How long the cached topics are used for in seconds.
+        :param consumer_factory: Creates the connection from the brokers, for testing.
+        :param clock: The time source, for testing.
+        """
+        self.ttl = ttl
+        self._consumer_factory = consumer_factory or _create_consumer
+        self._clock = clock
+        self._consumers = {}
+        self._topics = {}
+
+    def get_topics(self, brokers, refresh=False):
+        """
+        Get the topics that exist.
+
+        :param brokers: The broker names.
+        :param refresh: Whether to ignore any cached topics.
+        :return: The set of topics or None if the brokers could not be contacted.
+        """
+        key = tuple(sorted(brokers))
+        if not refresh and key in self._topics:
+            fetched_at, topics = self._topics[key]
+            if self._clock() - fetched_at < self.ttl:
+                return topics
+
+        try:
+            if key not in self._consumers:
+                self._consumers[key] = self._consumer_factory(brokers)
+            topics = set(self._consumers[key].topics())
+        except KafkaError as error:
+            logging.error("Could not get topics from Kafka: %s", error)
+            self._discard(key)
+            return None
+
+        self._topics[key] = (self._clock(), topics)
+        return topics
+
+    def _discard(self, key):
+        self._topics.pop(key, None)
+        consumer = self._consumers.pop(key, None)
+        if consumer is not None:
+            try:
+                consumer.close()
+            except Exception as error:
+                logging.debug("Could not close metadata consumer: %s", error)
+
+    def close(self):
+        for key in list(self._consumers):
+            self._discard(key)
+
+
+def _create_consumer(brokers):
+    return KafkaConsumer(bootstrap_servers=brokers)
+
+
+_metadata_cache = TopicMetadataCache()
+
+
+def are_kafka_settings_valid(brokers, topics, cache=None):
     """
     Check to see if the broker(s) and topics exist.
 
+    The topics are cached, but if any appear to be missing they are fetched
+    again in case they have only just been created.
+
     :param brokers: The broker names.
+    :param topics: The topic names.
+    :param cache: The TopicMetadataCache to use, by default a shared one.
     :return: True if they exist.
     """
-    consumer = _are_brokers_present(brokers)
-    if consumer is None:
-        return False
+    cache = cache if cache is not None else _metadata_cache
 
-    return _are_topics_present(consumer, topics)
+    existing_topics = cache.get_topics(brokers)
+    if existing_topics is None:
+        return False
 
+    if not _are_topics_present(existing_topics, topics, log=False):
+        existing_topics = cache.get_topics(brokers, refresh=True)
+        if existing_topics is None:
+            return False
+        return _are_topics_present(existing_topics, topics)
 
-def _are_brokers_present(brokers):
-    try:
-        return KafkaConsumer(bootstrap_servers=brokers)
-    except KafkaError as error:
-        logging.error("Could not connect to Kafka brokers: %s", error)
-        return None
+    return True
 
 
-def _are_topics_present(consumer, topics):
+def _are_topics_present(existing_topics, topics, log=True):
     result = True
-    try:
-        existing_topics = consumer.topics()
-        for tp in topics:
-            if tp not in existing_topics:
+    for tp in topics:
+        if tp not in existing_topics:
+            if log:
                 logging.error("Could not find topic: %s", tp)
-                result = False
-    except KafkaError as error:
-        logging.error("Could not get topics from Kafka: %s", error)
-        return False
-
+            result = False
     return result
@@ -1,6 +1,7 @@
 import streaming_data_types.eventdata_ev42 as ev42
 import streaming_data_types.histogram_hs00 as hs00
 from streaming_data_types.eventdata_ev42 import EventData
+from streaming_data_types.fbschemas.eventdata_ev42.EventMessage import EventMessage
 
 from just_bin_it.exceptions import JustBinItException
 
@@ -38,15 +39,18 @@ def serialise_hs00(histogrammer, timestamp: int = 0, info_message: str = ""):
     :return: The raw buffer of the FlatBuffers message.
     """
 
+    # N-dimensional histograms have a list of edges, one per axis.
+    all_edges = getattr(histogrammer, "edges", None)
+    if all_edges is None:
+        all_edges = [histogrammer.x_edges]
+        if hasattr(histogrammer, "y_edges"):
+            all_edges.append(histogrammer.y_edges)
+
     dim_metadata = [
-        {"bin_boundaries": histogrammer.x_edges, "length": histogrammer.shape[0]}
+        {"bin_boundaries": edges, "length": length}
+        for edges, length in zip(all_edges, histogrammer.shape)
     ]
 
-    if hasattr(histogrammer, "y_edges"):
-        dim_metadata.append(
-            {"bin_boundaries": histogrammer.y_edges, "length": histogrammer.shape[1]}
-        )
-
     data = {
         "source": "just-bin-it",
         "timestamp": timestamp,
@@ -72,6 +76,21 @@ def deserialise_ev42(buf) -> EventData:
         raise JustBinItException(f"Could not deserialise ev42 buffer: {error}")
 
 
+def get_ev42_pulse_time(buf) -> int:
+    """
+    Extract only the pulse time from an ev42 FlatBuffers message.
+
+    This is much cheaper than a full deserialisation.
+
+    :param buf: The raw buffer of the FlatBuffers message.
+    :return: The pulse time.
+    """
+    try:
+        return EventMessage.GetRootAsEventMessage(buf, 0).PulseTime()
+    except Exception as error:
+        raise JustBinItException(f"Could not read pulse time from ev42 buffer: {error}")
+
+
 def serialise_ev42(source_name, message_id, pulse_time, tofs, det_ids):
     """
     Serialise into an ev42 FlatBuffers message.
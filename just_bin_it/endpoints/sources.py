@@ -5,13 +5,20 @@ import time
 from enum import Enum
 from typing import Optional
 
+import numpy as np
+
 from just_bin_it.endpoints.serialisation import (
     EventData,
     deserialise_ev42,
     deserialise_hs00,
 )
 from just_bin_it.exceptions import SourceException, TooOldTimeRequestedException
-from just_bin_it.utilities.fake_data_generation import generate_fake_data
+from just_bin_it.utilities.fake_data_generation import (
+    DISTRIBUTIONS,
+    EventPool,
+    generate_fake_detector_data,
+    generate_values,
+)
 
 
 class StopTimeStatus(Enum):
@@ -21,31 +28,46 @@ class StopTimeStatus(Enum):
 
 
 class BaseSource:
-    def __init__(self, consumer):
+    def __init__(self, consumer, timer=None):
         """
         Constructor.
 
         :param consumer: The underlying consumer.
+        :param timer: Optional StageTimer for recording the poll and decode times.
         """
         if consumer is None:
             raise Exception("Event source must have a consumer")  # pragma: no mutate
         self.consumer = consumer
+        self.timer = timer
+        # The timestamp of the most recent message consumed per partition.
+        self.last_timestamps = {}
 
-    def get_new_data(self):
+    def get_new_data(self, max_records=None):
         """
         Get the latest data from the consumer.
 
+        :param max_records: The most messages to get, None for the default.
         :return: The list of data.
         """
         data = []
-        msgs = self.consumer.get_new_messages()
+        started = self.timer.start() if self.timer else None
+        msgs = self.consumer.get_new_messages(max_records)
+
+        if self.timer:
+            self.timer.stop("poll", started)
+            started = self.timer.start()
 
-        for _, records in msgs.items():
+        for partition, records in msgs.items():
+            if records:
+                self.last_timestamps[partition] = records[-1].timestamp
             for i in records:
                 try:
                     data.append((i.timestamp, i.offset, self._process_record(i.value)))
                 except SourceException as error:
                     logging.debug("SourceException: %s", error)  # pragma: no mutate
+
+        if self.timer:
+            self.timer.stop("decode", started)
         return data
 
     def _process_record(self, record):
@@ -67,11 +89,18 @@ class EventSource(BaseSource):
         start_time: int,
         stop_time: Optional[int] = None,
         deserialise_function=deserialise_ev42,
+        timer=None,
+        lag_interval_ms=5000,
     ):
-        super().__init__(consumer)
+        super().__init__(consumer, timer)
         self.start_time = start_time
         self.stop_time = stop_time
         self.deserialise_function = deserialise_function
+        self.lag_interval_ms = lag_interval_ms
+        self._next_lag_time_ms = 0
+        self._lag = []
+        # The offsets to catch up between after seeking back in time.
+        self._catch_up_range = None
 
     def _process_record(self, record):
         try:
@@ -108,9 +137,33 @@ class EventSource(BaseSource):
                 )  # pragma: no mutate
 
         self.consumer.seek_by_offsets(offsets)
+        self._catch_up_range = (offsets, [highest for _, highest in offset_ranges])
 
         return offsets
 
+    def catch_up_progress(self):
+        """
+        How much of the backlog between the start time and the end of the topic
+        (at the time of seeking) has been consumed.
+
+        :return: Fraction between 0 and 1 or None if not catching up.
+        """
+        if self._catch_up_range is None:
+            return None
+
+        starts, ends = self._catch_up_range
+        positions = self.consumer.get_positions()
+        total = 0
+        done = 0
+        for start, end, pos in zip(starts, ends, positions):
+            total += max(end - start, 0)
+            done += min(max(pos - start, 0), max(end - start, 0))
+
+        if done >= total:
+            self._catch_up_range = None
+            return 1.0
+        return done / total
+
     def stop_time_exceeded(self):
         """
         Has the defined stop time been exceeded in Kafka.
@@ -135,6 +188,82 @@ class EventSource(BaseSource):
                         return StopTimeStatus.NOT_EXCEEDED
             return StopTimeStatus.EXCEEDED
 
+    def get_positions(self):
+        """
+        Get the offsets of the next messages to be consumed.
+
+        :return: List of offsets, one per partition.
+        """
+        return self.consumer.get_positions()
+
+    def seek_to_offsets(self, offsets):
+        """
+        Repositions the consumer to the supplied offsets, e.g. from a checkpoint.
+
+        :param offsets: List of offsets, one per partition.
+        """
+        if len(offsets) != len(self.consumer.topic_partitions):
+            raise SourceException(
+                f"Expected {len(self.consumer.topic_partitions)} offsets but got "
+                f"{len(offsets)}"
+            )
+        self.consumer.seek_by_offsets(offsets)
+
+    def skip_to_latest(self):
+        """
+        Move to the end of the topic, i.e. skip any unconsumed messages.
+
+        :return: The number of messages skipped.
+        """
+        end_offsets = self.consumer.get_end_offsets()
+        positions = self.consumer.get_positions()
+        self.consumer.seek_by_offsets(end_offsets)
+        # Make sure the lag is refreshed on the next request.
+        self._next_lag_time_ms = 0
+        return sum(max(end - pos, 0) for end, pos in zip(end_offsets, positions))
+
+    def get_lag(self, current_time_ms):
+        """
+        Get how far behind the end of the topic the consumer is, per partition.
+
+        Kafka is only queried every lag_interval_ms, otherwise the previous
+        values are returned.
+
+        The time lag is how old the most recently consumed message is; it is
+        zero if the consumer is up to date and missing if nothing has been
+        consumed from that partition yet.
+
+        :param current_time_ms: The current time in milliseconds.
+        :return: List of dicts containing the lag for each partition.
+        """
+        if current_time_ms < self._next_lag_time_ms:
+            return self._lag
+
+        self._next_lag_time_ms = current_time_ms + self.lag_interval_ms
+
+        try:
+            end_offsets = self.consumer.get_end_offsets()
+            positions = self.consumer.get_positions()
+        except Exception as error:
+            logging.error("Could not get the consumer lag: %s", error)
+            return self._lag
+
+        lag = []
+        for partition, end, pos in zip(
+            self.consumer.topic_partitions, end_offsets, positions
+        ):
+            partition_lag = {"messages": max(end - pos, 0)}
+            if partition_lag["messages"] == 0:
+                partition_lag["time-ms"] = 0
+            elif partition in self.last_timestamps:
+                partition_lag["time-ms"] = max(
+                    current_time_ms - self.last_timestamps[partition], 0
+                )
+            lag.append(partition_lag)
+
+        self._lag = lag
+        return self._lag
+
 
 class HistogramSource(BaseSource):
     def _process_record(self, record):
@@ -144,11 +273,174 @@ class HistogramSource(BaseSource):
             raise SourceException(error)
 
 
+class FileEventSource:
+    def __init__(
+        self,
+        reader,
+        start_time: Optional[int] = None,
+        stop_time: Optional[int] = None,
+        realtime=False,
+        max_messages=100,
+        deserialise_function=deserialise_ev42,
+    ):
+        """
+        Constructor.
+
+        Replays the messages in an event file as if they had come from Kafka.
+
+        :param reader: The event file reader.
+        :param start_time: The start time.
+        :param stop_time: The stop time.
+        :param realtime: If True replay at the recorded speed, otherwise as fast
+            as possible.
+        :param max_messages: The maximum number of messages to return per call.
+        :param deserialise_function: The function to use to deserialise the data.
+        """
+        if reader is None:
+            raise Exception("File source must have a reader")  # pragma: no mutate
+        self.reader = reader
+        self.start_time = start_time
+        self.stop_time = stop_time
+        self.realtime = realtime
+        self.max_messages = max_messages
+        self.deserialise_function = deserialise_function
+        self.position = 0
+        self._replay_origin = None
+        self._stop_index = None
+
+    def get_new_data(self):
+        """
+        Get the next batch of messages from the file.
+
+        :return: The list of data.
+        """
+        end = min(self.position + self.max_messages, self._get_stop_index())
+
+        if self.realtime and self.position < end:
+            end = self.position + self._number_of_messages_due(end)
+
+        data = []
+        for i in range(self.position, end):
+            try:
+                data.append(
+                    (
+                        int(self.reader.timestamps[i]),
+                        int(self.reader.offsets[i]),
+                        self.deserialise_function(self.reader.get_message(i)),
+                    )
+                )
+            except Exception as error:
+                logging.debug("Could not deserialise message: %s", error)
+        self.position = end
+        return data
+
+    def _number_of_messages_due(self, end):
+        timestamps = self.reader.timestamps[self.position : end]
+        if self._replay_origin is None:
+            self._replay_origin = (time.monotonic(), int(timestamps[0]))
+        wall_start, recorded_start = self._replay_origin
+        elapsed_ms = (time.monotonic() - wall_start) * 1000
+        return int(np.count_nonzero(timestamps <= recorded_start + elapsed_ms))
+
+    def catch_up_progress(self):
+        """
+        The file is replayed in its own batches, so there is no catching up.
+
+        :return: None.
+        """
+        return None
+
+    def get_lag(self, current_time_ms):
+        """
+        Get how much of the file is still to be replayed.
+
+        :param current_time_ms: The current time in milliseconds [NOT USED].
+        :return: List containing a dict of the lag.
+        """
+        remaining = len(self.reader) - self.position
+        if remaining == 0:
+            return [{"messages": 0, "time-ms": 0}]
+        time_lag = self.reader.timestamps[-1] - self.reader.timestamps[self.position]
+        return [{"messages": remaining, "time-ms": int(time_lag)}]
+
+    def seek_to_start_time(self):
+        """
+        Moves to the first message >= the start time.
+
+        :return: The corresponding position in the file.
+        """
+        index = self.reader.find_index_for_time(self.start_time)
+
+        if index is None:
+            logging.warning(
+                "Could not find corresponding message for start time, so set "
+                "position to end of file"
+            )
+            index = len(self.reader)
+        elif index == 0 and self.reader.timestamps[0] > self.start_time:
+            raise TooOldTimeRequestedException(
+                "Cannot find start time in the file, the supplied time is before "
+                "the first message"
+            )  # pragma: no mutate
+
+        self.position = index
+        self._replay_origin = None
+        return index
+
+    def stop_time_exceeded(self):
+        """
+        Has the defined stop time been exceeded in the file.
+
+        Once the file is exhausted no more data can arrive, so that is also
+        treated as the stop time being exceeded.
+
+        :return: A StopTimeStatus.
+        """
+        if self.position >= self._get_stop_index():
+            return StopTimeStatus.EXCEEDED
+        return StopTimeStatus.NOT_EXCEEDED
+
+    def _get_stop_index(self):
+        # The index of the first message after the stop time, so nothing past
+        # it is read.
+        if not self.stop_time:
+            return len(self.reader)
+
+        if self._stop_index is None or self._stop_index[0] != self.stop_time:
+            index = self.reader.find_index_for_time(self.stop_time + 1)
+            self._stop_index = (
+                self.stop_time,
+                index if index is not None else len(self.reader),
+            )
+        return self._stop_index[1]
+
+
 class SimulatedEventSource:
-    def __init__(self, config, start, stop):
+    """
+    Generates event data at a configurable rate, e.g. for testing.
+
+    Events are taken from pre-generated pools, so data can be generated at
+    production rates without generating random numbers on the hot path.
+    """
+
+    def __init__(self, config, start, stop, clock=time.time):
+        """
+        Constructor.
+
+        The optional "simulation" dict in the configuration contains:
+          * "event_rate" - the number of events per second;
+          * "message_rate" - the number of messages per second;
+          * "tof_distribution" and "det_distribution" - the distributions
+            to draw the events from, see DISTRIBUTIONS;
+          * "pool_size" - how many events to pre-generate.
+
+        :param config: The histogram configuration.
+        :param start: The start time in ms.
+        :param stop: The stop time in ms.
+        :param clock: Function returning the current time in seconds.
+        """
         self.tof_range = (0, 100_000_000)
         self.det_range = (1, 512)
-        self.num_events = 1000
         self.is_dethist = False
         self.width = 0
         self.height = 0
@@ -165,42 +457,89 @@ class SimulatedEventSource:
             self.height = config["height"]
         else:
             # Based on the config, guess gaussian settings.
-            self.tof_range = config["tof_range"]
+            if "tof_range" in config:
+                self.tof_range = config["tof_range"]
 
             if "det_range" in config:
                 self.det_range = config["det_range"]
 
+        settings = config.get("simulation", {})
+        self.event_rate = settings.get("event_rate", 100_000)
+        self.message_rate = settings.get("message_rate", 100)
+        if self.event_rate <= 0 or self.message_rate <= 0:
+            raise SourceException("Simulated event and message rates must be positive")
+        self.events_per_message = max(1, int(self.event_rate / self.message_rate))
+        self.tof_distribution = settings.get(
+            "tof_distribution", DISTRIBUTIONS["GAUSSIAN"]
+        )
+        self.det_distribution = settings.get(
+            "det_distribution", DISTRIBUTIONS["GAUSSIAN"]
+        )
+        pool_size = max(
+            settings.get("pool_size", 10 * self.events_per_message),
+            self.events_per_message,
+        )
+
+        self._rng = np.random.default_rng()
+        self._pool = self._create_pool(pool_size)
+        self._clock = clock
+        self._last_time = None
+        # The fraction of a message not yet sent.
+        self._pending = 0.0
+        self._message_id = 0
+
+    def _create_pool(self, pool_size):
+        tofs = generate_values(
+            self.tof_distribution, self.tof_range, pool_size, self._rng
+        )
+        if self.is_dethist:
+            dets = generate_fake_detector_data(
+                self.width, self.height, pool_size, self.det_distribution, self._rng
+            )
+        else:
+            dets = generate_values(
+                self.det_distribution, self.det_range, pool_size, self._rng
+            )
+        return EventPool(tofs, dets, self._rng)
+
     def get_new_data(self):
         """
-        Generate gaussian data centred around the defined centre.
+        Generate the messages due since the previous call.
+
+        At most one second's worth of messages is generated per call, so the
+        rate is not exceeded if processing falls behind.
 
         :return: The generated data.
         """
-        if self.is_dethist:
-            return self._generate_dethist_data()
+        now = self._clock()
+        if self._last_time is None:
+            # Always start with a message.
+            self._pending = 1.0
         else:
-            return self._generate_data()
-
-    def _generate_data(self):
-        tofs, dets = generate_fake_data(self.tof_range, self.det_range, self.num_events)
-        data = EventData(
-            "simulator", 0, math.floor(time.time() * 10 ** 9), tofs, dets, None
-        )
-        return [(int(time.time() * self.num_events), 0, data)]
+            self._pending += (now - self._last_time) * self.message_rate
+        self._last_time = now
 
-    def _generate_dethist_data(self):
-        dets = []
+        num_messages = int(min(self._pending, max(1, self.message_rate)))
+        self._pending -= num_messages
+        if self._pending > self.message_rate:
+            self._pending = 0.0
 
-        for h in range(self.height):
-            _, new_dets = generate_fake_data(
-                self.tof_range, (0, self.width), self.num_events
+        data = []
+        for i in range(num_messages):
+            # Spread the pulse times over the interval.
+            msg_time = now - (num_messages - 1 - i) / self.message_rate
+            tofs, dets = self._pool.take(self.events_per_message)
+            self._message_id += 1
+            event_data = EventData(
+                "simulator",
+                self._message_id,
+                math.floor(msg_time * 10 ** 9),
+                tofs,
+                dets,
+                None,
             )
-            for det in new_dets:
-                dets.append(h * self.width + det)
-        data = EventData(
-            "simulator", 0, math.floor(time.time() * 10 ** 9), [], dets, None
-        )
-        return [(int(time.time() * self.num_events), 0, data)]
+            data.append((int(msg_time * 1000), self._message_id, event_data))
+        return data
 
     def seek_to_start_time(self):
         """
@@ -213,6 +552,23 @@ class SimulatedEventSource:
         """
         return 0
 
+    def catch_up_progress(self):
+        """
+        Simulated data is generated on demand so there is nothing to catch up.
+
+        :return: None.
+        """
+        return None
+
+    def get_lag(self, current_time_ms):
+        """
+        Simulated data is generated on demand so is never behind.
+
+        :param current_time_ms: The current time in milliseconds [NOT USED].
+        :return: Empty list.
+        """
+        return []
+
     def stop_time_exceeded(self):
         if self.stop and time.time() > self.stop:
             return StopTimeStatus.EXCEEDED
@@ -1,7 +1,13 @@
 import logging
+import socket
+import threading
+import time
+from collections import deque
 
 import graphyte
 
+from just_bin_it.utilities.periodic_thread import PeriodicThread
+
 
 class GraphiteSender:
     def __init__(self, server, port, prefix):
@@ -10,6 +16,126 @@ class GraphiteSender:
     def send(self, name, value, timestamp):
         self.sender.send(name, value, timestamp)
 
+    def flush(self):
+        # Everything is sent immediately.
+        pass
+
+    def close(self):
+        # Nothing is buffered and there is no thread to stop.
+        pass
+
+
+class BatchedGraphiteSender:
+    """
+    Buffers metrics and sends them to Graphite in one write per interval using
+    the plaintext protocol.
+
+    Sending happens on a background thread and the buffer is bounded, so if
+    Graphite is unavailable the oldest metrics are dropped rather than the
+    caller being blocked.
+    """
+
+    def __init__(
+        self,
+        server,
+        port,
+        prefix,
+        interval=1.0,
+        max_buffer=10_000,
+        timeout=5,
+        connection_factory=socket.create_connection,
+    ):
+        """
+        Constructor.
+
+        :param server: The Graphite server.
+        :param port: The Graphite plaintext port.
+        :param prefix: The prefix for all the metric names.
+        :param interval: How often to send in seconds.
+        :param max_buffer: The most metrics to hold while waiting to send.
+        :param timeout: The timeout for connecting and sending in seconds.
+        :param connection_factory: Creates the socket, for testing.
+        """
+        self.address = (server, port)
+        self.prefix = f"{prefix}." if prefix else ""
+        self.timeout = timeout
+        self.dropped = 0
+        self._connection_factory = connection_factory
+        self._connection = None
+        self._buffer = deque(maxlen=max_buffer)
+        self._buffer_lock = threading.Lock()
+        # Only one flush at a time, e.g. a final flush while the thread is sending.
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        if interval:
+            self._thread = PeriodicThread("graphite-sender", self.flush, interval)
+            self._thread.start()
+
+    def send(self, name, value, timestamp=None):
+        """
+        Add a metric to be sent.
+
+        :param name: The metric name, without the prefix.
+        :param value: The value.
+        :param timestamp: The time in seconds since the epoch, None for now.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        line = f"{self.prefix}{name} {value} {int(round(timestamp))}\n"
+        with self._buffer_lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(line)
+
+    def flush(self):
+        """
+        Send the buffered metrics.
+
+        If sending fails then the metrics are kept to retry next time and the
+        connection is recreated.
+        """
+        with self._flush_lock:
+            with self._buffer_lock:
+                lines = list(self._buffer)
+                self._buffer.clear()
+            if not lines:
+                return
+
+            try:
+                if self._connection is None:
+                    self._connection = self._connection_factory(
+                        self.address, timeout=self.timeout
+                    )
+                self._connection.sendall("".join(lines).encode("utf-8"))
+            except OSError as error:
+                logging.error("Could not send statistics to Graphite: %s", error)
+                self._close_connection()
+                self._requeue(lines)
+
+    def _requeue(self, lines):
+        with self._buffer_lock:
+            # Anything that does not fit is dropped, oldest first.
+            combined = lines + list(self._buffer)
+            self.dropped += max(0, len(combined) - self._buffer.maxlen)
+            self._buffer = deque(combined, maxlen=self._buffer.maxlen)
+
+    def _close_connection(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except OSError:
+                pass
+            self._connection = None
+
+    def close(self):
+        """
+        Stop the background thread, send anything left and disconnect.
+        """
+        if self._thread:
+            self._thread.stop(timeout=self.timeout * 2)
+        self.flush()
+        self._close_connection()
+
 
 class StatisticsPublisher:
     def __init__(self, sender, metric, stats_interval_ms=1000):
@@ -34,6 +160,9 @@ class StatisticsPublisher:
                 stats = process.get_stats()
                 if stats:
                     self._send_stats(stats, i)
+                process_stats = process.get_process_stats()
+                if process_stats:
+                    self._send_process_stats(process_stats, i, current_time_ms)
             except Exception as error:
                 logging.error(
                     "Could not publish statistics for process %s: %s", i, error
@@ -60,3 +189,32 @@ class StatisticsPublisher:
                 stat["diff"],
                 timestamp=time_stamp,
             )
+
+    def _send_process_stats(self, process_stats, process_index, current_time_ms):
+        # Process stats are not related to the pulse times, so use the current time
+        time_stamp = current_time_ms / 10 ** 3
+
+        for name, value in process_stats.items():
+            self.sender.send(
+                f"{self.metric}{process_index}-{name}", value, timestamp=time_stamp
+            )
+
+    def publish_control_stats(self, control_stats, current_time_ms):
+        """
+        Publish the timings for the control threads, e.g. config listening.
+
+        :param control_stats: Dict of the timings keyed on the thread name.
+        :param current_time_ms: The current time in ms.
+        """
+        time_stamp = current_time_ms / 10 ** 3
+
+        for thread_name, stats in control_stats.items():
+            for name, value in stats.items():
+                try:
+                    self.sender.send(
+                        f"{self.metric}control-{thread_name}-{name}",
+                        value,
+                        timestamp=time_stamp,
+                    )
+                except Exception as error:
+                    logging.error("Could not publish control statistics: %s", error)
@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+
+
+def create_histogram_array(shape, filename=None):
+    """
+    Create an array to hold the histogram counts.
+
+    If a file is supplied then the array is memory-mapped to it, so the
+    operating system decides how much of it is held in RAM. The counts always
+    start from zero, as the file does not record what they were counted from;
+    carrying on after a restart is what checkpointing is for.
+
+    An existing file of the right size is zeroed in place rather than
+    truncated, so another histogram still using it is not left mapping a
+    shrunken file (e.g. while reconfiguring).
+
+    :param shape: The shape of the histogram.
+    :param filename: Optional file to back the array with.
+    :return: The array.
+    """
+    if filename is None:
+        return np.zeros(shape, dtype=np.float64)
+
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    size = int(np.prod(shape)) * np.dtype(np.float64).itemsize
+    if os.path.isfile(filename) and os.path.getsize(filename) == size:
+        array = np.memmap(filename, dtype=np.float64, mode="r+", shape=shape)
+        array.fill(0)
+        return array
+    return np.memmap(filename, dtype=np.float64, mode="w+", shape=shape)
+
+
+def flush_histogram_array(array):
+    """
+    Write any changes to a memory-mapped array to its file.
+
+    :param array: The array, does nothing if it is not memory-mapped.
+    """
+    if isinstance(array, np.memmap):
+        array.flush()
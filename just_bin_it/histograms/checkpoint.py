@@ -0,0 +1,189 @@
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+CHECKPOINT_SUFFIX = ".npz"
+EDGE_NAMES = ["x_edges", "y_edges"]
+
+
+def create_config_hash(configuration, start, stop):
+    """
+    Create a hash which identifies a histogram configuration.
+
+    A checkpoint is only restored if the hash matches, so a change to the
+    configuration (or the times) means starting from scratch.
+
+    :param configuration: The histogram configuration.
+    :param start: The start time.
+    :param stop: The stop time.
+    :return: The hash as a hex string.
+    """
+    config = {k: v for k, v in configuration.items() if k != "checkpoint"}
+    text = json.dumps(
+        {"config": config, "start": start, "stop": stop}, sort_keys=True, default=str
+    )
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def checkpoint_filename(directory, configuration):
+    """
+    Generate the checkpoint file name for a histogram configuration.
+
+    :param directory: The directory to write the checkpoints in.
+    :param configuration: The histogram configuration.
+    :return: The file path.
+    """
+    name = configuration.get("id") or configuration["topic"]
+    name = name.replace(os.sep, "_")
+    return os.path.join(directory, f"{name}{CHECKPOINT_SUFFIX}")
+
+
+class Checkpointer:
+    """
+    Periodically saves the histograms and consumer offsets to disk so that a
+    restarted process can carry on from where it left off.
+
+    The checkpoint is written to a temporary file which is then renamed, so
+    the checkpoint on disk is always complete.
+    """
+
+    def __init__(self, filename, config_hash, interval_ms=60_000):
+        """
+        Constructor.
+
+        :param filename: The checkpoint file.
+        :param config_hash: Identifies the histogram configuration.
+        :param interval_ms: How often to save in milliseconds.
+        """
+        self.filename = filename
+        self.config_hash = config_hash
+        self.interval_ms = interval_ms
+        self._next_save_ms = 0
+
+    def is_due(self, current_time_ms):
+        """
+        Is it time to save a checkpoint.
+
+        :param current_time_ms: The current time in ms.
+        :return: True, if due.
+        """
+        return current_time_ms >= self._next_save_ms
+
+    def save(self, histograms, offsets, current_time_ms):
+        """
+        Save the histograms and offsets.
+
+        :param histograms: The histograms.
+        :param offsets: The consumer offsets, one per partition.
+        :param current_time_ms: The current time in ms.
+        """
+        self._next_save_ms = current_time_ms + self.interval_ms
+
+        arrays = {
+            "config_hash": np.array(self.config_hash),
+            "offsets": np.array(offsets, dtype=np.int64),
+            "num_histograms": np.array(len(histograms)),
+        }
+        for i, hist in enumerate(histograms):
+            arrays[f"data_{i}"] = hist.data
+            arrays[f"last_pulse_time_{i}"] = np.array(hist.last_pulse_time)
+            for name in EDGE_NAMES:
+                edges = getattr(hist, name, None)
+                if edges is not None:
+                    arrays[f"{name}_{i}"] = edges
+            if hasattr(hist, "get_checkpoint_state"):
+                for name, value in hist.get_checkpoint_state().items():
+                    arrays[f"state_{i}_{name}"] = value
+
+        temp_filename = f"{self.filename}.tmp"
+        try:
+            with open(temp_filename, "wb") as file:
+                np.savez(file, **arrays)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_filename, self.filename)
+        except OSError as error:
+            logging.error("Could not save checkpoint %s: %s", self.filename, error)
+
+    def restore(self, histograms):
+        """
+        Restore the histograms from the checkpoint, if there is a valid one.
+
+        :param histograms: The histograms to restore into.
+        :return: The offsets to continue from or None if not restored.
+        """
+        if not os.path.exists(self.filename):
+            return None
+
+        try:
+            with np.load(self.filename, allow_pickle=False) as checkpoint:
+                if str(checkpoint["config_hash"]) != self.config_hash:
+                    logging.warning(
+                        "Checkpoint %s is for a different configuration so ignored",
+                        self.filename,
+                    )
+                    return None
+                if int(checkpoint["num_histograms"]) != len(histograms):
+                    logging.warning(
+                        "Checkpoint %s has the wrong number of histograms so ignored",
+                        self.filename,
+                    )
+                    return None
+
+                for i, hist in enumerate(histograms):
+                    if not self._is_compatible(checkpoint, i, hist):
+                        logging.warning(
+                            "Checkpoint %s has different bins so ignored",
+                            self.filename,
+                        )
+                        return None
+
+                for i, hist in enumerate(histograms):
+                    if hasattr(hist, "restore_checkpoint_state"):
+                        hist.restore_checkpoint_state(
+                            checkpoint[f"data_{i}"], self._get_state(checkpoint, i)
+                        )
+                    else:
+                        hist.data[...] = checkpoint[f"data_{i}"]
+                    hist.last_pulse_time = int(checkpoint[f"last_pulse_time_{i}"])
+
+                offsets = checkpoint["offsets"].tolist()
+        except Exception as error:
+            logging.warning("Could not load checkpoint %s: %s", self.filename, error)
+            return None
+
+        logging.info("Restored histograms from checkpoint %s", self.filename)
+        return offsets
+
+    @staticmethod
+    def _get_state(checkpoint, index):
+        prefix = f"state_{index}_"
+        return {
+            key[len(prefix) :]: checkpoint[key]
+            for key in checkpoint.files
+            if key.startswith(prefix)
+        }
+
+    @staticmethod
+    def _is_compatible(checkpoint, index, hist):
+        if checkpoint[f"data_{index}"].shape != hist.shape:
+            return False
+        # Edges that move with the data only need the same bin layout.
+        relative = getattr(hist, "moving_edges", False)
+        for name in EDGE_NAMES:
+            edges = getattr(hist, name, None)
+            key = f"{name}_{index}"
+            if edges is None:
+                continue
+            if key not in checkpoint.files:
+                return False
+            saved_edges = checkpoint[key]
+            if relative and len(saved_edges) == len(edges):
+                saved_edges = saved_edges - saved_edges[0]
+                edges = edges - edges[0]
+            if not np.array_equal(saved_edges, edges):
+                return False
+        return True
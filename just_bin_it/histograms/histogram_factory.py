@@ -5,6 +5,16 @@ from just_bin_it.exceptions import JustBinItException
 from just_bin_it.histograms.det_histogram import DetHistogram
 from just_bin_it.histograms.histogram1d import Histogram1d
 from just_bin_it.histograms.histogram2d import Histogram2d
+from just_bin_it.histograms.histogrammer import TIME_CUTS
+from just_bin_it.histograms.nd_histogram import AXIS_QUANTITIES, Axis, NdHistogram
+from just_bin_it.histograms.rate_histogram import RateHistogram
+from just_bin_it.histograms.roi import compile_roi
+from just_bin_it.histograms.rolling_histogram import RollingHistogram
+from just_bin_it.histograms.unit_conversion import (
+    UNITS,
+    create_conversion_factors,
+    load_geometry,
+)
 
 
 def parse_config(configuration, current_time=None):
@@ -30,12 +40,22 @@ def parse_config(configuration, current_time=None):
         start = int(current_time) if current_time else int(time.time() * 1000)
         stop = start + interval
 
+    time_cut = (
+        configuration["time_cut"]
+        if "time_cut" in configuration
+        else TIME_CUTS["MESSAGE"]
+    )
+
+    if time_cut not in TIME_CUTS.values():
+        raise Exception(f"Unrecognised time cut '{time_cut}'")
+
     hist_configs = []
 
     if "histograms" in configuration:
         for hist in configuration["histograms"]:
             hist["data_brokers"] = brokers
             hist["data_topics"] = topics
+            hist["time_cut"] = time_cut
             hist_configs.append(hist)
 
     return start, stop, hist_configs
@@ -64,26 +84,87 @@ class HistogramFactory:
             identifier = h["id"] if "id" in h else ""
             width = h["width"] if "width" in h else 512
             height = h["height"] if "height" in h else 512
+            pyramid = h["pyramid"] if "pyramid" in h else []
+            bin_width = h["bin_width"] if "bin_width" in h else None
+            backing_file = h["backing_file"] if "backing_file" in h else None
+            axes = h["axes"] if "axes" in h else None
+            units = h["units"] if "units" in h else UNITS["TOF"]
+            geometry = h["geometry"] if "geometry" in h else None
 
             try:
+                pyramid_levels = HistogramFactory._parse_pyramid(pyramid)
+                # Compiled once here so applying it is just a lookup.
+                roi = compile_roi(h["roi"]) if "roi" in h else None
+                # Also calculated once, so converting is just a lookup and multiply.
+                conversion = HistogramFactory._create_conversion(
+                    hist_type, units, geometry
+                )
+
                 if hist_type == "hist1d":
                     HistogramFactory._check_1d_info(num_bins, tof_range, det_range)
-                    hist = Histogram1d(topic, num_bins, tof_range, det_range, source)
+                    hist = Histogram1d(
+                        topic,
+                        num_bins,
+                        tof_range,
+                        det_range,
+                        source,
+                        backing_file=backing_file,
+                        roi=roi,
+                        conversion=conversion,
+                    )
                 elif hist_type == "hist2d":
                     HistogramFactory._check_2d_info(num_bins, tof_range, det_range)
-                    hist = Histogram2d(topic, num_bins, tof_range, det_range, source)
+                    hist = Histogram2d(
+                        topic,
+                        num_bins,
+                        tof_range,
+                        det_range,
+                        source,
+                        backing_file=backing_file,
+                        roi=roi,
+                        conversion=conversion,
+                    )
                 elif hist_type == "dethist":
                     HistogramFactory._check_2d_map_info(
                         tof_range, det_range, width, height
                     )
                     hist = DetHistogram(
-                        topic, tof_range, det_range, width, height, source
+                        topic,
+                        tof_range,
+                        det_range,
+                        width,
+                        height,
+                        source,
+                        backing_file=backing_file,
+                        roi=roi,
+                    )
+                elif hist_type == "rate":
+                    HistogramFactory._check_rate_info(num_bins, bin_width)
+                    hist = RateHistogram(
+                        topic,
+                        num_bins,
+                        int(bin_width * 10 ** 9),
+                        source,
+                        backing_file=backing_file,
+                        roi=roi,
+                    )
+                elif hist_type == "histnd":
+                    hist = NdHistogram(
+                        topic,
+                        HistogramFactory._create_axes(axes, width, height, conversion),
+                        det_range,
+                        source,
+                        backing_file=backing_file,
+                        roi=roi,
                     )
                 else:
                     # Log but do nothing
                     logging.warning(
                         "Unrecognised histogram type: %s", hist_type
                     )  # pragma: no mutate
+
+                if hist is not None:
+                    hist.pyramid = pyramid_levels
             except Exception as error:
                 logging.warning(
                     "Could not create histogram. %s", error
@@ -93,8 +174,125 @@ class HistogramFactory:
                 hist.identifier = identifier
                 histograms.append(hist)
 
+                if "window" in h:
+                    rolling = HistogramFactory._create_rolling_histogram(h)
+                    if rolling is not None:
+                        histograms.append(rolling)
+
         return histograms
 
+    @staticmethod
+    def _create_rolling_histogram(configuration):
+        """
+        Create a rolling-window histogram with the same binning as the configured
+        histogram, published to its own topic.
+
+        :param configuration: The histogram configuration containing a window.
+        :return: The created histogram or None.
+        """
+        window = configuration["window"]
+        try:
+            if "topic" not in window or "length" not in window:
+                raise JustBinItException("Window requires a topic and a length")
+
+            config = {
+                k: v
+                for k, v in configuration.items()
+                if k not in ["window", "backing_file", "pyramid"]
+            }
+            config["topic"] = window["topic"]
+            config["id"] = window.get("id", "")
+            histogram = HistogramFactory.generate([config])[0]
+
+            rolling = RollingHistogram(
+                histogram,
+                int(window["length"] * 10 ** 9),
+                window.get("slices", 10),
+            )
+            rolling.identifier = config["id"]
+            return rolling
+        except Exception as error:
+            logging.warning(
+                "Could not create rolling histogram. %s", error
+            )  # pragma: no mutate
+        return None
+
+    @staticmethod
+    def _create_conversion(hist_type, units, geometry):
+        """
+        Create the per-detector factors for converting time-of-flight into the
+        requested units.
+
+        :param hist_type: The histogram type.
+        :param units: The units, see UNITS.
+        :param geometry: The name of the instrument geometry file.
+        :return: The lookup table or None if no conversion is needed.
+        """
+        if units == UNITS["TOF"]:
+            return None
+        if hist_type not in ["hist1d", "hist2d", "histnd"]:
+            raise JustBinItException(f"Units cannot be set for {hist_type} histograms")
+        if geometry is None:
+            raise JustBinItException(f"A geometry file is required for {units}")
+        return create_conversion_factors(load_geometry(geometry), units)
+
+    @staticmethod
+    def _create_axes(axes, width, height, conversion=None):
+        """
+        Create the axes for an N-dimensional histogram.
+
+        :param axes: List of dicts containing the quantity, number of bins, range
+            and, for pulse phase, the period in seconds.
+        :param width: The detector width, used by the pixel axes.
+        :param height: The detector height, used by the pixel axes.
+        :param conversion: Optional per-detector factors for the tof axes.
+        :return: List of Axis.
+        """
+        if not axes:
+            raise JustBinItException("Missing axes for N-D histogram")
+
+        created = []
+        for axis in axes:
+            if "quantity" not in axis:
+                raise JustBinItException("Missing quantity for N-D histogram axis")
+            value_range = tuple(axis["range"]) if "range" in axis else None
+            period = int(axis["period"] * 10 ** 9) if "period" in axis else None
+            created.append(
+                Axis(
+                    axis["quantity"],
+                    axis.get("num_bins"),
+                    value_range,
+                    width=width,
+                    height=height,
+                    period=period,
+                    conversion=conversion
+                    if axis["quantity"] == AXIS_QUANTITIES["TOF"]
+                    else None,
+                )
+            )
+        return created
+
+    @staticmethod
+    def _parse_pyramid(pyramid):
+        """
+        Convert the pyramid configuration into (factor, topic) pairs.
+
+        :param pyramid: List of dicts containing the factor and topic.
+        :return: List of (factor, topic).
+        """
+        levels = []
+        for level in pyramid:
+            factor = level.get("factor")
+            topic = level.get("topic")
+            if not isinstance(factor, int) or factor < 2:
+                raise JustBinItException(
+                    f"Invalid rebinning factor {factor}, must be an integer > 1"
+                )
+            if not topic:
+                raise JustBinItException("Missing topic for rebinned histogram")
+            levels.append((factor, topic))
+        return levels
+
     @staticmethod
     def _check_1d_info(num_bins, tof_range, det_range):
         """
@@ -155,6 +353,25 @@ class HistogramFactory:
         if missing or invalid:
             HistogramFactory._generate_exception(missing, invalid, "2D Map")
 
+    @staticmethod
+    def _check_rate_info(num_bins, bin_width):
+        """
+        Checks that the required parameters are defined, if not throw.
+
+        :param num_bins: The number of histogram bins.
+        :param bin_width: The width of the time bins in seconds.
+        """
+        missing = []
+        invalid = []
+
+        HistogramFactory._check_bins(num_bins, missing, invalid)
+        if bin_width is None:
+            missing.append("bin width")  # pragma: no mutate
+        elif not isinstance(bin_width, (int, float)) or bin_width <= 0:
+            invalid.append("bin width")  # pragma: no mutate
+        if missing or invalid:
+            HistogramFactory._generate_exception(missing, invalid, "rate")
+
     @staticmethod
     def _check_tof(tof_range, missing, invalid):
         if tof_range is None:
@@ -1,5 +1,6 @@
 import json
 import logging
+import os
 import time
 from multiprocessing import Process, Queue
 
@@ -11,9 +12,22 @@ from just_bin_it.endpoints.sources import (
     SimulatedEventSource,
     StopTimeStatus,
 )
+from just_bin_it.histograms.checkpoint import (
+    Checkpointer,
+    checkpoint_filename,
+    create_config_hash,
+)
 from just_bin_it.histograms.histogram_factory import HistogramFactory
-from just_bin_it.histograms.histogrammer import Histogrammer
+from just_bin_it.histograms.histogrammer import TIME_CUTS, Histogrammer
+from just_bin_it.histograms.load_shedding import OVERLOAD_POLICIES, LoadShedder
 from just_bin_it.utilities import time_in_ns
+from just_bin_it.utilities.stage_timer import StageTimer
+
+# While catching up, histograms are published this many times less often.
+CATCH_UP_PUBLISH_FACTOR = 10
+# While catching up, Kafka is only asked whether the stop time has been
+# exceeded this often, in milliseconds.
+CATCH_UP_STOP_CHECK_INTERVAL = 1000
 
 
 def create_simulated_event_source(configuration, start, stop):
@@ -28,41 +42,127 @@ def create_simulated_event_source(configuration, start, stop):
     return SimulatedEventSource(configuration, start, stop)
 
 
-def create_event_source(configuration, start, stop):
+def create_event_source(
+    configuration, start, stop, timer=None, offsets=None, consumers=None
+):
     """
     Create an event source.
 
     :param configuration The configuration.
     :param start: The start time.
     :param stop: The stop time.
+    :param timer: Optional StageTimer for recording the processing times.
+    :param offsets: Optional offsets to continue from, e.g. from a checkpoint.
+    :param consumers: Optional dict of consumers keyed on brokers, so a worker
+        process can reuse its connections.
     :return: The created event source.
     """
-    consumer = Consumer(configuration["data_brokers"], configuration["data_topics"])
-    event_source = EventSource(consumer, start, stop)
-
-    if start:
+    brokers = tuple(configuration["data_brokers"])
+    if consumers is not None and brokers in consumers:
+        consumer = consumers[brokers]
+        consumer.assign_topics(configuration["data_topics"])
+    else:
+        consumer = Consumer(configuration["data_brokers"], configuration["data_topics"])
+        if consumers is not None:
+            consumers[brokers] = consumer
+    event_source = EventSource(consumer, start, stop, timer=timer)
+
+    if offsets is not None:
+        event_source.seek_to_offsets(offsets)
+    elif start:
         event_source.seek_to_start_time()
     return event_source
 
 
-def create_histogrammer(configuration, start, stop):
+def create_histogrammer(configuration, start, stop, timer=None, producers=None):
     """
     Create a histogrammer.
 
     :param configuration: The configuration.
     :param start: The start time.
     :param stop: The stop time.
+    :param timer: Optional StageTimer for recording the processing times.
+    :param producers: Optional dict of producers keyed on brokers, so a worker
+        process can reuse its connections.
     :return: The created histogrammer.
     """
-    producer = Producer(configuration["data_brokers"])
-    hist_sink = HistogramSink(producer)
+    brokers = tuple(configuration["data_brokers"])
+    if producers is not None and brokers in producers:
+        producer = producers[brokers]
+    else:
+        producer = Producer(configuration["data_brokers"])
+        if producers is not None:
+            producers[brokers] = producer
+    hist_sink = HistogramSink(producer, timer=timer)
     histograms = HistogramFactory.generate([configuration])
-    return Histogrammer(hist_sink, histograms, start, stop)
+    time_cut = configuration.get("time_cut", TIME_CUTS["MESSAGE"])
+    return Histogrammer(hist_sink, histograms, start, stop, time_cut)
+
+
+def create_load_shedder(configuration, start, stop):
+    """
+    Create a load shedder if an overload policy is configured.
+
+    Only live histograms (i.e. no start or stop) can shed load, otherwise the
+    requested time period would not be fully histogrammed.
+
+    :param configuration: The configuration.
+    :param start: The start time.
+    :param stop: The stop time.
+    :return: The created load shedder or None.
+    """
+    if "overload" not in configuration:
+        return None
+
+    overload = configuration["overload"]
+    policy = overload.get("policy", OVERLOAD_POLICIES["NONE"])
+    if policy == OVERLOAD_POLICIES["NONE"]:
+        return None
+
+    if start or stop:
+        logging.warning("Overload policy ignored as histogram is not live")
+        return None
+
+    return LoadShedder(
+        policy, overload.get("max_lag", 10_000), overload.get("fraction", 0.1)
+    )
+
+
+def create_checkpointer(configuration, start, stop):
+    """
+    Create a checkpointer if checkpointing is configured.
+
+    :param configuration: The configuration.
+    :param start: The start time.
+    :param stop: The stop time.
+    :return: The created checkpointer or None.
+    """
+    if "checkpoint" not in configuration:
+        return None
+
+    checkpoint = configuration["checkpoint"]
+    directory = checkpoint["directory"]
+    os.makedirs(directory, exist_ok=True)
+
+    return Checkpointer(
+        checkpoint_filename(directory, configuration),
+        create_config_hash(configuration, start, stop),
+        int(checkpoint.get("interval", 60) * 1000),
+    )
 
 
 class Processor:
     def __init__(
-        self, histogrammer, event_source, msg_queue, stats_queue, publish_interval
+        self,
+        histogrammer,
+        event_source,
+        msg_queue,
+        stats_queue,
+        publish_interval,
+        timer=None,
+        load_shedder=None,
+        catch_up_batch=1000,
+        checkpointer=None,
     ):
         """
         Constructor.
@@ -72,6 +172,11 @@ class Processor:
         :param msg_queue: The queue for receiving messages from outside the process
         :param stats_queue: The queue for publishing stats to the "outside".
         :param publish_interval: How often to publish histograms and stats in milliseconds.
+        :param timer: Optional StageTimer for recording the processing times.
+        :param load_shedder: Optional LoadShedder for when processing falls behind.
+        :param catch_up_batch: The number of messages to histogram at once when
+            catching up with old data.
+        :param checkpointer: Optional Checkpointer for saving the histograms.
         """
         assert publish_interval > 0
 
@@ -81,7 +186,14 @@ class Processor:
         self.msg_queue = msg_queue
         self.stats_queue = stats_queue
         self.publish_interval = publish_interval
+        self.timer = timer
+        self.load_shedder = load_shedder
+        self.catch_up_batch = catch_up_batch
+        self.checkpointer = checkpointer
         self.processing_finished = False
+        self._next_stop_check_ms = 0
+        self.catching_up = False
+        self._update_catch_up_progress()
 
         # Publish initial empty histograms and stats.
         self.publish_data(time_in_ns())
@@ -93,13 +205,22 @@ class Processor:
         if not self.msg_queue.empty():
             self.processing_finished |= self.process_command_message()
 
-        event_buffer = self.event_source.get_new_data()
-        self.processing_finished |= self.stop_time_exceeded(time_in_ns())
+        if self.catching_up:
+            event_buffer = self._get_catch_up_data()
+        else:
+            event_buffer = self.event_source.get_new_data()
+        self._check_stop_time(time_in_ns())
+
+        if self.load_shedder and event_buffer:
+            event_buffer = self._shed_load(event_buffer)
 
         if event_buffer:
             # Even if the stop time has been exceeded there still may be data
             # in the buffer to add.
-            self.histogrammer.add_data(event_buffer)
+            self._add_data(event_buffer, batch=self.catching_up)
+
+        if self.catching_up:
+            self._update_catch_up_progress()
 
         if self.processing_finished:
             self.histogrammer.set_finished()
@@ -108,8 +229,97 @@ class Processor:
         curr_time = time_in_ns()
         if curr_time // 1_000_000 > self.time_to_publish or self.processing_finished:
             self.publish_data(curr_time)
-            self.time_to_publish = curr_time // 1_000_000 + self.publish_interval
-            self.time_to_publish -= self.time_to_publish % self.publish_interval
+            interval = self.publish_interval
+            if self.catching_up:
+                interval *= CATCH_UP_PUBLISH_FACTOR
+            self.time_to_publish = curr_time // 1_000_000 + interval
+            self.time_to_publish -= self.time_to_publish % interval
+
+        if self.checkpointer:
+            if (
+                self.checkpointer.is_due(curr_time // 1_000_000)
+                or self.processing_finished
+            ):
+                self.save_checkpoint(curr_time)
+
+    def save_checkpoint(self, current_time):
+        """
+        Save the histograms and the consumer position.
+
+        :param current_time: The current time in ns.
+        """
+        started = self.timer.start() if self.timer else None
+        self.checkpointer.save(
+            self.histogrammer.histograms,
+            self.event_source.get_positions(),
+            current_time // 1_000_000,
+        )
+        if self.timer:
+            self.timer.stop("checkpoint", started)
+
+    def _check_stop_time(self, current_time):
+        # Looking up the stop time in Kafka is a request to the broker, so it is
+        # not done on every poll while catching up. The histogrammer discards
+        # any data after the stop time in the meantime.
+        current_time_ms = current_time // 1_000_000
+        if self.catching_up and current_time_ms < self._next_stop_check_ms:
+            if self.histogrammer.time_cut == TIME_CUTS["PULSE"]:
+                # A pulse after the stop time needs no request to Kafka.
+                exceeded = self.histogrammer.check_stop_time_exceeded(None)
+                self.processing_finished |= exceeded
+            return
+        self._next_stop_check_ms = current_time_ms + CATCH_UP_STOP_CHECK_INTERVAL
+        self.processing_finished |= self.stop_time_exceeded(current_time)
+
+    def _get_catch_up_data(self):
+        # Keep polling until there is a decent amount of data to histogram in
+        # one go, there is nothing more available or the end of the backlog has
+        # been reached (rather than waiting for a poll to come back empty).
+        event_buffer = []
+        while len(event_buffer) < self.catch_up_batch:
+            new_data = self.event_source.get_new_data(
+                max_records=self.catch_up_batch - len(event_buffer)
+            )
+            if not new_data:
+                break
+            event_buffer.extend(new_data)
+            progress = self.event_source.catch_up_progress()
+            if progress is None or progress >= 1:
+                break
+        return event_buffer
+
+    def _update_catch_up_progress(self):
+        progress = self.event_source.catch_up_progress()
+        was_catching_up = self.catching_up
+        self.catching_up = progress is not None and progress < 1
+        self.histogrammer.catch_up_progress = progress if self.catching_up else None
+
+        if self.catching_up and not was_catching_up:
+            logging.info("Catching up with old data")
+        elif was_catching_up and not self.catching_up:
+            logging.info("Caught up so switching to live processing")
+
+    def _shed_load(self, event_buffer):
+        lag = self.event_source.get_lag(time_in_ns() // 1_000_000)
+        lag_messages = sum(partition["messages"] for partition in lag)
+        event_buffer = self.load_shedder.shed(
+            event_buffer, lag_messages, self.event_source
+        )
+        self.histogrammer.dropped_events = self.load_shedder.dropped_events
+        return event_buffer
+
+    def _add_data(self, event_buffer, batch=False):
+        if not self.timer:
+            self.histogrammer.add_data(event_buffer, batch=batch)
+            return
+
+        started = self.timer.start()
+        self.histogrammer.add_data(event_buffer, batch=batch)
+        self.timer.stop("binning", started)
+        self.timer.add_count("messages", len(event_buffer))
+        self.timer.add_count(
+            "events", sum(len(msg.detector_id) for _, _, msg in event_buffer)
+        )
 
     def stop_time_exceeded(self, wall_clock):
         """
@@ -120,9 +330,25 @@ class Processor:
         If Kafka has no opinion (due to a lack of event messages) then the
         histogrammer makes a decision based on the wall-clock time.
 
+        If the start and stop apply to the pulse times then Kafka's view is
+        ignored as it is based on the message times; the histogrammer decides
+        based on the pulse times it has seen. Only if there is no more data to
+        read (e.g. Kafka has no opinion or the consumer is at the end of the
+        topic) does the wall-clock decide, otherwise a historical window would
+        finish before its backlog had been read.
+
         :param wall_clock:
         :return: True, if stop time has been exceeded.
         """
+        if self.histogrammer.time_cut == TIME_CUTS["PULSE"]:
+            wall_clock_ms = wall_clock // 1_000_000
+            if not self._is_out_of_data(wall_clock_ms):
+                wall_clock_ms = None
+            if self.histogrammer.check_stop_time_exceeded(wall_clock_ms):
+                logging.info("Stop time exceeded according to pulse time")
+                return True
+            return False
+
         event_source_status = self.event_source.stop_time_exceeded()
 
         if event_source_status == StopTimeStatus.EXCEEDED:
@@ -136,6 +362,12 @@ class Processor:
                 return True
         return False
 
+    def _is_out_of_data(self, current_time_ms):
+        lag = self.event_source.get_lag(current_time_ms)
+        if sum(partition["messages"] for partition in lag) == 0:
+            return True
+        return self.event_source.stop_time_exceeded() == StopTimeStatus.UNKNOWN
+
     def process_command_message(self):
         """
         Processes any messages received from outside.
@@ -143,14 +375,34 @@ class Processor:
         :return: True, if a stop has been requested.
         """
         msg = self.msg_queue.get(block=True, timeout=0.05)
-        if msg == "stop":
+        if isinstance(msg, dict) and msg.get("cmd") == "reconfigure":
+            self.reconfigure(msg["config"])
+        elif msg == "stop":
             logging.info("Stopping histogramming process")
             return True
         elif msg == "clear":
             logging.info("Clearing histograms")
             self.histogrammer.clear_histograms()
+            if self.load_shedder:
+                self.load_shedder.reset_counts()
+                self.histogrammer.dropped_events = 0
+            if self.checkpointer:
+                # Otherwise a restart would restore the old counts.
+                self.save_checkpoint(time_in_ns())
         return False
 
+    def reconfigure(self, configuration):
+        """
+        Replace the histograms while keeping the event source, so no data is
+        missed.
+
+        :param configuration: The new histogramming configuration.
+        """
+        logging.info("Reconfiguring histograms")
+        self.histogrammer.replace_histograms(HistogramFactory.generate([configuration]))
+        # Publish the new histograms straightaway.
+        self.time_to_publish = 0
+
     def publish_data(self, current_time):
         """
         Publish data, both histograms and statistics.
@@ -160,7 +412,31 @@ class Processor:
         self.histogrammer.publish_histograms(current_time)
         hist_stats = self.histogrammer.get_histogram_stats()
         logging.info("%s", json.dumps(hist_stats))
-        self.stats_queue.put(hist_stats)
+        process_stats = self.timer.get_stats() if self.timer else {}
+        process_stats.update(self._get_lag_stats(current_time // 1_000_000))
+        if self.load_shedder:
+            process_stats["dropped-events"] = self.load_shedder.dropped_events
+            process_stats["dropped-messages"] = self.load_shedder.dropped_messages
+        if self.catching_up:
+            process_stats["catch-up-progress"] = self.histogrammer.catch_up_progress
+        self.stats_queue.put({"histograms": hist_stats, "process": process_stats})
+
+    def _get_lag_stats(self, current_time_ms):
+        lag = self.event_source.get_lag(current_time_ms)
+        if not lag:
+            return {}
+
+        stats = {}
+        for i, partition_lag in enumerate(lag):
+            for name, value in partition_lag.items():
+                stats[f"lag-{i}-{name}"] = value
+
+        # Overall values for alerting on
+        stats["lag-messages"] = sum(p["messages"] for p in lag)
+        time_lags = [p["time-ms"] for p in lag if "time-ms" in p]
+        if time_lags:
+            stats["lag-time-ms"] = max(time_lags)
+        return stats
 
 
 def run_processing(
@@ -171,6 +447,9 @@ def run_processing(
     stop,
     publish_interval,
     simulation=False,
+    collect_timings=True,
+    producers=None,
+    consumers=None,
 ):
     """
     The target to run in a multi-processing instance for histogramming.
@@ -189,25 +468,51 @@ def run_processing(
     :param stop: The stop time.
     :param publish_interval: How often to publish histograms and stats in milliseconds.
     :param simulation: Whether to run in simulation.
+    :param collect_timings: Whether to record and publish the processing times.
+    :param producers: Optional dict of producers to reuse, keyed on brokers.
+    :param consumers: Optional dict of consumers to reuse, keyed on brokers.
     """
     histogrammer = None
     try:
         # Setting up
-        histogrammer = create_histogrammer(configuration, start, stop)
+        timer = StageTimer() if collect_timings else None
+        histogrammer = create_histogrammer(
+            configuration, start, stop, timer=timer, producers=producers
+        )
 
+        checkpointer = None
         if simulation:
             event_source = create_simulated_event_source(configuration, start, stop)
         else:
-            event_source = create_event_source(configuration, start, stop)
+            checkpointer = create_checkpointer(configuration, start, stop)
+            offsets = None
+            if checkpointer:
+                offsets = checkpointer.restore(histogrammer.histograms)
+            event_source = create_event_source(
+                configuration,
+                start,
+                stop,
+                timer=timer,
+                offsets=offsets,
+                consumers=consumers,
+            )
 
         processor = Processor(
-            histogrammer, event_source, msg_queue, stats_queue, publish_interval
+            histogrammer,
+            event_source,
+            msg_queue,
+            stats_queue,
+            publish_interval,
+            timer=timer,
+            load_shedder=create_load_shedder(configuration, start, stop),
+            checkpointer=checkpointer,
         )
 
         # Start up the processing
         while not processor.processing_finished:
             processor.run_processing()
-            time.sleep(0.01)
+            if not processor.catching_up:
+                time.sleep(0.01)
     except Exception as error:
         logging.error("Histogram process failed: %s", error)
         if histogrammer:
@@ -226,6 +531,7 @@ class HistogramProcess:
         stop_time,
         publish_interval=500,
         simulation=False,
+        collect_timings=True,
     ):
         """
         Constructor.
@@ -235,9 +541,14 @@ class HistogramProcess:
         :param stop_time: The stop time.
         :param publish_interval: How often to publish histograms and stats in milliseconds.
         :param simulation: Whether to run in simulation.
+        :param collect_timings: Whether to record and publish the processing times.
         """
+        self.configuration = configuration
+        self.start_time = start_time
+        self.stop_time = stop_time
         self._msg_queue = Queue()
         self._stats_queue = Queue()
+        self._process_stats = None
         self._process = Process(
             target=run_processing,
             args=(
@@ -248,6 +559,7 @@ class HistogramProcess:
                 stop_time,
                 publish_interval,
                 simulation,
+                collect_timings,
             ),
         )
 
@@ -263,13 +575,53 @@ class HistogramProcess:
 
             self._process.join()
 
+    def is_alive(self):
+        return self._process.is_alive()
+
     def clear(self):
         if self._process.is_alive():
             self._msg_queue.put("clear")
 
+    def reconfigure(self, configuration):
+        """
+        Change the histograms without restarting the process.
+
+        Only the histogram settings can change, not the brokers, topics etc.
+
+        :param configuration: The new histogramming configuration.
+        :return: True, if the request was sent.
+        """
+        if not self._process.is_alive():
+            return False
+        self._msg_queue.put({"cmd": "reconfigure", "config": configuration})
+        self.configuration = configuration
+        return True
+
     def get_stats(self):
+        """
+        Get the most recent histogram statistics.
+
+        The accompanying process statistics are kept for get_process_stats.
+
+        :return: The histogram statistics or None if nothing new.
+        """
         # Empty the queue and only return the most recent value
         most_recent = None
         while not self._stats_queue.empty():
             most_recent = self._stats_queue.get(False)
-        return most_recent
+
+        if most_recent is None:
+            return None
+        self._process_stats = most_recent["process"]
+        return most_recent["histograms"]
+
+    def get_process_stats(self):
+        """
+        Get the process statistics (timings etc.) that arrived with the most
+        recent histogram statistics.
+
+        :return: The process statistics or None if nothing new.
+        """
+        process_stats = self._process_stats
+        self._process_stats = None
+        return process_stats
@@ -1,6 +1,11 @@
 import json
 import logging
 
+import numpy as np
+
+from just_bin_it.histograms.backing_store import flush_histogram_array
+from just_bin_it.histograms.rebinning import create_pyramid
+
 HISTOGRAM_STATES = {
     "COUNTING": "COUNTING",
     "FINISHED": "FINISHED",
@@ -8,54 +13,127 @@ HISTOGRAM_STATES = {
     "ERROR": "ERROR",
 }
 
+# What start and stop are compared against.
+TIME_CUTS = {"MESSAGE": "message", "PULSE": "pulse"}
+
 
 class Histogrammer:
-    def __init__(self, histogram_sink, histograms, start=None, stop=None):
+    def __init__(
+        self,
+        histogram_sink,
+        histograms,
+        start=None,
+        stop=None,
+        time_cut=TIME_CUTS["MESSAGE"],
+    ):
         """
         Constructor.
 
-        All times are given in ns since the Unix epoch.
+        Start and stop are given in ms since the Unix epoch.
 
         :param histogram_sink: The producer for the sink.
         :param histograms: The histograms.
         :param start: When to start histogramming from.
         :param stop: When to histogram until.
+        :param time_cut: Whether start and stop apply to the Kafka message time
+            or the pulse time.
         """
         self.histograms = histograms
         self.hist_sink = histogram_sink
         self.start = start
         self.stop = stop
+        self.time_cut = time_cut
         self._stop_time_exceeded = False
         self._stop_publishing = False
         self._started = False
         self._stop_leeway = 5000
         self._previous_sum = [0 for _ in self.histograms]
+        # Events not histogrammed because of load-shedding.
+        self.dropped_events = 0
+        # How far through the backlog of old data, None if not catching up.
+        self.catch_up_progress = None
 
-    def add_data(self, event_buffer, simulation=False):
+    def add_data(self, event_buffer, simulation=False, batch=False):
         """
         Add the event data to the histogram(s).
 
         :param event_buffer: The new data received.
         :param simulation: Indicates whether in simulation.
+        :param batch: Combine the messages from each source so each histogram
+            only bins once, this is quicker for many small messages.
         """
-        for hist in self.histograms:
-            for msg_time, _, msg in event_buffer:
-                if self.start:
-                    if msg_time < self.start:
-                        continue
-                if self.stop:
-                    if msg_time > self.stop:
-                        self._stop_time_exceeded = True
-                        continue
+        messages = self._filter_by_time(event_buffer)
 
-                self._started = True
+        if not messages or not self.histograms:
+            return
 
+        self._started = True
+
+        combined = self._combine_by_source(messages) if batch else messages
+
+        for hist in self.histograms:
+            # Some histograms need the pulse time of every message.
+            hist_messages = (
+                messages if getattr(hist, "uses_pulse_time", False) else combined
+            )
+            for msg in hist_messages:
                 pt = msg.pulse_time
                 x = msg.time_of_flight
                 y = msg.detector_id
                 src = msg.source_name if not simulation else hist.source
                 hist.add_data(pt, x, y, src)
 
+    def _filter_by_time(self, event_buffer):
+        if not self.start and not self.stop:
+            return [msg for _, _, msg in event_buffer]
+
+        if self.time_cut == TIME_CUTS["PULSE"]:
+            # Pulse times are in ns
+            times = np.fromiter(
+                (msg.pulse_time for _, _, msg in event_buffer),
+                dtype=np.int64,
+                count=len(event_buffer),
+            )
+            scale = 1_000_000
+        else:
+            times = np.fromiter(
+                (msg_time for msg_time, _, _ in event_buffer),
+                dtype=np.int64,
+                count=len(event_buffer),
+            )
+            scale = 1
+
+        keep = np.ones(len(event_buffer), dtype=bool)
+        if self.start:
+            keep &= times >= self.start * scale
+        if self.stop:
+            after_stop = times > self.stop * scale
+            if after_stop.any():
+                self._stop_time_exceeded = True
+            keep &= ~after_stop
+
+        return [event_buffer[i][2] for i in np.flatnonzero(keep)]
+
+    @staticmethod
+    def _combine_by_source(messages):
+        by_source = {}
+        for msg in messages:
+            by_source.setdefault(msg.source_name, []).append(msg)
+
+        combined = []
+        for msgs in by_source.values():
+            if len(msgs) == 1:
+                combined.append(msgs[0])
+                continue
+            # Keep the most recent pulse time.
+            combined.append(
+                msgs[-1]._replace(
+                    time_of_flight=np.concatenate([m.time_of_flight for m in msgs]),
+                    detector_id=np.concatenate([m.detector_id for m in msgs]),
+                )
+            )
+        return combined
+
     def publish_histograms(self, timestamp=0):
         """
         Publish histogram data to the histogram sink.
@@ -69,6 +147,20 @@ class Histogrammer:
             info = self._generate_info(h)
             logging.info(info)
             self.hist_sink.send_histogram(h.topic, h, timestamp, json.dumps(info))
+            self._publish_pyramid(h, info, timestamp)
+            # So any backing file is as up-to-date as what was published.
+            flush_histogram_array(h.data)
+
+    def _publish_pyramid(self, histogram, info, timestamp):
+        levels = getattr(histogram, "pyramid", None)
+        if not levels:
+            return
+
+        for rebinned in create_pyramid(histogram, levels):
+            level_info = dict(info, rebin_factor=rebinned.factor)
+            self.hist_sink.send_histogram(
+                rebinned.topic, rebinned, timestamp, json.dumps(level_info)
+            )
 
     def _generate_info(self, histogram):
         info = {"id": histogram.identifier}
@@ -78,6 +170,12 @@ class Histogrammer:
         if self.stop:
             info["stop"] = self.stop
 
+        if self.dropped_events:
+            info["dropped_events"] = self.dropped_events
+
+        if self.catch_up_progress is not None:
+            info["catch_up_progress"] = self.catch_up_progress
+
         if self._stop_time_exceeded:
             info["state"] = HISTOGRAM_STATES["FINISHED"]
             self._stop_publishing = True
@@ -96,6 +194,17 @@ class Histogrammer:
             hist.clear_data()
             self._previous_sum[i] = 0
 
+    def replace_histograms(self, histograms):
+        """
+        Swap in new histograms, e.g. after a reconfiguration.
+
+        The histograms start empty but the times etc. are unchanged.
+
+        :param histograms: The new histograms.
+        """
+        self.histograms = histograms
+        self._previous_sum = [0 for _ in self.histograms]
+
     def get_histogram_stats(self):
         """
         Get the stats for all the histograms.
@@ -123,7 +232,8 @@ class Histogrammer:
         Checks whether the stop time has been exceeded, if so
         then stop histogramming.
 
-        :param timestamp: The timestamp to check against.
+        :param timestamp: The timestamp to check against, None to only go by
+            the data received.
         :return: True, if exceeded.
         """
         # Do nothing if there is no stop time
@@ -135,7 +245,7 @@ class Histogrammer:
             return True
 
         # Give it some leeway
-        if timestamp > self.stop + self._stop_leeway:
+        if timestamp is not None and timestamp > self.stop + self._stop_leeway:
             self._stop_time_exceeded = True
 
         return self._stop_time_exceeded
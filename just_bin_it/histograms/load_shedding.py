@@ -0,0 +1,82 @@
+import logging
+
+import numpy as np
+
+from just_bin_it.exceptions import JustBinItException
+
+OVERLOAD_POLICIES = {"NONE": "none", "SAMPLE": "sample", "SKIP": "skip"}
+
+
+class LoadShedder:
+    """
+    Reduces the amount of data processed when the consumer falls behind.
+
+    Policies:
+      * none - process everything;
+      * sample - only histogram a fraction of the events in each message;
+      * skip - jump to the latest messages in Kafka.
+
+    The number of events not histogrammed is recorded so it can be reported.
+    """
+
+    def __init__(self, policy="none", max_lag=10_000, fraction=0.1):
+        """
+        Constructor.
+
+        :param policy: The overload policy.
+        :param max_lag: How many messages behind before it is considered overloaded.
+        :param fraction: The fraction of events to keep when sampling.
+        """
+        if policy not in OVERLOAD_POLICIES.values():
+            raise JustBinItException(f"Unrecognised overload policy: {policy}")
+        if not 0 < fraction <= 1:
+            raise JustBinItException("Overload sample fraction must be in (0, 1]")
+        if max_lag < 0:
+            raise JustBinItException("Overload max lag cannot be negative")
+
+        self.policy = policy
+        self.max_lag = max_lag
+        self.step = max(1, int(round(1 / fraction)))
+        self.dropped_events = 0
+        self.dropped_messages = 0
+        self._total_events = 0
+        self._total_messages = 0
+
+    def shed(self, event_buffer, lag_messages, event_source):
+        """
+        Apply the overload policy to the new data.
+
+        :param event_buffer: The new data.
+        :param lag_messages: How many messages behind the consumer is.
+        :param event_source: The event source, so it can skip forward.
+        :return: The data to histogram.
+        """
+        self._total_messages += len(event_buffer)
+        self._total_events += sum(len(msg.detector_id) for _, _, msg in event_buffer)
+
+        if self.policy == OVERLOAD_POLICIES["NONE"] or lag_messages <= self.max_lag:
+            return event_buffer
+
+        if self.policy == OVERLOAD_POLICIES["SKIP"]:
+            skipped = event_source.skip_to_latest()
+            logging.warning("Overloaded so skipped %s messages", skipped)
+            self.dropped_messages += skipped
+            # The skipped messages were never read, so estimate the events.
+            average = self._total_events / max(self._total_messages, 1)
+            self.dropped_events += int(skipped * average)
+            return event_buffer
+
+        return [
+            self._sample(msg_time, offset, msg)
+            for msg_time, offset, msg in event_buffer
+        ]
+
+    def _sample(self, msg_time, offset, msg):
+        tofs = np.asarray(msg.time_of_flight)[:: self.step]
+        dets = np.asarray(msg.detector_id)[:: self.step]
+        self.dropped_events += len(msg.detector_id) - len(dets)
+        return msg_time, offset, msg._replace(time_of_flight=tofs, detector_id=dets)
+
+    def reset_counts(self):
+        self.dropped_events = 0
+        self.dropped_messages = 0
@@ -0,0 +1,310 @@
+import logging
+
+import numpy as np
+
+from just_bin_it.exceptions import JustBinItException
+from just_bin_it.histograms.backing_store import create_histogram_array
+from just_bin_it.histograms.roi import apply_roi
+from just_bin_it.histograms.unit_conversion import convert_tofs
+
+AXIS_QUANTITIES = {
+    "TOF": "tof",
+    "DET_ID": "det_id",
+    "PIXEL_X": "pixel_x",
+    "PIXEL_Y": "pixel_y",
+    "PULSE_PHASE": "pulse_phase",
+}
+
+# How close, as a fraction of a bin, a value must be to an edge to be checked
+# against it when binning.
+EDGE_TOLERANCE = 1e-6
+
+
+class Axis:
+    """
+    A regular (equal width bins) histogram axis for one event quantity.
+
+    Supported quantities:
+      * tof - the time-of-flight, optionally converted into other units (e.g.
+        wavelength) using a factor for each detector;
+      * det_id - the detector ID;
+      * pixel_x - the column of the detector, from the ID and the width;
+      * pixel_y - the row of the detector, from the ID, width and height;
+      * pulse_phase - the arrival time (pulse time + time-of-flight) folded by
+        the period, e.g. for checking for frame overlap.
+
+    As for numpy, the bins include their lower edge and, by default, the last
+    bin also includes the upper edge.
+    """
+
+    def __init__(
+        self,
+        quantity,
+        num_bins=None,
+        value_range=None,
+        width=None,
+        height=None,
+        period=None,
+        conversion=None,
+        include_upper_edge=True,
+    ):
+        """
+        Constructor.
+
+        :param quantity: The quantity to bin, see AXIS_QUANTITIES.
+        :param num_bins: The number of bins (not needed for pixel axes).
+        :param value_range: The range to bin over (not needed for pixel or
+            pulse phase axes).
+        :param width: The detector width (pixel axes only).
+        :param height: The detector height (pixel_y only).
+        :param period: The period in ns to fold the times by (pulse_phase only).
+        :param conversion: Optional lookup table of the factor to multiply the
+            time-of-flight by for each detector (tof only).
+        :param include_upper_edge: Whether values equal to the upper edge go in
+            the last bin or are out of range.
+        """
+        if quantity not in AXIS_QUANTITIES.values():
+            raise JustBinItException(f"Unrecognised axis quantity: {quantity}")
+
+        self.quantity = quantity
+        self.width = width
+        self.height = height
+        self.period = period
+        self.conversion = conversion
+        self.include_upper_edge = include_upper_edge
+
+        if quantity == AXIS_QUANTITIES["PIXEL_X"]:
+            self._check_positive_int(width, "width")
+            num_bins, value_range = width, (0, width)
+        elif quantity == AXIS_QUANTITIES["PIXEL_Y"]:
+            self._check_positive_int(width, "width")
+            self._check_positive_int(height, "height")
+            num_bins, value_range = height, (0, height)
+        elif quantity == AXIS_QUANTITIES["PULSE_PHASE"]:
+            if not isinstance(period, (int, float)) or period <= 0:
+                raise JustBinItException("Pulse phase axis needs a positive period")
+            value_range = (0, period)
+
+        self._check_positive_int(num_bins, "number of bins")
+        if (
+            not isinstance(value_range, (list, tuple))
+            or len(value_range) != 2
+            or value_range[0] >= value_range[1]
+        ):
+            raise JustBinItException(f"Invalid range for {quantity} axis")
+
+        self.num_bins = num_bins
+        self.range = tuple(value_range)
+        self.edges = np.linspace(self.range[0], self.range[1], num_bins + 1)
+        self._scale = num_bins / (self.range[1] - self.range[0])
+
+    @staticmethod
+    def _check_positive_int(value, name):
+        if not isinstance(value, int) or value < 1:
+            raise JustBinItException(f"Axis {name} must be a positive integer")
+
+    def get_values(self, pulse_time, tofs, det_ids):
+        """
+        Calculate the values of the quantity for each event.
+
+        :param pulse_time: The pulse time.
+        :param tofs: The time-of-flight data as a numpy array.
+        :param det_ids: The detector IDs as a numpy array of int64.
+        :return: The values.
+        """
+        if self.quantity == AXIS_QUANTITIES["TOF"]:
+            if self.conversion is not None:
+                return convert_tofs(self.conversion, tofs, det_ids)
+            return tofs
+        if self.quantity == AXIS_QUANTITIES["DET_ID"]:
+            return det_ids
+        if self.quantity == AXIS_QUANTITIES["PIXEL_X"]:
+            return (det_ids - 1) % self.width
+        if self.quantity == AXIS_QUANTITIES["PIXEL_Y"]:
+            return ((det_ids - 1) // self.width) % self.height
+        # Pulse times are about 1e18 ns and the tofs are often uint32, so
+        # working in int64 avoids overflow.
+        return (np.int64(pulse_time) + tofs.astype(np.int64)) % self.period
+
+    def get_indices(self, pulse_time, tofs, det_ids):
+        """
+        Calculate the bin index for each event.
+
+        :param pulse_time: The pulse time.
+        :param tofs: The time-of-flight data as a numpy array.
+        :param det_ids: The detector IDs as a numpy array of int64.
+        :return: Tuple of the bin indices and which events are in range.
+        """
+        values = self.get_values(pulse_time, tofs, det_ids)
+        low, high = self.range
+        if self.include_upper_edge:
+            valid = (values >= low) & (values <= high)
+        else:
+            valid = (values >= low) & (values < high)
+        if self.quantity in [AXIS_QUANTITIES["PIXEL_X"], AXIS_QUANTITIES["PIXEL_Y"]]:
+            # Detector IDs start at 1
+            valid &= det_ids > 0
+            # There is a bin per pixel, so the values are the indices.
+            return values, valid
+
+        # Only convert the values in range, as NaNs etc. cannot be cast.
+        in_range = values[valid]
+        scaled = (in_range - low) * self._scale
+        in_range_indices = scaled.astype(np.intp)
+        # Rounding can put values next to an edge in the neighbouring bin, so,
+        # as numpy does, check them against the edges themselves. Only values
+        # very close to an edge need checking.
+        scaled -= in_range_indices
+        near_edge = np.flatnonzero(
+            (scaled < EDGE_TOLERANCE) | (scaled > 1 - EDGE_TOLERANCE)
+        )
+        if len(near_edge):
+            in_range_indices[near_edge] = self._correct_indices(
+                in_range[near_edge], in_range_indices[near_edge]
+            )
+
+        indices = np.zeros(len(values), dtype=np.intp)
+        indices[valid] = in_range_indices
+        return indices, valid
+
+    def _correct_indices(self, values, indices):
+        # Values on the upper edge go in the last bin.
+        np.minimum(indices, self.num_bins - 1, out=indices)
+        indices -= values < self.edges[indices]
+        indices += (values >= self.edges[indices + 1]) & (indices != self.num_bins - 1)
+        return indices
+
+
+class NdHistogram:
+    """
+    Histogram with any number of regular axes.
+
+    Each event is given a single index into the flattened histogram, combined
+    from the bin index along each axis, and then all the events are added in
+    one pass.
+    """
+
+    def __init__(
+        self,
+        topic,
+        axes,
+        det_range=None,
+        source="",
+        identifier="",
+        backing_file=None,
+        roi=None,
+    ):
+        """
+        Constructor.
+
+        :param topic: The name of the Kafka topic to publish to.
+        :param axes: List of Axis.
+        :param det_range: Only include data from this inclusive detector range.
+        :param source: The data source to histogram.
+        :param identifier: An optional identifier for the histogram.
+        :param backing_file: Optional file to memory-map the histogram data to.
+        :param roi: Optional lookup table of the detectors to include.
+        """
+        if not axes:
+            raise JustBinItException("Histogram must have at least one axis")
+
+        self._histogram = None
+        self.axes = axes
+        self.edges = [axis.edges for axis in axes]
+        self.x_edges = self.edges[0]
+        # Serialisation etc. only expect y edges for 2-D (or more) histograms.
+        if len(axes) > 1:
+            self.y_edges = self.edges[1]
+        self.det_range = det_range
+        self.topic = topic
+        self.last_pulse_time = 0
+        self.identifier = identifier
+        self.source = source if source.strip() != "" else None
+        self.backing_file = backing_file
+        self.roi = roi
+        self._needs_det_ids = det_range is not None or any(
+            axis.quantity != AXIS_QUANTITIES["TOF"] or axis.conversion is not None
+            for axis in axes
+        )
+
+        self._intialise_histogram()
+
+    def _intialise_histogram(self):
+        """
+        Create a zeroed histogram with the correct shape.
+        """
+        self._histogram = create_histogram_array(
+            tuple(axis.num_bins for axis in self.axes), self.backing_file
+        )
+
+    def add_data(self, pulse_time, tofs, det_ids=None, source=""):
+        """
+        Add data to the histogram.
+
+        :param pulse_time: The pulse time.
+        :param tofs: The time-of-flight data.
+        :param det_ids: The detector ids.
+        :param source: The source of the event.
+        """
+        # Discard any messages not from the specified source.
+        if self.source is not None and source != self.source:
+            return
+
+        if self.roi is not None and det_ids is not None:
+            tofs, det_ids = apply_roi(self.roi, tofs, det_ids)
+
+        self.last_pulse_time = pulse_time
+
+        tofs = np.asarray(tofs)
+        if self._needs_det_ids:
+            det_ids = np.asarray(det_ids, dtype=np.int64)
+
+        self._add_events(pulse_time, tofs, det_ids)
+
+    def _add_events(self, pulse_time, tofs, det_ids):
+        flat_indices = None
+        valid = None
+        if self.det_range:
+            valid = (det_ids >= self.det_range[0]) & (det_ids <= self.det_range[1])
+
+        for axis in self.axes:
+            indices, axis_valid = axis.get_indices(pulse_time, tofs, det_ids)
+            valid = axis_valid if valid is None else valid & axis_valid
+            if flat_indices is None:
+                flat_indices = indices
+            else:
+                flat_indices = flat_indices * axis.num_bins + indices
+
+        self._accumulate(flat_indices[valid])
+
+    def _accumulate(self, flat_indices):
+        flat_histogram = self._histogram.reshape(-1)
+        if len(flat_indices) * 8 >= flat_histogram.size:
+            flat_histogram += np.bincount(flat_indices, minlength=flat_histogram.size)
+        else:
+            # Much quicker when there are far fewer events than bins.
+            np.add.at(flat_histogram, flat_indices, 1)
+
+    def use_array(self, array):
+        """
+        Add the data to the given array from now on, e.g. so it can be swapped.
+
+        :param array: The array, which must have the same shape as the data.
+        """
+        self._histogram = array
+
+    @property
+    def data(self):
+        return self._histogram
+
+    @property
+    def shape(self):
+        return self._histogram.shape
+
+    def clear_data(self):
+        """
+        Clears the histogram data, but maintains the other values (e.g. edges etc.)
+        """
+        logging.info("Clearing data")  # pragma: no mutate
+        # Zero in place so any backing file is reused.
+        self._histogram.fill(0)
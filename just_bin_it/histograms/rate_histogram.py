@@ -0,0 +1,156 @@
+import logging
+
+import numpy as np
+
+from just_bin_it.histograms.backing_store import create_histogram_array
+from just_bin_it.histograms.roi import apply_roi
+
+
+class RateHistogram:
+    """
+    Histogram of the number of events against pulse time.
+
+    Only the most recent bins are kept: when the pulse time goes beyond the
+    last bin, the bins are shifted along and the oldest are dropped, so the
+    memory used is constant however long it runs.
+    """
+
+    # The events need binning by the pulse time of each message, so the
+    # messages must not be combined.
+    uses_pulse_time = True
+    # The edges move along with the pulse time.
+    moving_edges = True
+
+    def __init__(
+        self,
+        topic,
+        num_bins,
+        bin_width,
+        source="",
+        identifier="",
+        backing_file=None,
+        roi=None,
+    ):
+        """
+        Constructor.
+
+        :param topic: The name of the Kafka topic to publish to.
+        :param num_bins: The number of time bins to keep.
+        :param bin_width: The width of each bin in ns.
+        :param source: The data source to histogram.
+        :param identifier: An optional identifier for the histogram.
+        :param backing_file: Optional file to memory-map the histogram data to.
+        :param roi: Optional lookup table of the detectors to include.
+        """
+        self._histogram = None
+        self.x_edges = None
+        self.num_bins = num_bins
+        self.bin_width = bin_width
+        self.topic = topic
+        self.last_pulse_time = 0
+        self.identifier = identifier
+        self.source = source if source.strip() != "" else None
+        self.backing_file = backing_file
+        self.roi = roi
+        # The pulse time corresponding to the start of the first bin.
+        self._origin = None
+
+        self._intialise_histogram()
+
+    def _intialise_histogram(self):
+        """
+        Create a zeroed histogram with the correct shape.
+        """
+        self._histogram = create_histogram_array((self.num_bins,), self.backing_file)
+        self._update_edges()
+
+    def _update_edges(self):
+        origin = self._origin if self._origin is not None else 0
+        self.x_edges = origin + np.arange(self.num_bins + 1) * float(self.bin_width)
+
+    def add_data(self, pulse_time, tofs, det_ids=None, source=""):
+        """
+        Add data to the histogram.
+
+        :param pulse_time: The pulse time.
+        :param tofs: The time-of-flight data.
+        :param det_ids: The detector ids.
+        :param source: The source of the event.
+        """
+        # Discard any messages not from the specified source.
+        if self.source is not None and source != self.source:
+            return
+
+        if self.roi is not None and det_ids is not None:
+            tofs, det_ids = apply_roi(self.roi, tofs, det_ids)
+
+        self.last_pulse_time = pulse_time
+
+        if self._origin is None:
+            # Start with the current pulse in the last bin.
+            first_bin = pulse_time // self.bin_width - self.num_bins + 1
+            self._origin = first_bin * self.bin_width
+            self._update_edges()
+
+        index = (pulse_time - self._origin) // self.bin_width
+        if index >= self.num_bins:
+            self._slide(index - self.num_bins + 1)
+            index = self.num_bins - 1
+        elif index < 0:
+            # Too old to be shown.
+            return
+
+        self._histogram[index] += len(det_ids) if det_ids is not None else len(tofs)
+
+    def _slide(self, num_bins):
+        if num_bins >= self.num_bins:
+            self._histogram.fill(0)
+        else:
+            self._histogram[:-num_bins] = self._histogram[num_bins:]
+            self._histogram[-num_bins:] = 0
+        self._origin += num_bins * self.bin_width
+        self._update_edges()
+
+    def use_array(self, array):
+        """
+        Add the data to the given array from now on, e.g. so it can be swapped.
+
+        :param array: The array, which must have the same shape as the data.
+        """
+        self._histogram = array
+
+    def get_checkpoint_state(self):
+        """
+        Get the values, other than the data, needed to carry on from a checkpoint.
+
+        :return: Dict of the values as arrays.
+        """
+        if self._origin is None:
+            return {}
+        return {"origin": np.array(self._origin)}
+
+    def restore_checkpoint_state(self, data, state):
+        """
+        Carry on from a checkpoint.
+
+        :param data: The saved histogram data.
+        :param state: The saved values from get_checkpoint_state.
+        """
+        self._histogram[...] = data
+        self._origin = state["origin"].item() if "origin" in state else None
+        self._update_edges()
+
+    @property
+    def data(self):
+        return self._histogram
+
+    @property
+    def shape(self):
+        return self._histogram.shape
+
+    def clear_data(self):
+        """
+        Clears the histogram data, but maintains the other values (e.g. edges etc.)
+        """
+        logging.info("Clearing data")  # pragma: no mutate
+        self._histogram.fill(0)
@@ -0,0 +1,85 @@
+import numpy as np
+
+
+def rebin(data, factor):
+    """
+    Reduce the resolution of a histogram by summing blocks of bins.
+
+    If the number of bins is not a multiple of the factor then the last block
+    along that axis is smaller.
+
+    :param data: The histogram data.
+    :param factor: How many bins to combine along each axis.
+    :return: The rebinned data.
+    """
+    for axis in range(data.ndim):
+        data = np.add.reduceat(data, np.arange(0, data.shape[axis], factor), axis=axis)
+    return data
+
+
+def rebin_edges(edges, factor):
+    """
+    Get the bin edges corresponding to the rebinned data.
+
+    :param edges: The original bin edges.
+    :param factor: How many bins are combined.
+    :return: The new bin edges.
+    """
+    rebinned = edges[::factor]
+    if (len(edges) - 1) % factor:
+        rebinned = np.append(rebinned, edges[-1])
+    return rebinned
+
+
+class RebinnedHistogram:
+    """A lower resolution copy of a histogram, for publishing."""
+
+    def __init__(self, histogram, factor, topic, data):
+        """
+        Constructor.
+
+        :param histogram: The original histogram.
+        :param factor: How many bins have been combined along each axis.
+        :param topic: The name of the Kafka topic to publish to.
+        :param data: The rebinned data.
+        """
+        self.topic = topic
+        self.factor = factor
+        self.identifier = histogram.identifier
+        self.last_pulse_time = histogram.last_pulse_time
+        self.data = data
+        self.x_edges = rebin_edges(histogram.x_edges, factor)
+        # Serialisation only expects y edges for 2-D histograms.
+        if hasattr(histogram, "y_edges"):
+            self.y_edges = rebin_edges(histogram.y_edges, factor)
+        if getattr(histogram, "edges", None) is not None:
+            self.edges = [rebin_edges(edges, factor) for edges in histogram.edges]
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+
+def create_pyramid(histogram, levels):
+    """
+    Create the lower resolution copies of a histogram.
+
+    Where possible each level is calculated from the previous level rather
+    than the full resolution data, as it is smaller.
+
+    :param histogram: The histogram.
+    :param levels: List of (factor, topic) pairs.
+    :return: List of RebinnedHistograms.
+    """
+    pyramid = []
+    data = histogram.data
+    data_factor = 1
+
+    for factor, topic in sorted(levels):
+        if factor % data_factor:
+            data = histogram.data
+            data_factor = 1
+        data = rebin(data, factor // data_factor)
+        data_factor = factor
+        pyramid.append(RebinnedHistogram(histogram, factor, topic, data))
+    return pyramid
@@ -0,0 +1,73 @@
+import numpy as np
+
+from just_bin_it.exceptions import JustBinItException
+
+
+def _parse_ids(items, name):
+    """
+    Convert a list of detector IDs and [first, last] ranges into ranges.
+
+    :param items: The list of IDs and ranges.
+    :param name: The name of the list, for error messages.
+    :return: List of (first, last) tuples, inclusive.
+    """
+    ranges = []
+    for item in items:
+        if isinstance(item, int):
+            first, last = item, item
+        elif isinstance(item, (list, tuple)) and len(item) == 2:
+            first, last = item
+        else:
+            raise JustBinItException(f"Invalid ROI {name} entry: {item}")
+
+        if not isinstance(first, int) or not isinstance(last, int):
+            raise JustBinItException(f"Invalid ROI {name} entry: {item}")
+        if first < 0 or last < first:
+            raise JustBinItException(f"Invalid ROI {name} range: {item}")
+        ranges.append((first, last))
+    return ranges
+
+
+def compile_roi(roi):
+    """
+    Convert a region-of-interest configuration into a lookup table.
+
+    The table is indexed by detector ID and is True for the detectors to keep.
+    The last entry applies to all detector IDs beyond the end of the table.
+    If only exclusions are given then all other detectors are kept.
+
+    :param roi: Dict containing "include" and/or "exclude" lists, each entry
+        is either a detector ID or an inclusive [first, last] range.
+    :return: The lookup table.
+    """
+    include = _parse_ids(roi.get("include", []), "include")
+    exclude = _parse_ids(roi.get("exclude", []), "exclude")
+
+    if not include and not exclude:
+        raise JustBinItException("ROI must include or exclude some detectors")
+
+    highest = max(last for _, last in include + exclude)
+    table = np.full(highest + 2, not include, dtype=bool)
+    for first, last in include:
+        table[first : last + 1] = True
+    for first, last in exclude:
+        table[first : last + 1] = False
+    return table
+
+
+def apply_roi(table, tofs, det_ids):
+    """
+    Remove the events which are not in the region of interest.
+
+    :param table: The lookup table created by compile_roi.
+    :param tofs: The time-of-flight data.
+    :param det_ids: The detector IDs.
+    :return: The filtered time-of-flights and detector IDs.
+    """
+    det_ids = np.asarray(det_ids)
+    keep = table[np.minimum(det_ids, len(table) - 1)]
+    tofs = np.asarray(tofs)
+    # Some sources, e.g. the simulator, only supply detector IDs.
+    if len(tofs) == len(det_ids):
+        tofs = tofs[keep]
+    return tofs, det_ids[keep]
@@ -0,0 +1,166 @@
+import logging
+
+import numpy as np
+
+from just_bin_it.exceptions import JustBinItException
+
+
+class RollingHistogram:
+    """
+    Only contains the data from the most recent time window.
+
+    The window is divided into slices, each with its own sub-histogram, plus
+    a running sum of the completed slices. When the pulse time moves into a
+    new slice, the oldest slice is subtracted from the sum and reused, so the
+    cost of moving the window is proportional to the number of bins rather
+    than the number of events.
+
+    Any other histogram type can be wrapped; its binning is used as is.
+    """
+
+    # The window moves with the pulse time of each message, so the messages
+    # must not be combined.
+    uses_pulse_time = True
+
+    def __init__(self, histogram, window_length, num_slices=10):
+        """
+        Constructor.
+
+        :param histogram: The histogram to wrap, defines the binning etc.
+        :param window_length: The length of the window in ns.
+        :param num_slices: How many steps the window moves in.
+        """
+        if window_length <= 0:
+            raise JustBinItException("Window length must be greater than zero")
+        if not isinstance(num_slices, int) or num_slices < 1:
+            raise JustBinItException("Number of window slices must be at least one")
+
+        self._wrapped = histogram
+        self.topic = histogram.topic
+        self.identifier = histogram.identifier
+        self.window_length = window_length
+        self.num_slices = num_slices
+        self.slice_length = window_length // num_slices
+        self._slices = np.zeros((num_slices,) + histogram.shape)
+        self._total = np.zeros(histogram.shape)
+        self._index = 0
+        self._slice_number = None
+        self._use_current_slice()
+
+    def __getattr__(self, name):
+        # Only called for attributes not found on the rolling histogram itself,
+        # e.g. the edges, which come from the wrapped histogram.
+        if name == "_wrapped":
+            raise AttributeError(name)
+        return getattr(self._wrapped, name)
+
+    def _use_current_slice(self):
+        # The wrapped histogram adds to its array in place, so point it at the
+        # current slice.
+        self._wrapped.use_array(self._slices[self._index])
+
+    def add_data(self, pulse_time, tofs, det_ids=None, source=""):
+        """
+        Add data to the histogram.
+
+        :param pulse_time: The pulse time.
+        :param tofs: The time-of-flight data.
+        :param det_ids: The detector ids.
+        :param source: The source of the event.
+        """
+        self._move_window(pulse_time)
+        self._wrapped.add_data(pulse_time, tofs, det_ids, source)
+
+    def _move_window(self, pulse_time):
+        slice_number = pulse_time // self.slice_length
+        if self._slice_number is None:
+            self._slice_number = slice_number
+            return
+
+        steps = slice_number - self._slice_number
+        if steps <= 0:
+            # Late data is added to the current slice.
+            return
+        self._slice_number = slice_number
+
+        if steps >= self.num_slices:
+            # Everything has expired.
+            self._slices.fill(0)
+            self._total.fill(0)
+            return
+
+        for _ in range(steps):
+            self._total += self._slices[self._index]
+            self._index = (self._index + 1) % self.num_slices
+            self._total -= self._slices[self._index]
+            self._slices[self._index] = 0
+        self._use_current_slice()
+
+    @property
+    def data(self):
+        return self._total + self._slices[self._index]
+
+    def get_checkpoint_state(self):
+        """
+        Get the values, other than the data, needed to carry on from a checkpoint.
+
+        The data is the sum of the slices, so the slices are saved as well.
+
+        :return: Dict of the values as arrays.
+        """
+        state = {
+            "slices": self._slices,
+            "total": self._total,
+            "index": np.array(self._index),
+        }
+        if self._slice_number is not None:
+            state["slice_number"] = np.array(self._slice_number)
+        if hasattr(self._wrapped, "get_checkpoint_state"):
+            for name, value in self._wrapped.get_checkpoint_state().items():
+                state[f"wrapped_{name}"] = value
+        return state
+
+    def restore_checkpoint_state(self, data, state):
+        """
+        Carry on from a checkpoint.
+
+        :param data: The saved histogram data, not used as it comes from the slices.
+        :param state: The saved values from get_checkpoint_state.
+        """
+        self._slices[...] = state["slices"]
+        self._total[...] = state["total"]
+        self._index = int(state["index"])
+        self._slice_number = (
+            state["slice_number"].item() if "slice_number" in state else None
+        )
+        self._use_current_slice()
+        if hasattr(self._wrapped, "restore_checkpoint_state"):
+            wrapped_state = {
+                name[len("wrapped_") :]: value
+                for name, value in state.items()
+                if name.startswith("wrapped_")
+            }
+            self._wrapped.restore_checkpoint_state(
+                self._slices[self._index], wrapped_state
+            )
+
+    @property
+    def shape(self):
+        return self._total.shape
+
+    @property
+    def last_pulse_time(self):
+        return self._wrapped.last_pulse_time
+
+    @last_pulse_time.setter
+    def last_pulse_time(self, value):
+        self._wrapped.last_pulse_time = value
+
+    def clear_data(self):
+        """
+        Clears the histogram data, but maintains the other values (e.g. edges etc.)
+        """
+        logging.info("Clearing data")  # pragma: no mutate
+        self._slices.fill(0)
+        self._total.fill(0)
+        self._slice_number = None
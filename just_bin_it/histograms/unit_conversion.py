@@ -0,0 +1,90 @@
+import json
+
+import numpy as np
+
+from just_bin_it.exceptions import JustBinItException
+
+UNITS = {"TOF": "tof", "WAVELENGTH": "wavelength", "D_SPACING": "d_spacing"}
+
+# Planck's constant divided by the neutron mass in m Å / s.
+H_OVER_M_NEUTRON = 3956.034
+
+
+def load_geometry(filename):
+    """
+    Load the instrument geometry from a JSON file.
+
+    The file contains:
+      * "l1" - the source to sample distance in m;
+      * "detector_ids" - the detector IDs;
+      * "l2" - the sample to detector distance in m for each detector;
+      * "two_theta" - the scattering angle in degrees for each detector
+        (only needed for d-spacing).
+
+    :param filename: The geometry file.
+    :return: The geometry as a dict.
+    """
+    try:
+        with open(filename, "r") as file:
+            geometry = json.load(file)
+    except Exception as error:
+        raise JustBinItException(f"Could not load geometry file {filename}: {error}")
+
+    for key in ["l1", "detector_ids", "l2"]:
+        if key not in geometry:
+            raise JustBinItException(f"Geometry file {filename} is missing '{key}'")
+    return geometry
+
+
+def create_conversion_factors(geometry, units):
+    """
+    Calculate the factor to multiply the time-of-flight (ns) by for each detector
+    to convert it into the requested units.
+
+    Wavelength (Å) = (h / m) * tof / (l1 + l2)
+    d-spacing (Å) = wavelength / (2 sin(two_theta / 2))
+
+    :param geometry: The geometry, see load_geometry.
+    :param units: The units to convert to, wavelength or d_spacing.
+    :return: Lookup table indexed by detector ID; the last entry applies to all
+        detector IDs beyond the end of the table. Unknown detectors are NaN so
+        their events fall outside of any range.
+    """
+    if units not in [UNITS["WAVELENGTH"], UNITS["D_SPACING"]]:
+        raise JustBinItException(f"Cannot convert time-of-flight to '{units}'")
+
+    det_ids = np.asarray(geometry["detector_ids"], dtype=np.int64)
+    l2 = np.asarray(geometry["l2"], dtype=np.float64)
+    if len(l2) != len(det_ids):
+        raise JustBinItException("Geometry must have an l2 for every detector")
+    if len(det_ids) == 0 or det_ids.min() < 0:
+        raise JustBinItException("Geometry detector IDs must be non-negative")
+
+    # The time-of-flight is in ns.
+    factors = H_OVER_M_NEUTRON * 1e-9 / (geometry["l1"] + l2)
+
+    if units == UNITS["D_SPACING"]:
+        if "two_theta" not in geometry:
+            raise JustBinItException("Geometry must have two_theta for d-spacing")
+        two_theta = np.asarray(geometry["two_theta"], dtype=np.float64)
+        if len(two_theta) != len(det_ids):
+            raise JustBinItException(
+                "Geometry must have a two_theta for every detector"
+            )
+        factors /= 2 * np.sin(np.radians(two_theta) / 2)
+
+    table = np.full(det_ids.max() + 2, np.nan)
+    table[det_ids] = factors
+    return table
+
+
+def convert_tofs(table, tofs, det_ids):
+    """
+    Convert the time-of-flights using the factor for each event's detector.
+
+    :param table: The lookup table created by create_conversion_factors.
+    :param tofs: The time-of-flight data.
+    :param det_ids: The detector IDs as a numpy array.
+    :return: The converted values.
+    """
+    return tofs * table[np.minimum(det_ids, len(table) - 1)]
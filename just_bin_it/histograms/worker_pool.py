@@ -0,0 +1,335 @@
+import itertools
+import logging
+import queue
+import time
+from multiprocessing import Event, Process, Queue
+
+from just_bin_it.histograms.histogram_process import run_processing
+
+
+class AssignmentQueue:
+    """
+    Wraps a queue shared by successive assignments so that only the messages
+    for the current assignment are received.
+
+    Otherwise, for example, a stop request that arrives just after an assignment
+    has finished by itself would stop the next assignment.
+    """
+
+    def __init__(self, shared_queue, assignment_id):
+        """
+        Constructor.
+
+        :param shared_queue: The underlying queue.
+        :param assignment_id: The ID of the current assignment.
+        """
+        self._queue = shared_queue
+        self._assignment_id = assignment_id
+        self._pending = []
+
+    def put(self, msg):
+        self._queue.put((self._assignment_id, msg))
+
+    def empty(self):
+        while not self._pending:
+            try:
+                self._receive(self._queue.get_nowait())
+            except queue.Empty:
+                return True
+        return False
+
+    def get(self, block=True, timeout=None):
+        if not block:
+            timeout = 0
+        give_up = None if timeout is None else time.monotonic() + timeout
+        while not self._pending:
+            remaining = None if give_up is None else give_up - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                if self.empty():
+                    raise queue.Empty
+                break
+            self._receive(self._queue.get(timeout=remaining))
+        return self._pending.pop(0)
+
+    def _receive(self, item):
+        assignment_id, msg = item
+        # Anything for a previous assignment is discarded.
+        if assignment_id == self._assignment_id:
+            self._pending.append(msg)
+
+
+def run_worker(control_queue, msg_queue, stats_queue, idle, target=run_processing):
+    """
+    The target for a worker process.
+
+    Waits for histogramming assignments and runs each one until it stops, then
+    waits for the next one. The producers and consumers are kept between
+    assignments so their connections can be reused.
+
+    :param control_queue: The queue the assignments arrive on, None to exit.
+    :param msg_queue: The queue for commands to the running assignment.
+    :param stats_queue: The queue for the statistics from the running assignment.
+    :param idle: Event that is set when not running an assignment.
+    :param target: The function to run for each assignment.
+    """
+    producers = {}
+    consumers = {}
+    while True:
+        assignment = control_queue.get()
+        if assignment is None:
+            return
+
+        assignment_id, args = assignment
+        try:
+            target(
+                AssignmentQueue(msg_queue, assignment_id),
+                AssignmentQueue(stats_queue, assignment_id),
+                *args,
+                producers=producers,
+                consumers=consumers,
+            )
+        except Exception as error:
+            logging.error("Worker assignment failed: %s", error)
+        idle.set()
+
+
+def _empty_queue(to_empty):
+    try:
+        while True:
+            to_empty.get_nowait()
+    except queue.Empty:
+        pass
+
+
+class Worker:
+    """A pre-started process that runs histogramming assignments."""
+
+    def __init__(self, target=run_processing):
+        """
+        Constructor.
+
+        :param target: The function to run for each assignment.
+        """
+        self.control_queue = Queue()
+        self.msg_queue = Queue()
+        self.stats_queue = Queue()
+        self.idle = Event()
+        self.idle.set()
+        self._process = Process(
+            target=run_worker,
+            args=(
+                self.control_queue,
+                self.msg_queue,
+                self.stats_queue,
+                self.idle,
+                target,
+            ),
+            daemon=True,
+        )
+        self._process.start()
+
+    @property
+    def pid(self):
+        return self._process.pid
+
+    def is_alive(self):
+        return self._process.is_alive()
+
+    def assign(self, assignment_id, *args):
+        """
+        Start running an assignment.
+
+        :param assignment_id: A unique ID for the assignment.
+        :param args: The arguments for the target after the queues.
+        """
+        self.idle.clear()
+        self.control_queue.put((assignment_id, args))
+
+    def shutdown(self):
+        if self._process.is_alive():
+            self.control_queue.put(None)
+            self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.terminate()
+
+
+class WorkerPool:
+    """
+    A pool of pre-started histogramming processes.
+
+    Starting a new process for each configuration means re-importing modules and
+    reconnecting to Kafka before anything is published; reusing a warm worker
+    avoids that.
+    """
+
+    def __init__(self, size, target=run_processing):
+        """
+        Constructor.
+
+        :param size: The number of workers to start with.
+        :param target: The function to run for each assignment.
+        """
+        self._target = target
+        self._idle_workers = [Worker(target) for _ in range(size)]
+        self._assignment_ids = itertools.count()
+
+    @property
+    def num_idle(self):
+        return len(self._idle_workers)
+
+    def next_assignment_id(self):
+        return next(self._assignment_ids)
+
+    def acquire(self):
+        """
+        Get an idle worker; if there are none then a new one is started.
+
+        :return: The worker.
+        """
+        while self._idle_workers:
+            worker = self._idle_workers.pop()
+            if worker.is_alive():
+                return worker
+            logging.warning("Discarding dead worker process")  # pragma: no mutate
+        return Worker(self._target)
+
+    def release(self, worker):
+        """
+        Return a worker that has finished its assignment to the pool.
+
+        :param worker: The worker.
+        """
+        _empty_queue(worker.stats_queue)
+        if worker.is_alive():
+            self._idle_workers.append(worker)
+
+    def create_process(self, configuration, start, stop, simulation):
+        """
+        Start histogramming on a worker.
+
+        Has the same arguments as command_actioner.create_histogram_process.
+
+        :param configuration: The histogramming configuration.
+        :param start: The start time.
+        :param stop: The stop time.
+        :param simulation: Whether to run in simulation.
+        :return: The PooledHistogramProcess.
+        """
+        return PooledHistogramProcess(self, configuration, start, stop, simulation)
+
+    def shutdown(self):
+        for worker in self._idle_workers:
+            worker.shutdown()
+        self._idle_workers.clear()
+
+
+class PooledHistogramProcess:
+    """
+    Has the same interface as HistogramProcess but runs on a pooled worker.
+    """
+
+    def __init__(
+        self,
+        pool,
+        configuration,
+        start_time,
+        stop_time,
+        simulation=False,
+        publish_interval=500,
+        collect_timings=True,
+    ):
+        """
+        Constructor.
+
+        :param pool: The WorkerPool to get the worker from.
+        :param configuration: The histogramming configuration.
+        :param start_time: The start time.
+        :param stop_time: The stop time.
+        :param simulation: Whether to run in simulation.
+        :param publish_interval: How often to publish histograms and stats in milliseconds.
+        :param collect_timings: Whether to record and publish the processing times.
+        """
+        self.configuration = configuration
+        self.start_time = start_time
+        self.stop_time = stop_time
+        self._pool = pool
+        self._process_stats = None
+        self._worker = pool.acquire()
+        assignment_id = pool.next_assignment_id()
+        self._msg_queue = AssignmentQueue(self._worker.msg_queue, assignment_id)
+        self._stats_queue = AssignmentQueue(self._worker.stats_queue, assignment_id)
+        self._worker.assign(
+            assignment_id,
+            configuration,
+            start_time,
+            stop_time,
+            publish_interval,
+            simulation,
+            collect_timings,
+        )
+
+    def stop(self):
+        if self._worker is None:
+            return
+
+        if not self._worker.idle.is_set():
+            self._msg_queue.put("stop")
+            # Must empty the stats queue otherwise it could potentially stop
+            # the worker from finishing.
+            while self._worker.is_alive() and not self._worker.idle.wait(0.01):
+                _empty_queue(self._worker.stats_queue)
+
+        self._pool.release(self._worker)
+        self._worker = None
+
+    def is_alive(self):
+        return self._worker is not None and not self._worker.idle.is_set()
+
+    def clear(self):
+        if self._worker is not None and not self._worker.idle.is_set():
+            self._msg_queue.put("clear")
+
+    def reconfigure(self, configuration):
+        """
+        Change the histograms without restarting the assignment.
+
+        :param configuration: The new histogramming configuration.
+        :return: True, if the request was sent.
+        """
+        if self._worker is None or self._worker.idle.is_set():
+            return False
+        self._msg_queue.put({"cmd": "reconfigure", "config": configuration})
+        self.configuration = configuration
+        return True
+
+    def get_stats(self):
+        """
+        Get the most recent histogram statistics.
+
+        The accompanying process statistics are kept for get_process_stats.
+
+        :return: The histogram statistics or None if nothing new.
+        """
+        if self._worker is None:
+            return None
+
+        # Empty the queue and only return the most recent value
+        most_recent = None
+        while not self._stats_queue.empty():
+            most_recent = self._stats_queue.get(False)
+
+        if most_recent is None:
+            return None
+        self._process_stats = most_recent["process"]
+        return most_recent["histograms"]
+
+    def get_process_stats(self):
+        """
+        Get the process statistics (timings etc.) that arrived with the most
+        recent histogram statistics.
+
+        :return: The process statistics or None if nothing new.
+        """
+        process_stats = self._process_stats
+        self._process_stats = None
+        return process_stats
@@ -1,5 +1,37 @@
 import numpy as np
 
+from just_bin_it.exceptions import JustBinItException
+
+DISTRIBUTIONS = {"GAUSSIAN": "gaussian", "UNIFORM": "uniform"}
+
+
+def generate_values(distribution, value_range, num_events, rng=None):
+    """
+    Generate random integer values within a range.
+
+    The Gaussian is centred on the middle of the range with a standard
+    deviation of a tenth of the range.
+
+    :param distribution: The distribution, see DISTRIBUTIONS.
+    :param value_range: The minimum and maximum values.
+    :param num_events: The number of values to generate.
+    :param rng: Optional numpy random Generator.
+    :return: The values as a numpy array.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    low, high = value_range
+
+    if distribution == DISTRIBUTIONS["GAUSSIAN"]:
+        centre = low + (high - low) // 2
+        scale = (high - low) // 10
+        values = rng.normal(centre, scale, num_events)
+    elif distribution == DISTRIBUTIONS["UNIFORM"]:
+        values = rng.uniform(low, high, num_events)
+    else:
+        raise JustBinItException(f"Unrecognised distribution: {distribution}")
+
+    return values.astype(np.int64)
+
 
 def generate_fake_data(tof_range, det_range, num_events):
     """
@@ -10,15 +42,68 @@ def generate_fake_data(tof_range, det_range, num_events):
     :param num_events: The number of events to generate.
     :return: The time-of-flights and corresponding detector IDs.
     """
-    # Calculate the centres and scaling
-    tof_centre = (tof_range[1] - tof_range[0]) // 2
-    tof_scale = tof_centre // 5
+    tofs = generate_values(DISTRIBUTIONS["GAUSSIAN"], tof_range, num_events)
+    dets = generate_values(DISTRIBUTIONS["GAUSSIAN"], det_range, num_events)
 
-    det_centre = (det_range[1] - det_range[0]) // 2
-    det_scale = det_centre // 5
+    return tofs, dets
 
-    # Generate fake data
-    tofs = [int(x) for x in np.random.normal(tof_centre, tof_scale, num_events)]
-    dets = [int(x) for x in np.random.normal(det_centre, det_scale, num_events)]
 
-    return tofs, dets
+def generate_fake_detector_data(width, height, num_events, distribution, rng=None):
+    """
+    Generate fake detector IDs for a rectangular detector.
+
+    Along the rows the events follow the distribution; each row is equally
+    likely.
+
+    :param width: How many detectors in a row.
+    :param height: How many rows.
+    :param num_events: The number of events to generate.
+    :param distribution: The distribution along the rows, see DISTRIBUTIONS.
+    :param rng: Optional numpy random Generator.
+    :return: The detector IDs, which start at 1.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    columns = generate_values(distribution, (0, width), num_events, rng)
+    rows = rng.integers(0, height, num_events)
+    return rows * width + columns + 1
+
+
+class EventPool:
+    """
+    A pool of pre-generated events.
+
+    Generating random numbers is much slower than histogramming them, so events
+    are generated once and then handed out as views of random parts of the pool.
+    """
+
+    def __init__(self, tofs, det_ids, rng=None):
+        """
+        Constructor.
+
+        :param tofs: The time-of-flights.
+        :param det_ids: The corresponding detector IDs.
+        :param rng: Optional numpy random Generator, used to pick the events.
+        """
+        if len(tofs) != len(det_ids) or len(tofs) == 0:
+            raise JustBinItException(
+                "Event pool needs the same, non-zero, number of tofs and detector IDs"
+            )
+        self.tofs = tofs
+        self.det_ids = det_ids
+        self._rng = rng if rng is not None else np.random.default_rng()
+
+    def __len__(self):
+        return len(self.tofs)
+
+    def take(self, num_events):
+        """
+        Get events from the pool.
+
+        :param num_events: The number of events, no more than the pool size.
+        :return: The time-of-flights and detector IDs.
+        """
+        start = self._rng.integers(0, len(self) - num_events + 1)
+        return (
+            self.tofs[start : start + num_events],
+            self.det_ids[start : start + num_events],
+        )
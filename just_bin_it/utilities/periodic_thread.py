@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+
+
+class PeriodicThread:
+    """
+    Repeatedly calls a function on its own thread.
+
+    Records how long each call takes and how late it starts, so that one slow
+    activity can be spotted without it delaying the others.
+    """
+
+    def __init__(self, name, function, interval, clock=time.monotonic):
+        """
+        Constructor.
+
+        :param name: The name, used for the thread and the statistics.
+        :param function: The function to call.
+        :param interval: The time between the starts of the calls in seconds,
+            0 to call again straightaway (only if the function itself waits).
+        :param clock: The time source, for testing.
+        """
+        self.name = name
+        self.function = function
+        self.interval = interval
+        self._clock = clock
+        self._stop_event = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+        self._last_duration = None
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stop calling the function; waits for any call in progress to finish.
+
+        :param timeout: The most time to wait in seconds, None to wait forever.
+        """
+        self._stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def _run(self):
+        due = self._clock()
+        while not self._stop_event.is_set():
+            started = self._clock()
+            try:
+                self.function()
+            except Exception as error:
+                logging.error("%s failed: %s", self.name, error)
+            finished = self._clock()
+            self._record(finished - started, max(0, started - due))
+
+            if self.interval and finished - started > self.interval:
+                logging.warning(
+                    "%s took %.3f s, longer than its interval",
+                    self.name,
+                    finished - started,
+                )
+            # If running behind then don't try to catch up.
+            due = max(due + self.interval, finished)
+            self._stop_event.wait(max(0, due - self._clock()))
+
+    def _record(self, duration, lateness):
+        with self._stats_lock:
+            self._last_duration = duration
+            self._max_duration = max(self._max_duration, duration)
+            self._max_lateness = max(self._max_lateness, lateness)
+
+    def _reset_stats(self):
+        self._max_duration = 0
+        self._max_lateness = 0
+
+    def get_stats(self):
+        """
+        Get the timings since the last time this was called.
+
+        :return: Dict of the timings in milliseconds, empty if not called yet.
+        """
+        with self._stats_lock:
+            if self._last_duration is None:
+                return {}
+            stats = {
+                "duration-ms": self._last_duration * 1000,
+                "max-duration-ms": self._max_duration * 1000,
+                "max-lateness-ms": self._max_lateness * 1000,
+            }
+            self._reset_stats()
+        return stats
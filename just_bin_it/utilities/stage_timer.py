@@ -0,0 +1,69 @@
+import time
+
+
+class StageTimer:
+    """
+    Accumulates the wall-clock and CPU time spent in each processing stage.
+
+    Only a couple of clock reads are done per stage per iteration, so the
+    overhead is negligible compared to the work being timed.
+    """
+
+    def __init__(self):
+        self._wall_ns = {}
+        self._cpu_ns = {}
+        self._counts = {}
+        self._interval_start = time.perf_counter_ns()
+
+    @staticmethod
+    def start():
+        """
+        Mark the start of a stage.
+
+        :return: The token to pass to stop.
+        """
+        return time.perf_counter_ns(), time.process_time_ns()
+
+    def stop(self, stage, started):
+        """
+        Mark the end of a stage.
+
+        :param stage: The name of the stage.
+        :param started: The token returned by start.
+        """
+        wall_start, cpu_start = started
+        self._wall_ns[stage] = (
+            self._wall_ns.get(stage, 0) + time.perf_counter_ns() - wall_start
+        )
+        self._cpu_ns[stage] = (
+            self._cpu_ns.get(stage, 0) + time.process_time_ns() - cpu_start
+        )
+
+    def add_count(self, name, value):
+        """
+        Add to a counter, e.g. the number of messages processed.
+
+        :param name: The name of the counter.
+        :param value: The amount to add.
+        """
+        self._counts[name] = self._counts.get(name, 0) + value
+
+    def get_stats(self):
+        """
+        Get the totals since the previous call and reset them.
+
+        :return: Dictionary of stat name to value (times are in ms).
+        """
+        now = time.perf_counter_ns()
+        stats = {"interval-ms": (now - self._interval_start) / 1_000_000}
+        for stage, value in self._wall_ns.items():
+            stats[f"{stage}-wall-ms"] = value / 1_000_000
+            stats[f"{stage}-cpu-ms"] = self._cpu_ns[stage] / 1_000_000
+        stats.update(self._counts)
+
+        # Keep the names so quiet stages are reported as zero rather than missing.
+        self._wall_ns = dict.fromkeys(self._wall_ns, 0)
+        self._cpu_ns = dict.fromkeys(self._cpu_ns, 0)
+        self._counts = dict.fromkeys(self._counts, 0)
+        self._interval_start = now
+        return stats
@@ -29,15 +29,17 @@ class StubConsumer(Consumer):
     def _assign_topics(self, topics):
         pass
 
-    def _get_new_messages(self):
+    def _get_new_messages(self, max_records=None):
         # From Kafka we get a dictionary of topics which contains a list of
         # consumer records which we want 'value' from.
         # Recreate the structure here to match that.
         data = {}
+        remaining = max_records if max_records is not None else float("inf")
 
         for k, v in self.topic_partitions.items():
             records = []
-            while v["offset"] < len(v["messages"]):
+            while v["offset"] < len(v["messages"]) and remaining > 0:
+                remaining -= 1
                 msg = v["messages"][v["offset"]]
                 records.append(StubConsumerRecord(msg[0], v["offset"], msg[2]))
                 v["offset"] += 1
@@ -58,6 +60,9 @@ class StubConsumer(Consumer):
 
         return offset_ranges
 
+    def _get_end_offsets(self):
+        return [len(tp["messages"]) for tp in self.topic_partitions.values()]
+
     def _offset_for_time(self, requested_time):
         result = []
         for tp in self.topic_partitions.values():
@@ -0,0 +1,229 @@
+from collections import namedtuple
+from multiprocessing.managers import BaseManager
+from threading import Lock
+
+from kafka import TopicPartition
+
+from just_bin_it.endpoints.kafka_consumer import Consumer
+from just_bin_it.endpoints.kafka_producer import Producer
+from just_bin_it.exceptions import KafkaException
+from just_bin_it.utilities import time_in_ns
+
+FakeRecord = namedtuple(
+    "FakeRecord", ("topic", "partition", "offset", "timestamp", "value")
+)
+
+# The brokers that the fake consumers and producers connect to, keyed on address.
+# Processes created by forking inherit the registered brokers.
+_BROKERS = {}
+
+
+class FakeBroker:
+    """
+    An in-memory stand-in for a Kafka broker.
+
+    Each partition is an append-only log of (timestamp, value); offsets start
+    at zero. Topics are created on first use, like a broker with automatic
+    topic creation.
+    """
+
+    def __init__(self, max_poll_records=500):
+        """
+        Constructor.
+
+        :param max_poll_records: The most records to return per partition per fetch.
+        """
+        self.max_poll_records = max_poll_records
+        self._topics = {}
+        self._next_partition = {}
+        self._lock = Lock()
+
+    def create_topic(self, topic, num_partitions=1):
+        with self._lock:
+            if topic not in self._topics:
+                self._topics[topic] = [([], []) for _ in range(num_partitions)]
+                self._next_partition[topic] = 0
+
+    def topics(self):
+        return set(self._topics)
+
+    def partitions_for_topic(self, topic):
+        if topic not in self._topics:
+            return None
+        return set(range(len(self._topics[topic])))
+
+    def produce(self, topic, value, partition=None, timestamp=None):
+        """
+        Append a message to a topic.
+
+        :param topic: The topic.
+        :param value: The message.
+        :param partition: The partition, if None then round-robin.
+        :param timestamp: The timestamp in ms, if None then the current time.
+        :return: The partition and offset written to.
+        """
+        self.create_topic(topic)
+        with self._lock:
+            partitions = self._topics[topic]
+            if partition is None:
+                partition = self._next_partition[topic]
+                self._next_partition[topic] = (partition + 1) % len(partitions)
+            timestamps, values = partitions[partition]
+            if timestamp is None:
+                timestamp = time_in_ns() // 1_000_000
+            timestamps.append(timestamp)
+            values.append(value)
+            return partition, len(values) - 1
+
+    def fetch(self, topic, partition, offset):
+        """
+        Get the messages from an offset onwards.
+
+        :param topic: The topic.
+        :param partition: The partition.
+        :param offset: The offset to start from.
+        :return: List of FakeRecords.
+        """
+        with self._lock:
+            timestamps, values = self._topics[topic][partition]
+            end = min(len(values), offset + self.max_poll_records)
+            return [
+                FakeRecord(topic, partition, i, timestamps[i], values[i])
+                for i in range(offset, end)
+            ]
+
+    def end_offset(self, topic, partition):
+        return len(self._topics[topic][partition][1])
+
+    def offset_for_time(self, topic, partition, timestamp):
+        """
+        Find the first offset with a timestamp at or after the requested time.
+
+        Producers can supply their own timestamps, so they may be out of order;
+        like Kafka, the earliest matching offset is returned.
+
+        :param topic: The topic.
+        :param partition: The partition.
+        :param timestamp: The time in ms.
+        :return: The offset or None if there are no messages that late.
+        """
+        with self._lock:
+            timestamps, _ = self._topics[topic][partition]
+            for offset, message_time in enumerate(timestamps):
+                if message_time >= timestamp:
+                    return offset
+            return None
+
+
+class FakeBrokerManager(BaseManager):
+    pass
+
+
+FakeBrokerManager.register("FakeBroker", FakeBroker)
+
+
+def start_fake_broker(address, max_poll_records=500):
+    """
+    Start a fake broker in a separate manager process, so it can be shared by
+    the processes created afterwards, and register it under an address.
+
+    :param address: The address, e.g. "fake:9092", to use as the broker name.
+    :param max_poll_records: The most records to return per partition per fetch.
+    :return: The manager (call shutdown when finished) and the broker proxy.
+    """
+    manager = FakeBrokerManager()
+    manager.start()
+    broker = manager.FakeBroker(max_poll_records)
+    register_fake_broker(address, broker)
+    return manager, broker
+
+
+def register_fake_broker(address, broker):
+    _BROKERS[address] = broker
+
+
+def _find_broker(brokers):
+    for address in brokers:
+        if address in _BROKERS:
+            return _BROKERS[address]
+    raise KafkaException(f"No fake broker registered for {brokers}")
+
+
+def fake_kafka_settings_valid(brokers, topics):
+    """
+    Replacement for kafka_tools.are_kafka_settings_valid.
+    """
+    try:
+        existing = _find_broker(brokers).topics()
+    except KafkaException:
+        return False
+    return all(topic in existing for topic in topics)
+
+
+class FakeConsumer(Consumer):
+    """Consumer that reads from a registered FakeBroker."""
+
+    def _create_consumer(self, brokers):
+        self.broker = _find_broker(brokers)
+        self.positions = {}
+        return self.broker
+
+    def _assign_topics(self, topics):
+        # Only use the first topic
+        topic = topics[0]
+
+        if topic not in self.broker.topics():
+            raise KafkaException(f"Requested topic {topic} not available")
+
+        for pn in sorted(self.broker.partitions_for_topic(topic)):
+            tp = TopicPartition(topic, pn)
+            self.topic_partitions.append(tp)
+            # Start at the end, like the real consumer.
+            self.positions[tp] = self.broker.end_offset(topic, pn)
+
+    def _get_new_messages(self, max_records=None):
+        data = {}
+        for tp in self.topic_partitions:
+            records = self.broker.fetch(tp.topic, tp.partition, self.positions[tp])
+            if max_records is not None:
+                records = records[:max_records]
+                max_records -= len(records)
+            if records:
+                data[tp] = records
+                self.positions[tp] = records[-1].offset + 1
+        return data
+
+    def _offset_for_time(self, start_time):
+        return [
+            self.broker.offset_for_time(tp.topic, tp.partition, start_time)
+            for tp in self.topic_partitions
+        ]
+
+    def _seek_by_offsets(self, offsets):
+        for tp, offset in zip(self.topic_partitions, offsets):
+            self.positions[tp] = offset
+
+    def _get_offset_range(self):
+        return [
+            (0, self.broker.end_offset(tp.topic, tp.partition))
+            for tp in self.topic_partitions
+        ]
+
+    def _get_end_offsets(self):
+        return [
+            self.broker.end_offset(tp.topic, tp.partition)
+            for tp in self.topic_partitions
+        ]
+
+    def _get_positions(self):
+        return [self.positions[tp] for tp in self.topic_partitions]
+
+
+class FakeProducer(Producer):
+    """Producer that writes to a registered FakeBroker."""
+
+    def __init__(self, brokers):
+        self.broker = _find_broker(brokers)
+
+    def publish_message(self, topic, message):
+        self.broker.produce(topic, message)
@@ -0,0 +1,162 @@
+import os
+
+import numpy as np
+import pytest
+
+from just_bin_it.endpoints.histogram_sink import HistogramSink
+from just_bin_it.endpoints.serialisation import deserialise_hs00, serialise_hs00
+from just_bin_it.histograms.backing_store import (
+    create_histogram_array,
+    flush_histogram_array,
+)
+from just_bin_it.histograms.det_histogram import DetHistogram
+from just_bin_it.histograms.histogram1d import Histogram1d
+from just_bin_it.histograms.histogram2d import Histogram2d
+from just_bin_it.histograms.histogram_factory import HistogramFactory
+from just_bin_it.histograms.histogrammer import Histogrammer
+from tests.doubles.producers import SpyProducer
+
+
+def create_histograms(directory):
+    return [
+        Histogram1d(
+            "topic1", 10, (0, 100), backing_file=os.path.join(directory, "1d.dat")
+        ),
+        Histogram2d(
+            "topic2",
+            10,
+            (0, 100),
+            (1, 10),
+            backing_file=os.path.join(directory, "2d.dat"),
+        ),
+        DetHistogram(
+            "topic3",
+            (0, 100),
+            (1, 6),
+            2,
+            3,
+            backing_file=os.path.join(directory, "det.dat"),
+        ),
+    ]
+
+
+def test_if_no_file_then_array_is_in_memory():
+    array = create_histogram_array((3, 4))
+
+    assert not isinstance(array, np.memmap)
+    assert array.shape == (3, 4)
+    assert array.sum() == 0
+
+
+def test_if_file_supplied_then_array_is_memory_mapped(tmp_path):
+    filename = str(tmp_path / "sub" / "hist.dat")
+
+    array = create_histogram_array((3, 4), filename)
+
+    assert isinstance(array, np.memmap)
+    assert array.sum() == 0
+    assert os.path.getsize(filename) == 3 * 4 * 8
+
+
+def test_existing_file_of_same_size_starts_from_zero(tmp_path):
+    filename = str(tmp_path / "hist.dat")
+    array = create_histogram_array((3, 4), filename)
+    array += 1
+    array.flush()
+
+    array = create_histogram_array((3, 4), filename)
+
+    assert array.sum() == 0
+    assert np.fromfile(filename, dtype=np.float64).sum() == 0
+
+
+def test_existing_file_of_different_size_is_overwritten(tmp_path):
+    filename = str(tmp_path / "hist.dat")
+    array = create_histogram_array((3, 4), filename)
+    array += 1
+    array.flush()
+
+    array = create_histogram_array((3, 5), filename)
+
+    assert array.sum() == 0
+    assert os.path.getsize(filename) == 3 * 5 * 8
+
+
+def test_flushing_writes_counts_to_file(tmp_path):
+    filename = str(tmp_path / "hist.dat")
+    array = create_histogram_array((3, 4), filename)
+    array += 1
+
+    flush_histogram_array(array)
+
+    assert np.fromfile(filename, dtype=np.float64).sum() == 12
+
+
+def test_flushing_in_memory_array_does_nothing():
+    flush_histogram_array(create_histogram_array((3, 4)))
+
+
+class TestBackedHistograms:
+    @pytest.fixture(autouse=True)
+    def prepare(self, tmp_path):
+        self.directory = str(tmp_path)
+        self.histograms = create_histograms(self.directory)
+        for hist in self.histograms:
+            hist.add_data(1000, [1, 15, 50], [1, 2, 3])
+
+    def test_data_is_written_to_file(self):
+        for hist in self.histograms:
+            hist.data.flush()
+            on_disk = np.memmap(hist.backing_file, dtype=np.float64, mode="r")
+
+            assert on_disk.sum() == 3
+            assert on_disk.tolist() == hist.data.flatten().tolist()
+
+    def test_publishing_writes_counts_to_file(self):
+        histogrammer = Histogrammer(HistogramSink(SpyProducer()), self.histograms)
+
+        histogrammer.publish_histograms()
+
+        for hist in self.histograms:
+            assert np.fromfile(hist.backing_file, dtype=np.float64).sum() == 3
+
+    def test_clearing_zeroes_the_file(self):
+        for hist in self.histograms:
+            hist.clear_data()
+            hist.data.flush()
+            on_disk = np.memmap(hist.backing_file, dtype=np.float64, mode="r")
+
+            assert isinstance(hist.data, np.memmap)
+            assert on_disk.sum() == 0
+
+    def test_serialised_histogram_is_same_as_in_memory_histogram(self):
+        in_memory = [
+            Histogram1d("topic1", 10, (0, 100)),
+            Histogram2d("topic2", 10, (0, 100), (1, 10)),
+            DetHistogram("topic3", (0, 100), (1, 6), 2, 3),
+        ]
+
+        for backed, hist in zip(self.histograms, in_memory):
+            hist.add_data(1000, [1, 15, 50], [1, 2, 3])
+            backed_result = deserialise_hs00(serialise_hs00(backed))
+            result = deserialise_hs00(serialise_hs00(hist))
+
+            assert backed.shape == hist.shape
+            assert np.array_equal(backed_result["data"], result["data"])
+
+
+def test_factory_passes_backing_file_to_histogram(tmp_path):
+    filename = str(tmp_path / "hist.dat")
+    config = {
+        "type": "hist2d",
+        "tof_range": [0, 100],
+        "det_range": [1, 10],
+        "num_bins": 10,
+        "topic": "topic",
+        "backing_file": filename,
+    }
+
+    histogram = HistogramFactory.generate([config])[0]
+
+    assert isinstance(histogram.data, np.memmap)
+    assert os.path.exists(filename)
@@ -0,0 +1,150 @@
+import os
+
+import pytest
+
+from just_bin_it.histograms.checkpoint import (
+    Checkpointer,
+    checkpoint_filename,
+    create_config_hash,
+)
+from just_bin_it.histograms.det_histogram import DetHistogram
+from just_bin_it.histograms.histogram1d import Histogram1d
+from just_bin_it.histograms.histogram2d import Histogram2d
+from just_bin_it.histograms.rate_histogram import RateHistogram
+from just_bin_it.histograms.rolling_histogram import RollingHistogram
+
+CONFIG = {
+    "data_brokers": ["localhost:9092"],
+    "data_topics": ["my_topic"],
+    "type": "hist1d",
+    "tof_range": [0, 100],
+    "num_bins": 10,
+    "topic": "output",
+    "id": "abc",
+    "checkpoint": {"directory": "/tmp", "interval": 10},
+}
+
+
+def create_histograms():
+    return [
+        Histogram1d("topic1", 10, (0, 100)),
+        Histogram2d("topic2", 10, (0, 100), (1, 10)),
+        DetHistogram("topic3", (0, 100), (1, 6), 2, 3),
+    ]
+
+
+class TestCheckpointer:
+    @pytest.fixture(autouse=True)
+    def prepare(self, tmp_path):
+        self.filename = str(tmp_path / "hist.npz")
+        self.checkpointer = Checkpointer(self.filename, "hash", 1000)
+        self.histograms = create_histograms()
+        for hist in self.histograms:
+            hist.add_data(12345, [1, 15, 50], [1, 2, 3])
+
+    def test_saved_histograms_and_offsets_are_restored(self):
+        self.checkpointer.save(self.histograms, [10, 20], 0)
+        restored = create_histograms()
+
+        offsets = self.checkpointer.restore(restored)
+
+        assert offsets == [10, 20]
+        for original, hist in zip(self.histograms, restored):
+            assert (hist.data == original.data).all()
+            assert hist.last_pulse_time == 12345
+
+    def test_if_no_checkpoint_then_nothing_restored(self):
+        assert self.checkpointer.restore(create_histograms()) is None
+
+    def test_if_config_hash_differs_then_nothing_restored(self):
+        self.checkpointer.save(self.histograms, [10], 0)
+        restored = create_histograms()
+
+        checkpointer = Checkpointer(self.filename, "other_hash")
+
+        assert checkpointer.restore(restored) is None
+        assert restored[0].data.sum() == 0
+
+    def test_if_bins_differ_then_nothing_restored(self):
+        self.checkpointer.save(self.histograms[:1], [10], 0)
+        restored = [Histogram1d("topic1", 10, (0, 1000))]
+
+        assert self.checkpointer.restore(restored) is None
+        assert restored[0].data.sum() == 0
+
+    def test_rate_histogram_carries_on_from_where_it_left_off(self):
+        hist = RateHistogram("topic1", 10, 1000)
+        hist.add_data(12345, [1, 2, 3])
+        hist.add_data(15_500, [1])
+        self.checkpointer.save([hist], [10], 0)
+        restored = RateHistogram("topic1", 10, 1000)
+
+        assert self.checkpointer.restore([restored]) == [10]
+
+        assert (restored.x_edges == hist.x_edges).all()
+        assert (restored.data == hist.data).all()
+        restored.add_data(15_900, [1, 2])
+        assert restored.data[-1] == 3
+
+    def test_if_rate_bin_width_differs_then_nothing_restored(self):
+        hist = RateHistogram("topic1", 10, 1000)
+        hist.add_data(12345, [1, 2, 3])
+        self.checkpointer.save([hist], [10], 0)
+
+        assert self.checkpointer.restore([RateHistogram("topic1", 10, 500)]) is None
+
+    def test_rolling_histogram_carries_on_with_same_window(self):
+        def create():
+            return RollingHistogram(Histogram1d("topic1", 10, (0, 100)), 4000, 4)
+
+        hist = create()
+        for i in range(6):
+            hist.add_data(i * 1000, [i * 10])
+        self.checkpointer.save([hist], [10], 0)
+        restored = create()
+
+        assert self.checkpointer.restore([restored]) == [10]
+
+        assert (restored.data == hist.data).all()
+        assert restored.last_pulse_time == 5000
+        # The oldest slice still expires when the window moves on.
+        restored.add_data(6000, [60])
+        assert restored.data.tolist() == [0, 0, 0, 1, 1, 1, 1, 0, 0, 0]
+
+    def test_if_checkpoint_corrupt_then_nothing_restored(self):
+        with open(self.filename, "wb") as file:
+            file.write(b"not a checkpoint")
+
+        assert self.checkpointer.restore(create_histograms()) is None
+
+    def test_temporary_file_is_not_left_behind(self):
+        self.checkpointer.save(self.histograms, [10], 0)
+
+        assert os.listdir(os.path.dirname(self.filename)) == ["hist.npz"]
+
+    def test_save_is_due_after_interval(self):
+        assert self.checkpointer.is_due(0)
+
+        self.checkpointer.save(self.histograms, [10], 5000)
+
+        assert not self.checkpointer.is_due(5999)
+        assert self.checkpointer.is_due(6000)
+
+
+def test_config_hash_ignores_checkpoint_settings():
+    config = dict(CONFIG)
+    config["checkpoint"] = {"directory": "/somewhere/else", "interval": 1}
+
+    assert create_config_hash(CONFIG, 1, 2) == create_config_hash(config, 1, 2)
+
+
+def test_config_hash_depends_on_start_time():
+    assert create_config_hash(CONFIG, 1, 2) != create_config_hash(CONFIG, 3, 2)
+
+
+def test_checkpoint_filename_uses_id_if_available():
+    assert checkpoint_filename("/data", CONFIG) == os.path.join("/data", "abc.npz")
+
+    config = dict(CONFIG)
+    del config["id"]
+    assert checkpoint_filename("/data", config) == os.path.join("/data", "output.npz")
@@ -3,6 +3,7 @@ from copy import deepcopy
 import mock
 import pytest
 
+import just_bin_it.command_actioner as command_actioner
 from just_bin_it.command_actioner import CommandActioner, ResponsePublisher
 
 TEST_TOPIC = "topic1"
@@ -28,9 +29,14 @@ RESET_CMD = {"cmd": "reset_counts"}
 
 
 class SpyProcess:
-    def __init__(self):
+    def __init__(self, configuration=None, start_time=None, stop_time=None):
+        self.configuration = configuration
+        self.start_time = start_time
+        self.stop_time = stop_time
+        self.alive = True
         self.stop_called = False
         self.clear_called = False
+        self.reconfigured_with = None
 
     def stop(self):
         self.stop_called = True
@@ -38,9 +44,19 @@ class SpyProcess:
     def clear(self):
         self.clear_called = True
 
+    def is_alive(self):
+        return self.alive
 
-def create_spy_process(*args, **kwargs):
-    return SpyProcess()
+    def reconfigure(self, configuration):
+        if not self.alive:
+            return False
+        self.reconfigured_with = configuration
+        self.configuration = configuration
+        return True
+
+
+def create_spy_process(configuration=None, start=None, stop=None, simulation=False):
+    return SpyProcess(configuration, start, stop)
 
 
 class TestCommandActioner:
@@ -101,3 +117,236 @@ class TestCommandActioner:
 
         assert self.spy_process.clear_called
         assert len(self.hist_processes) == 1
+
+
+LIVE_CONFIG_CMD = {
+    "cmd": "config",
+    "data_brokers": ["localhost:9092"],
+    "data_topics": ["TEST_events"],
+    "histograms": [
+        {
+            "type": "hist1d",
+            "tof_range": [0, 100000000],
+            "num_bins": 50,
+            "topic": "output_topic_for_1d",
+            "id": "histogram1d",
+        },
+        {
+            "type": "dethist",
+            "tof_range": [0, 100000000],
+            "det_range": [1, 100],
+            "width": 10,
+            "height": 10,
+            "topic": "output_topic_for_dethist",
+            "id": "dethist",
+        },
+    ],
+}
+
+
+class TestReconfiguration:
+    @pytest.fixture(autouse=True)
+    def prepare(self, monkeypatch):
+        monkeypatch.setattr(
+            command_actioner, "are_kafka_settings_valid", lambda *args: True
+        )
+        self.actioner = CommandActioner(
+            mock.create_autospec(ResponsePublisher), False, create_spy_process
+        )
+        self.hist_processes = []
+        self.actioner.handle_command_message(
+            deepcopy(LIVE_CONFIG_CMD), self.hist_processes
+        )
+        self.original = list(self.hist_processes)
+
+    def test_same_config_keeps_existing_processes(self):
+        self.actioner.handle_command_message(
+            deepcopy(LIVE_CONFIG_CMD), self.hist_processes
+        )
+
+        assert self.hist_processes == self.original
+        assert not any(p.stop_called for p in self.original)
+        assert not any(p.reconfigured_with for p in self.original)
+
+    def test_changed_histogram_on_same_topics_is_reconfigured(self):
+        cmd = deepcopy(LIVE_CONFIG_CMD)
+        cmd["histograms"][0]["num_bins"] = 100
+
+        self.actioner.handle_command_message(cmd, self.hist_processes)
+
+        assert self.hist_processes == self.original
+        assert self.original[0].reconfigured_with["num_bins"] == 100
+        assert self.original[1].reconfigured_with is None
+        assert not any(p.stop_called for p in self.original)
+
+    def test_removed_histogram_process_is_stopped(self):
+        cmd = deepcopy(LIVE_CONFIG_CMD)
+        del cmd["histograms"][0]
+
+        self.actioner.handle_command_message(cmd, self.hist_processes)
+
+        assert self.hist_processes == [self.original[1]]
+        assert self.original[0].stop_called
+        assert not self.original[1].stop_called
+
+    def test_added_histogram_gets_new_process(self):
+        cmd = deepcopy(LIVE_CONFIG_CMD)
+        cmd["histograms"].append(
+            dict(cmd["histograms"][0], topic="another_topic", id="another")
+        )
+
+        self.actioner.handle_command_message(cmd, self.hist_processes)
+
+        assert self.hist_processes[:2] == self.original
+        assert len(self.hist_processes) == 3
+        assert self.hist_processes[2].configuration["id"] == "another"
+
+    def test_changed_data_topics_restarts_processes(self):
+        cmd = deepcopy(LIVE_CONFIG_CMD)
+        cmd["data_topics"] = ["other_events"]
+
+        self.actioner.handle_command_message(cmd, self.hist_processes)
+
+        assert all(p.stop_called for p in self.original)
+        assert len(self.hist_processes) == 2
+        assert not set(self.hist_processes) & set(self.original)
+
+    def test_changed_start_time_restarts_processes(self):
+        cmd = deepcopy(LIVE_CONFIG_CMD)
+        cmd["start"] = 1564727596867
+
+        self.actioner.handle_command_message(cmd, self.hist_processes)
+
+        assert all(p.stop_called for p in self.original)
+        assert not set(self.hist_processes) & set(self.original)
+
+    def test_dead_process_is_replaced(self):
+        self.original[0].alive = False
+
+        self.actioner.handle_command_message(
+            deepcopy(LIVE_CONFIG_CMD), self.hist_processes
+        )
+
+        assert self.original[0].stop_called
+        assert self.original[0] not in self.hist_processes
+        assert len(self.hist_processes) == 2
+
+    def test_checkpointed_histogram_is_restarted_rather_than_reconfigured(self):
+        cmd = deepcopy(LIVE_CONFIG_CMD)
+        cmd["histograms"][0]["checkpoint"] = {"directory": "checkpoints"}
+        self.actioner.handle_command_message(deepcopy(cmd), self.hist_processes)
+        checkpointed = self.hist_processes[-1]
+        cmd["histograms"][0]["num_bins"] = 100
+
+        self.actioner.handle_command_message(cmd, self.hist_processes)
+
+        assert checkpointed.stop_called
+        assert checkpointed.reconfigured_with is None
+
+
+ADD_CMD = {
+    "cmd": "add_histograms",
+    "data_brokers": ["localhost:9092"],
+    "data_topics": ["TEST_events"],
+    "histograms": [
+        {
+            "type": "hist1d",
+            "tof_range": [0, 100000000],
+            "num_bins": 50,
+            "topic": "monitor_topic",
+            "id": "monitor",
+        }
+    ],
+}
+
+
+class TestAddAndRemoveHistograms:
+    @pytest.fixture(autouse=True)
+    def prepare(self):
+        self.response_publisher = mock.create_autospec(ResponsePublisher)
+        self.actioner = CommandActioner(
+            self.response_publisher, True, create_spy_process
+        )
+        self.hist_processes = []
+        self.actioner.handle_command_message(
+            deepcopy(LIVE_CONFIG_CMD), self.hist_processes
+        )
+        self.original = list(self.hist_processes)
+
+    def test_added_histogram_gets_a_process_and_others_are_untouched(self):
+        self.actioner.handle_command_message(deepcopy(ADD_CMD), self.hist_processes)
+
+        assert self.hist_processes[:2] == self.original
+        assert len(self.hist_processes) == 3
+        assert self.hist_processes[2].configuration["id"] == "monitor"
+        assert self.hist_processes[2].configuration["data_topics"] == ["TEST_events"]
+        assert not any(p.stop_called for p in self.original)
+
+    def test_cannot_add_histogram_with_existing_id(self):
+        cmd = deepcopy(ADD_CMD)
+        cmd["msg_id"] = "hello"
+        cmd["histograms"][0]["id"] = "dethist"
+
+        self.actioner.handle_command_message(cmd, self.hist_processes)
+
+        assert self.hist_processes == self.original
+        self.response_publisher.send_error_response.assert_called_once()
+
+    def test_cannot_add_histogram_without_id(self):
+        cmd = deepcopy(ADD_CMD)
+        del cmd["histograms"][0]["id"]
+
+        self.actioner.handle_command_message(cmd, self.hist_processes)
+
+        assert self.hist_processes == self.original
+
+    def test_cannot_add_histograms_with_duplicate_ids(self):
+        cmd = deepcopy(ADD_CMD)
+        cmd["histograms"].append(deepcopy(cmd["histograms"][0]))
+
+        self.actioner.handle_command_message(cmd, self.hist_processes)
+
+        assert self.hist_processes == self.original
+
+    def test_if_adding_fails_then_only_new_processes_are_stopped(self, monkeypatch):
+        monkeypatch.setattr(
+            command_actioner, "are_kafka_settings_valid", lambda *args: False
+        )
+        self.actioner.simulation = False
+
+        self.actioner.handle_command_message(deepcopy(ADD_CMD), self.hist_processes)
+
+        assert self.hist_processes == self.original
+        assert not any(p.stop_called for p in self.original)
+
+    def test_removed_histogram_process_is_stopped_and_others_untouched(self):
+        self.actioner.handle_command_message(
+            {"cmd": "remove_histograms", "ids": ["histogram1d"]}, self.hist_processes
+        )
+
+        assert self.hist_processes == [self.original[1]]
+        assert self.original[0].stop_called
+        assert not self.original[1].stop_called
+
+    def test_removing_unknown_id_removes_nothing(self):
+        cmd = {
+            "cmd": "remove_histograms",
+            "ids": ["histogram1d", "unknown"],
+            "msg_id": "hello",
+        }
+
+        self.actioner.handle_command_message(cmd, self.hist_processes)
+
+        assert self.hist_processes == self.original
+        assert not any(p.stop_called for p in self.original)
+        self.response_publisher.send_error_response.assert_called_once()
+
+    def test_can_add_histogram_again_after_removing_it(self):
+        self.actioner.handle_command_message(deepcopy(ADD_CMD), self.hist_processes)
+        self.actioner.handle_command_message(
+            {"cmd": "remove_histograms", "ids": ["monitor"]}, self.hist_processes
+        )
+
+        self.actioner.handle_command_message(deepcopy(ADD_CMD), self.hist_processes)
+
+        assert len(self.hist_processes) == 3
@@ -132,6 +132,26 @@ class TestConfigHandler:
         with pytest.raises(Exception):
             parse_config(config)
 
+    def test_if_no_time_cut_then_message_time_is_used(self):
+        _, _, hists = parse_config(copy.deepcopy(CONFIG_FULL))
+
+        assert all(h["time_cut"] == "message" for h in hists)
+
+    def test_time_cut_is_added_to_histogram_settings(self):
+        config = copy.deepcopy(CONFIG_FULL)
+        config["time_cut"] = "pulse"
+
+        _, _, hists = parse_config(config)
+
+        assert all(h["time_cut"] == "pulse" for h in hists)
+
+    def test_if_time_cut_unrecognised_then_parsing_throws(self):
+        config = copy.deepcopy(CONFIG_FULL)
+        config["time_cut"] = "sometimes"
+
+        with pytest.raises(Exception):
+            parse_config(config)
+
     def test_if_does_not_contains_histogram_then_none_found(self):
         config = copy.deepcopy(CONFIG_FULL)
         del config["histograms"]
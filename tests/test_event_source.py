@@ -7,6 +7,7 @@ from just_bin_it.endpoints.sources import (
     StopTimeStatus,
     TooOldTimeRequestedException,
 )
+from just_bin_it.exceptions import SourceException
 from tests.doubles.consumer import StubConsumer, get_fake_event_messages
 
 
@@ -186,6 +187,70 @@ class TestEventSourceSinglePartition:
 
         assert self.event_source.stop_time_exceeded() == StopTimeStatus.EXCEEDED
 
+    def test_lag_is_number_of_unconsumed_messages(self):
+        self.consumer.seek_by_offsets([90])
+
+        assert self.event_source.get_lag(0) == [
+            {"messages": len(self.messages) - 90}
+        ]
+
+    def test_if_up_to_date_then_no_lag(self):
+        self.event_source.get_new_data()
+
+        assert self.event_source.get_lag(0) == [{"messages": 0, "time-ms": 0}]
+
+    def test_time_lag_is_age_of_last_consumed_message(self):
+        self.event_source.get_new_data()
+        last_timestamp, _, _ = self.messages[-1]
+        self.consumer.add_messages(self.serialised_messages[:5])
+
+        lag = self.event_source.get_lag(last_timestamp + 2000)
+
+        assert lag == [{"messages": 5, "time-ms": 2000}]
+
+    def test_seek_to_offsets_moves_consumer(self):
+        self.event_source.seek_to_offsets([45])
+
+        assert self.event_source.get_positions() == [45]
+        new_data = self.event_source.get_new_data()
+        assert compare_two_messages(self.messages[45], new_data[0])
+
+    def test_seek_to_offsets_with_wrong_number_of_partitions_throws(self):
+        with pytest.raises(SourceException):
+            self.event_source.seek_to_offsets([45, 46])
+
+    def test_if_not_seeked_then_not_catching_up(self):
+        assert self.event_source.catch_up_progress() is None
+
+    def test_catch_up_progress_is_fraction_of_backlog_consumed(self):
+        _, _, message = self.messages[40]
+        self.event_source.start_time = message.pulse_time
+        self.event_source.seek_to_start_time()
+        backlog = len(self.messages) - 40
+
+        assert self.event_source.catch_up_progress() == 0
+        self.consumer.seek_by_offsets([40 + backlog // 2])
+        assert self.event_source.catch_up_progress() == 0.5
+
+    def test_once_backlog_consumed_then_catch_up_finished(self):
+        _, _, message = self.messages[40]
+        self.event_source.start_time = message.pulse_time
+        self.event_source.seek_to_start_time()
+
+        self.event_source.get_new_data()
+
+        assert self.event_source.catch_up_progress() == 1.0
+        assert self.event_source.catch_up_progress() is None
+
+    def test_lag_is_only_queried_periodically(self):
+        self.event_source.lag_interval_ms = 1000
+        self.event_source.get_lag(0)
+        self.event_source.get_new_data()
+
+        # Still returns the cached value
+        assert self.event_source.get_lag(999) == [{"messages": len(self.messages)}]
+        assert self.event_source.get_lag(1000) == [{"messages": 0, "time-ms": 0}]
+
 
 class TestEventSourceMultiplePartitions:
     @classmethod
@@ -281,6 +346,14 @@ class TestEventSourceMultiplePartitions:
 
         assert offsets == [50, 50, 49]
 
+    def test_lag_is_reported_per_partition(self):
+        end = len(self.messages) // 3
+        self.consumer.seek_by_offsets([end - 5, end, end - 10])
+
+        lag = self.event_source.get_lag(0)
+
+        assert [p["messages"] for p in lag] == [5, 0, 10]
+
     def test_if_stop_time_ahead_of_latest_message_in_kafka_then_unknown(self):
         start_time, _, _ = self.messages[-1]
         stop_time = start_time + 10
@@ -0,0 +1,160 @@
+from multiprocessing import Process
+
+import pytest
+
+from just_bin_it.endpoints.config_listener import ConfigListener
+from just_bin_it.endpoints.sources import EventSource
+from just_bin_it.exceptions import KafkaException
+from tests.doubles.fake_broker import (
+    FakeBroker,
+    FakeConsumer,
+    FakeProducer,
+    fake_kafka_settings_valid,
+    register_fake_broker,
+    start_fake_broker,
+)
+
+BROKERS = ["fake:9092"]
+
+
+def produce_in_other_process(brokers, topic, num_messages):
+    producer = FakeProducer(brokers)
+    for i in range(num_messages):
+        producer.publish_message(topic, f"message {i}".encode())
+
+
+class TestFakeBroker:
+    @pytest.fixture(autouse=True)
+    def prepare(self):
+        self.broker = FakeBroker(max_poll_records=3)
+        self.broker.create_topic("data", num_partitions=2)
+        register_fake_broker(BROKERS[0], self.broker)
+
+    def test_produce_returns_partition_and_offset(self):
+        assert self.broker.produce("data", b"a", partition=1) == (1, 0)
+        assert self.broker.produce("data", b"b", partition=1) == (1, 1)
+        assert self.broker.produce("data", b"c", partition=0) == (0, 0)
+
+    def test_produce_without_partition_is_round_robin(self):
+        partitions = [self.broker.produce("data", b"a")[0] for _ in range(4)]
+
+        assert partitions == [0, 1, 0, 1]
+
+    def test_produce_to_unknown_topic_creates_it(self):
+        self.broker.produce("new", b"a")
+
+        assert "new" in self.broker.topics()
+        assert self.broker.partitions_for_topic("new") == {0}
+
+    def test_fetch_is_limited_to_max_poll_records(self):
+        for i in range(5):
+            self.broker.produce("data", bytes([i]), partition=0, timestamp=i)
+
+        records = self.broker.fetch("data", 0, 1)
+
+        assert [r.offset for r in records] == [1, 2, 3]
+        assert [r.timestamp for r in records] == [1, 2, 3]
+
+    def test_offset_for_time(self):
+        for ts in [10, 20, 30]:
+            self.broker.produce("data", b"a", partition=0, timestamp=ts)
+
+        assert self.broker.offset_for_time("data", 0, 15) == 1
+        assert self.broker.offset_for_time("data", 0, 20) == 1
+        assert self.broker.offset_for_time("data", 0, 31) is None
+
+    def test_offset_for_time_with_out_of_order_timestamps(self):
+        for ts in [10, 30, 20, 40]:
+            self.broker.produce("data", b"a", partition=0, timestamp=ts)
+
+        assert self.broker.offset_for_time("data", 0, 15) == 1
+        assert self.broker.offset_for_time("data", 0, 35) == 3
+
+    def test_consumer_starts_at_end_and_gets_new_messages(self):
+        self.broker.produce("data", b"old", partition=0)
+        consumer = FakeConsumer(BROKERS, ["data"])
+        self.broker.produce("data", b"new", partition=1)
+
+        messages = consumer.get_new_messages()
+
+        assert [r.value for records in messages.values() for r in records] == [b"new"]
+        assert consumer.get_positions() == [1, 1]
+        assert consumer.get_end_offsets() == [1, 1]
+
+    def test_consumer_can_seek(self):
+        consumer = FakeConsumer(BROKERS, ["data"])
+        for ts in [10, 20]:
+            self.broker.produce("data", b"a", partition=0, timestamp=ts)
+
+        offsets = consumer.offset_for_time(15)
+        consumer.seek_by_offsets([0 if o is None else o for o in offsets])
+
+        assert offsets == [1, None]
+        assert consumer.get_positions() == [1, 0]
+        assert consumer.get_offset_range() == [(0, 2), (0, 0)]
+
+    def test_consumer_can_switch_topics(self):
+        consumer = FakeConsumer(BROKERS, ["data"])
+        self.broker.create_topic("other")
+        self.broker.produce("other", b"old")
+
+        consumer.assign_topics(["other"])
+        self.broker.produce("other", b"new")
+        messages = consumer.get_new_messages()
+
+        assert [r.value for records in messages.values() for r in records] == [b"new"]
+        assert consumer.get_positions() == [2]
+
+    def test_consumer_for_unknown_topic_raises(self):
+        with pytest.raises(KafkaException):
+            FakeConsumer(BROKERS, ["unknown"])
+
+    def test_unregistered_broker_raises(self):
+        with pytest.raises(KafkaException):
+            FakeProducer(["elsewhere:9092"])
+
+    def test_kafka_settings_valid(self):
+        assert fake_kafka_settings_valid(BROKERS, ["data"])
+        assert not fake_kafka_settings_valid(BROKERS, ["unknown"])
+        assert not fake_kafka_settings_valid(["elsewhere:9092"], ["data"])
+
+    def test_works_as_event_source(self):
+        consumer = FakeConsumer(BROKERS, ["data"])
+        self.broker.produce("data", b"not ev42", partition=0, timestamp=1000)
+        source = EventSource(consumer, 0)
+
+        # Invalid buffers are logged and skipped like for real Kafka.
+        assert source.get_new_data() == []
+        assert source.get_positions() == [1, 0]
+
+    def test_works_as_config_source(self):
+        listener = ConfigListener(FakeConsumer(BROKERS, ["data"]))
+        FakeProducer(BROKERS).publish_message("data", b'{"cmd": "stop"}')
+
+        assert listener.check_for_messages()
+        assert listener.consume_message() == {"cmd": "stop"}
+
+
+class TestSharedFakeBroker:
+    @pytest.fixture(autouse=True)
+    def prepare(self):
+        self.manager, self.broker = start_fake_broker("shared:9092")
+        self.broker.create_topic("data")
+        yield
+        self.manager.shutdown()
+
+    def test_messages_produced_in_other_process_can_be_consumed(self):
+        consumer = FakeConsumer(["shared:9092"], ["data"])
+
+        process = Process(
+            target=produce_in_other_process, args=(["shared:9092"], "data", 3)
+        )
+        process.start()
+        process.join()
+
+        records = consumer.get_new_messages()
+        assert [r.value for r in list(records.values())[0]] == [
+            b"message 0",
+            b"message 1",
+            b"message 2",
+        ]
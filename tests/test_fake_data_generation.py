@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from just_bin_it.exceptions import JustBinItException
+from just_bin_it.utilities.fake_data_generation import (
+    DISTRIBUTIONS,
+    EventPool,
+    generate_fake_data,
+    generate_fake_detector_data,
+    generate_values,
+)
+
+
+class TestFakeDataGeneration:
+    def test_fake_data_is_numpy_arrays(self):
+        tofs, dets = generate_fake_data((0, 1000), (1, 100), 50)
+
+        assert isinstance(tofs, np.ndarray)
+        assert isinstance(dets, np.ndarray)
+        assert len(tofs) == len(dets) == 50
+
+    def test_uniform_values_are_within_range(self):
+        values = generate_values(DISTRIBUTIONS["UNIFORM"], (10, 20), 1000)
+
+        assert values.min() >= 10
+        assert values.max() < 20
+
+    def test_gaussian_is_centred_on_middle_of_range(self):
+        rng = np.random.default_rng(0)
+        values = generate_values(DISTRIBUTIONS["GAUSSIAN"], (1000, 2000), 10000, rng)
+
+        assert abs(values.mean() - 1500) < 5
+        assert abs(values.std() - 100) < 5
+
+    def test_unknown_distribution_raises(self):
+        with pytest.raises(JustBinItException):
+            generate_values("poisson", (10, 20), 1000)
+
+    def test_detector_data_is_within_detector(self):
+        dets = generate_fake_detector_data(10, 5, 1000, DISTRIBUTIONS["UNIFORM"])
+
+        assert dets.min() >= 1
+        assert dets.max() <= 50
+
+
+class TestEventPool:
+    @pytest.fixture(autouse=True)
+    def prepare(self):
+        self.pool = EventPool(np.arange(100), np.arange(100) + 1000)
+
+    def test_take_returns_matching_events(self):
+        tofs, dets = self.pool.take(10)
+
+        assert len(tofs) == 10
+        assert np.array_equal(dets, tofs + 1000)
+
+    def test_can_take_whole_pool(self):
+        tofs, _ = self.pool.take(100)
+
+        assert np.array_equal(tofs, np.arange(100))
+
+    def test_mismatched_lengths_raises(self):
+        with pytest.raises(JustBinItException):
+            EventPool(np.arange(10), np.arange(5))
@@ -0,0 +1,260 @@
+import os
+
+import numpy as np
+import pytest
+
+from just_bin_it.endpoints.event_file import (
+    INDEX_DTYPE,
+    INDEX_SUFFIX,
+    EventFileReader,
+    EventFileWriter,
+    write_length_prefixed,
+)
+from just_bin_it.endpoints.serialisation import serialise_ev42
+from just_bin_it.endpoints.sources import (
+    FileEventSource,
+    StopTimeStatus,
+    TooOldTimeRequestedException,
+)
+from just_bin_it.exceptions import JustBinItException
+
+NUM_MESSAGES = 20
+# Kafka timestamps are in ms
+FIRST_TIMESTAMP = 1_000_000
+TIMESTAMP_GAP = 100
+
+
+def generate_buffers():
+    buffers = []
+    for i in range(NUM_MESSAGES):
+        pulse_time = (FIRST_TIMESTAMP + i * TIMESTAMP_GAP) * 1_000_000
+        buffers.append(serialise_ev42("source", i, pulse_time, [i, i], [i, i]))
+    return buffers
+
+
+@pytest.fixture
+def capture_file(tmp_path):
+    filename = str(tmp_path / "events.jbi")
+    with EventFileWriter(filename) as writer:
+        for i, buf in enumerate(generate_buffers()):
+            writer.write_message(FIRST_TIMESTAMP + i * TIMESTAMP_GAP, 100 + i, 0, buf)
+    return filename
+
+
+@pytest.fixture
+def plain_file(tmp_path):
+    filename = str(tmp_path / "events.dat")
+    write_length_prefixed(filename, generate_buffers())
+    return filename
+
+
+class TestEventFileReader:
+    def test_capture_file_contains_all_messages(self, capture_file):
+        with EventFileReader(capture_file) as reader:
+            assert reader.is_capture
+            assert len(reader) == NUM_MESSAGES
+            assert reader.offsets[0] == 100
+            assert reader.timestamps[-1] == FIRST_TIMESTAMP + 19 * TIMESTAMP_GAP
+
+    def test_plain_file_timestamps_come_from_pulse_time(self, plain_file):
+        with EventFileReader(plain_file) as reader:
+            assert not reader.is_capture
+            assert len(reader) == NUM_MESSAGES
+            assert reader.timestamps[5] == FIRST_TIMESTAMP + 5 * TIMESTAMP_GAP
+
+    def test_capture_file_is_opened_via_index(self, capture_file, monkeypatch):
+        def fail(self):
+            raise AssertionError("Should not scan the file")
+
+        monkeypatch.setattr(EventFileReader, "_build_index", fail)
+
+        with EventFileReader(capture_file) as reader:
+            assert len(reader) == NUM_MESSAGES
+            assert reader.get_message(3) == generate_buffers()[3]
+
+    def test_if_index_missing_then_file_is_scanned(self, capture_file):
+        os.remove(capture_file + INDEX_SUFFIX)
+
+        with EventFileReader(capture_file) as reader:
+            assert len(reader) == NUM_MESSAGES
+            assert reader.offsets[3] == 103
+
+    def test_if_index_has_entries_missing_then_file_is_scanned(self, capture_file):
+        index_file = capture_file + INDEX_SUFFIX
+        index = np.fromfile(index_file, dtype=INDEX_DTYPE)
+        # Lose the first entry, so the last one still ends at the end of file.
+        index[1:].tofile(index_file)
+
+        with EventFileReader(capture_file) as reader:
+            assert not reader.index_loaded
+            assert len(reader) == NUM_MESSAGES
+            assert reader.offsets[0] == 100
+
+    def test_if_index_has_extra_entries_then_file_is_scanned(self, capture_file):
+        index_file = capture_file + INDEX_SUFFIX
+        index = np.fromfile(index_file, dtype=INDEX_DTYPE)
+        np.concatenate((index[:1], index)).tofile(index_file)
+
+        with EventFileReader(capture_file) as reader:
+            assert not reader.index_loaded
+            assert len(reader) == NUM_MESSAGES
+
+    def test_if_index_partly_written_then_file_is_scanned(self, capture_file):
+        with open(capture_file + INDEX_SUFFIX, "ab") as file:
+            file.write(b"abc")
+
+        with EventFileReader(capture_file) as reader:
+            assert not reader.index_loaded
+            assert len(reader) == NUM_MESSAGES
+
+    def test_writer_only_writes_to_disk_when_buffer_is_full(self, tmp_path):
+        filename = str(tmp_path / "buffered.jbi")
+        buffers = generate_buffers()
+
+        with EventFileWriter(filename, buffer_size=len(buffers[0]) * 3) as writer:
+            writer.write_message(0, 0, 0, buffers[0])
+            writer.write_message(0, 1, 0, buffers[1])
+            with EventFileReader(filename) as reader:
+                assert len(reader) == 0
+
+            writer.write_message(0, 2, 0, buffers[2])
+            with EventFileReader(filename) as reader:
+                assert len(reader) == 3
+
+    def test_appending_adds_to_existing_messages(self, capture_file):
+        with EventFileWriter(capture_file, append=True) as writer:
+            writer.write_message(FIRST_TIMESTAMP * 2, 500, 1, generate_buffers()[0])
+
+        with EventFileReader(capture_file) as reader:
+            assert len(reader) == NUM_MESSAGES + 1
+            assert reader.partitions[-1] == 1
+            assert reader.find_index_for_time(FIRST_TIMESTAMP * 2) == NUM_MESSAGES
+
+    def test_appending_after_crash_repairs_file_and_index(self, capture_file):
+        # Killed after writing part of a message but before its index entry.
+        with open(capture_file, "ab") as file:
+            file.write(b"partial")
+
+        with EventFileWriter(capture_file, append=True) as writer:
+            writer.write_message(FIRST_TIMESTAMP * 2, 500, 1, generate_buffers()[3])
+
+        with EventFileReader(capture_file) as reader:
+            assert reader.index_loaded
+            assert len(reader) == NUM_MESSAGES + 1
+            assert reader.get_message(NUM_MESSAGES) == generate_buffers()[3]
+
+    def test_appending_to_plain_file_throws(self, plain_file):
+        with pytest.raises(JustBinItException):
+            EventFileWriter(plain_file, append=True)
+
+    def test_truncated_final_message_is_ignored(self, capture_file):
+        with open(capture_file, "rb+") as file:
+            file.seek(-5, 2)
+            file.truncate()
+
+        with EventFileReader(capture_file) as reader:
+            assert len(reader) == NUM_MESSAGES - 1
+
+    def test_empty_file_has_no_messages(self, tmp_path):
+        filename = str(tmp_path / "empty.dat")
+        open(filename, "wb").close()
+
+        with EventFileReader(filename) as reader:
+            assert len(reader) == 0
+
+    def test_find_index_for_time_between_messages_gives_next_message(
+        self, capture_file
+    ):
+        with EventFileReader(capture_file) as reader:
+            assert reader.find_index_for_time(FIRST_TIMESTAMP + 150) == 2
+            assert reader.find_index_for_time(FIRST_TIMESTAMP * 2) is None
+
+    def test_find_index_for_time_with_out_of_order_messages(self, tmp_path):
+        filename = str(tmp_path / "unordered.jbi")
+        buffers = generate_buffers()
+        with EventFileWriter(filename) as writer:
+            for i, timestamp in enumerate([100, 300, 200, 400]):
+                writer.write_message(timestamp, i, i % 2, buffers[i])
+
+        with EventFileReader(filename) as reader:
+            assert reader.find_index_for_time(250) == 1
+            assert reader.find_index_for_time(350) == 3
+
+
+class TestFileEventSource:
+    @pytest.fixture(autouse=True)
+    def prepare(self, capture_file):
+        self.reader = EventFileReader(capture_file)
+        self.event_source = FileEventSource(self.reader, max_messages=5)
+        yield
+        self.reader.close()
+
+    def test_if_no_reader_supplied_then_raises(self):
+        with pytest.raises(Exception):
+            FileEventSource(None)
+
+    def test_data_is_returned_in_batches(self):
+        data = self.event_source.get_new_data()
+
+        assert len(data) == 5
+        timestamp, offset, event_data = data[0]
+        assert timestamp == FIRST_TIMESTAMP
+        assert offset == 100
+        assert event_data.message_id == 0
+        assert event_data.time_of_flight.tolist() == [0, 0]
+
+    def test_once_file_is_exhausted_no_more_data_and_stop_time_exceeded(self):
+        for _ in range(4):
+            self.event_source.get_new_data()
+
+        assert self.event_source.get_new_data() == []
+        assert self.event_source.stop_time_exceeded() == StopTimeStatus.EXCEEDED
+
+    def test_seek_to_start_time_finds_first_message_after_start(self):
+        self.event_source.start_time = FIRST_TIMESTAMP + 450
+
+        self.event_source.seek_to_start_time()
+        data = self.event_source.get_new_data()
+
+        assert data[0][2].message_id == 5
+
+    def test_seek_to_time_before_file_throws(self):
+        self.event_source.start_time = FIRST_TIMESTAMP - 1
+
+        with pytest.raises(TooOldTimeRequestedException):
+            self.event_source.seek_to_start_time()
+
+    def test_seek_to_time_after_file_moves_to_end(self):
+        self.event_source.start_time = FIRST_TIMESTAMP * 2
+
+        self.event_source.seek_to_start_time()
+
+        assert self.event_source.get_new_data() == []
+
+    def test_stop_time_not_exceeded_until_stop_message_reached(self):
+        self.event_source.stop_time = FIRST_TIMESTAMP + 5 * TIMESTAMP_GAP
+
+        self.event_source.max_messages = 4
+        self.event_source.get_new_data()
+        assert self.event_source.stop_time_exceeded() == StopTimeStatus.NOT_EXCEEDED
+
+        self.event_source.get_new_data()
+        assert self.event_source.stop_time_exceeded() == StopTimeStatus.EXCEEDED
+
+    def test_messages_after_stop_time_are_not_read(self):
+        self.event_source.stop_time = FIRST_TIMESTAMP + 5 * TIMESTAMP_GAP
+
+        self.event_source.max_messages = 10
+        data = self.event_source.get_new_data()
+
+        assert [msg.message_id for _, _, msg in data] == [0, 1, 2, 3, 4, 5]
+        assert self.event_source.get_new_data() == []
+        assert self.event_source.stop_time_exceeded() == StopTimeStatus.EXCEEDED
+
+    def test_realtime_replay_only_returns_messages_that_are_due(self):
+        self.event_source.realtime = True
+
+        # Only the first message is due immediately as the others are 100 ms apart.
+        data = self.event_source.get_new_data()
+
+        assert len(data) == 1
@@ -44,6 +44,27 @@ class TestHistogram1d:
         # Edges should not change
         assert np.array_equal(self.hist.x_edges, x_edges)
 
+    def test_upper_edge_is_excluded_without_detector_range(self):
+        self.hist.add_data(self.pulse_time, np.array([4.9, 5]))
+
+        assert self.hist.data.tolist() == [0, 0, 0, 0, 1]
+
+    def test_upper_edge_is_included_with_detector_range(self):
+        hist = Histogram1d("topic1", self.num_bins, self.range, det_range=(1, 10))
+
+        hist.add_data(self.pulse_time, np.array([4.9, 5]), np.array([1, 1]))
+
+        assert hist.data.tolist() == [0, 0, 0, 0, 2]
+
+    def test_same_result_as_numpy_for_random_data(self):
+        hist = Histogram1d("topic1", 1000, (0, 100_000_000))
+        tofs = np.random.default_rng(0).integers(0, 110_000_000, 10_000)
+
+        hist.add_data(self.pulse_time, tofs)
+
+        expected, _ = np.histogram(tofs, 1000, (0, 100_000_000))
+        assert np.array_equal(hist.data, expected)
+
     def test_only_data_with_correct_source_is_added(self):
         hist = Histogram1d("topic1", self.num_bins, self.range, source="source1")
 
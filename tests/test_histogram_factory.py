@@ -1,3 +1,4 @@
+import json
 from copy import deepcopy
 
 import pytest
@@ -6,6 +7,9 @@ from just_bin_it.histograms.det_histogram import DetHistogram
 from just_bin_it.histograms.histogram1d import Histogram1d
 from just_bin_it.histograms.histogram2d import Histogram2d
 from just_bin_it.histograms.histogram_factory import HistogramFactory
+from just_bin_it.histograms.nd_histogram import NdHistogram
+from just_bin_it.histograms.rate_histogram import RateHistogram
+from just_bin_it.histograms.rolling_histogram import RollingHistogram
 
 CONFIG_1D = [
     {
@@ -277,3 +281,211 @@ class TestHistogramFactory2DMap:
         histograms = HistogramFactory.generate(self.config)
 
         assert histograms[0].identifier == "123456"
+
+
+class TestRollingHistogramCreation:
+    @pytest.fixture(autouse=True)
+    def prepare(self):
+        self.config = deepcopy(CONFIG_2D)
+        self.config[0]["window"] = {"topic": "rolling", "length": 10, "id": "abc"}
+
+    def test_if_window_configured_then_rolling_histogram_created_as_well(self):
+        histograms = HistogramFactory.generate(self.config)
+
+        assert len(histograms) == 2
+        assert isinstance(histograms[0], Histogram2d)
+        assert isinstance(histograms[1], RollingHistogram)
+        assert histograms[1].topic == "rolling"
+        assert histograms[1].identifier == "abc"
+        assert histograms[1].window_length == 10 * 10 ** 9
+        assert histograms[1].shape == histograms[0].shape
+
+    def test_if_window_has_no_topic_then_only_cumulative_histogram_created(self):
+        del self.config[0]["window"]["topic"]
+
+        histograms = HistogramFactory.generate(self.config)
+
+        assert len(histograms) == 1
+        assert isinstance(histograms[0], Histogram2d)
+
+
+class TestPyramidCreation:
+    @pytest.fixture(autouse=True)
+    def prepare(self):
+        self.config = deepcopy(CONFIG_2D)
+        self.config[0]["pyramid"] = [
+            {"factor": 2, "topic": "level2"},
+            {"factor": 4, "topic": "level4"},
+        ]
+
+    def test_if_pyramid_configured_then_levels_are_set(self):
+        histograms = HistogramFactory.generate(self.config)
+
+        assert histograms[0].pyramid == [(2, "level2"), (4, "level4")]
+
+    def test_if_no_pyramid_configured_then_no_levels(self):
+        del self.config[0]["pyramid"]
+
+        histograms = HistogramFactory.generate(self.config)
+
+        assert histograms[0].pyramid == []
+
+    def test_if_factor_invalid_then_histogram_not_created(self):
+        self.config[0]["pyramid"][0]["factor"] = 1
+
+        histograms = HistogramFactory.generate(self.config)
+
+        assert len(histograms) == 0
+
+    def test_if_topic_missing_then_histogram_not_created(self):
+        del self.config[0]["pyramid"][0]["topic"]
+
+        histograms = HistogramFactory.generate(self.config)
+
+        assert len(histograms) == 0
+
+
+class TestRateHistogramCreation:
+    @pytest.fixture(autouse=True)
+    def prepare(self):
+        self.config = [
+            {
+                "type": "rate",
+                "num_bins": 100,
+                "bin_width": 0.5,
+                "topic": "rate-topic",
+                "id": "rate",
+            }
+        ]
+
+    def test_rate_histogram_created(self):
+        histograms = HistogramFactory.generate(self.config)
+
+        assert isinstance(histograms[0], RateHistogram)
+        assert histograms[0].bin_width == 500_000_000
+        assert histograms[0].shape == (100,)
+        assert histograms[0].identifier == "rate"
+
+    def test_if_bin_width_missing_then_histogram_not_created(self):
+        del self.config[0]["bin_width"]
+
+        histograms = HistogramFactory.generate(self.config)
+
+        assert len(histograms) == 0
+
+    def test_if_bin_width_not_positive_then_histogram_not_created(self):
+        self.config[0]["bin_width"] = 0
+
+        histograms = HistogramFactory.generate(self.config)
+
+        assert len(histograms) == 0
+
+    def test_if_num_bins_missing_then_histogram_not_created(self):
+        del self.config[0]["num_bins"]
+
+        histograms = HistogramFactory.generate(self.config)
+
+        assert len(histograms) == 0
+
+
+class TestRoiCreation:
+    @pytest.fixture(autouse=True)
+    def prepare(self):
+        self.config = deepcopy(CONFIG_1D)
+        self.config[0]["roi"] = {"include": [[1, 10]], "exclude": [5]}
+
+    def test_if_roi_configured_then_it_is_compiled_for_histogram(self):
+        histograms = HistogramFactory.generate(self.config)
+
+        assert histograms[0].roi.tolist()[4:7] == [True, False, True]
+
+    def test_if_no_roi_then_none(self):
+        histograms = HistogramFactory.generate(CONFIG_1D)
+
+        assert histograms[0].roi is None
+
+    def test_if_roi_invalid_then_histogram_not_created(self):
+        self.config[0]["roi"] = {"include": [[10, 1]]}
+
+        histograms = HistogramFactory.generate(self.config)
+
+        assert len(histograms) == 0
+
+
+class TestNdHistogramCreation:
+    @pytest.fixture(autouse=True)
+    def prepare(self):
+        self.config = [
+            {
+                "type": "histnd",
+                "topic": "nd-topic",
+                "width": 4,
+                "height": 2,
+                "axes": [
+                    {"quantity": "pixel_x"},
+                    {"quantity": "pixel_y"},
+                    {"quantity": "pulse_phase", "num_bins": 10, "period": 0.1},
+                ],
+                "id": "nd",
+            }
+        ]
+
+    def test_nd_histogram_created(self):
+        histograms = HistogramFactory.generate(self.config)
+
+        assert isinstance(histograms[0], NdHistogram)
+        assert histograms[0].shape == (4, 2, 10)
+        assert histograms[0].axes[2].period == 100_000_000
+        assert histograms[0].identifier == "nd"
+
+    def test_if_axes_missing_then_histogram_not_created(self):
+        del self.config[0]["axes"]
+
+        histograms = HistogramFactory.generate(self.config)
+
+        assert len(histograms) == 0
+
+    def test_if_quantity_unknown_then_histogram_not_created(self):
+        self.config[0]["axes"][0]["quantity"] = "energy"
+
+        histograms = HistogramFactory.generate(self.config)
+
+        assert len(histograms) == 0
+
+
+class TestUnitsCreation:
+    @pytest.fixture(autouse=True)
+    def prepare(self, tmp_path):
+        self.geometry = tmp_path / "geometry.json"
+        self.geometry.write_text(
+            json.dumps({"l1": 10, "detector_ids": [1, 2], "l2": [1, 2]})
+        )
+        self.config = deepcopy(CONFIG_1D)
+        self.config[0]["units"] = "wavelength"
+        self.config[0]["geometry"] = str(self.geometry)
+
+    def test_if_units_configured_then_conversion_is_created(self):
+        histograms = HistogramFactory.generate(self.config)
+
+        assert histograms[0].axes[0].conversion[2] == pytest.approx(3956.034e-9 / 12)
+
+    def test_if_no_units_then_no_conversion(self):
+        histograms = HistogramFactory.generate(CONFIG_1D)
+
+        assert histograms[0].axes[0].conversion is None
+
+    def test_if_geometry_missing_then_histogram_not_created(self):
+        del self.config[0]["geometry"]
+
+        histograms = HistogramFactory.generate(self.config)
+
+        assert len(histograms) == 0
+
+    def test_if_units_set_for_dethist_then_histogram_not_created(self):
+        config = deepcopy(CONFIG_2D_MAP)
+        config[0]["units"] = "wavelength"
+        config[0]["geometry"] = str(self.geometry)
+
+        histograms = HistogramFactory.generate(config)
+
+        assert len(histograms) == 0
@@ -1,10 +1,25 @@
+import os
 import time
 from contextlib import contextmanager
 from multiprocessing import Queue
 
+import numpy as np
 import pytest
 
-from just_bin_it.histograms.histogram_process import Processor, StopTimeStatus
+from just_bin_it.endpoints.histogram_sink import HistogramSink
+from just_bin_it.endpoints.serialisation import EventData
+from just_bin_it.histograms.checkpoint import Checkpointer
+from just_bin_it.histograms.histogram1d import Histogram1d
+from just_bin_it.histograms.histogram_factory import HistogramFactory
+from just_bin_it.histograms.histogram_process import (
+    Processor,
+    StopTimeStatus,
+    create_event_source,
+)
+from just_bin_it.histograms.histogrammer import Histogrammer
+from just_bin_it.histograms.load_shedding import LoadShedder
+from just_bin_it.utilities.stage_timer import StageTimer
+from tests.doubles.producers import SpyProducer
 
 VALID_CONFIG = {
     "data_brokers": ["localhost:9092", "someserver:9092"],
@@ -19,14 +34,20 @@ VALID_CONFIG = {
 
 class MockHistogrammer:
     def __init__(self):
+        self.histograms = []
         self.cleared = False
+        self.replaced_with = None
         self.histogramming_stopped = False
         self.times_publish_called = 0
         self.data_received = []
+        self.time_cut = "message"
 
     def clear_histograms(self):
         self.cleared = True
 
+    def replace_histograms(self, histograms):
+        self.replaced_with = histograms
+
     def check_stop_time_exceeded(self, timestamp: int):
         return self.histogramming_stopped
 
@@ -43,7 +64,7 @@ class MockHistogrammer:
             "times_published": self.times_publish_called,
         }
 
-    def add_data(self, event_buffer):
+    def add_data(self, event_buffer, batch=False):
         self.data_received.append(event_buffer)
 
 
@@ -51,16 +72,32 @@ class MockEventSource:
     def __init__(self):
         self.stop_time = StopTimeStatus.NOT_EXCEEDED
         self.data = []
-
-    def get_new_data(self):
+        self.lag = []
+        self.progress = None
+        self.positions = [0]
+        self.max_records_requested = []
+        self.stop_time_checks = 0
+
+    def get_new_data(self, max_records=None):
+        self.max_records_requested.append(max_records)
         return self.data
 
     def seek_to_start_time(self):
         pass
 
     def stop_time_exceeded(self):
+        self.stop_time_checks += 1
         return self.stop_time
 
+    def get_lag(self, current_time_ms):
+        return self.lag
+
+    def catch_up_progress(self):
+        return self.progress
+
+    def get_positions(self):
+        return self.positions
+
 
 class TestHistogramProcessLowLevel:
     @pytest.fixture(autouse=True)
@@ -105,6 +142,21 @@ class TestHistogramProcessLowLevel:
         assert not self.histogrammer.histogramming_stopped
         assert self.histogrammer.cleared
 
+    def test_on_reconfigure_command_histograms_are_replaced(self):
+        self._queue_command_message({"cmd": "reconfigure", "config": VALID_CONFIG})
+        self.processor.run_processing()
+
+        assert not self.processor.processing_finished
+        assert len(self.histogrammer.replaced_with) == 1
+        assert self.histogrammer.replaced_with[0].num_bins == 50
+
+    def test_on_reconfigure_command_new_histograms_are_published_immediately(self):
+        self.processor.time_to_publish = time.time() * 1000 + 100_000
+        self._queue_command_message({"cmd": "reconfigure", "config": VALID_CONFIG})
+        self.processor.run_processing()
+
+        assert self.histogrammer.times_publish_called == 2
+
     def test_processing_requests_stop_if_stop_sent_immediately(self):
         self._queue_command_message("stop")
         self.processor.run_processing()
@@ -167,7 +219,7 @@ class TestHistogramProcessLowLevel:
         assert self.histogrammer.histogramming_stopped
 
     def test_processing_does_not_request_stop_if_event_source_does_not_know_and_histogrammer_does_not_says_time_exceeded(
-        self
+        self,
     ):
         self.event_source.stop_time = StopTimeStatus.UNKNOWN
         self.histogrammer.histogramming_stopped = False
@@ -178,7 +230,7 @@ class TestHistogramProcessLowLevel:
         assert not self.histogrammer.histogramming_stopped
 
     def test_processing_requests_stop_if_event_source_does_not_know_and_histogrammer_says_time_exceeded(
-        self
+        self,
     ):
         self.event_source.stop_time = StopTimeStatus.UNKNOWN
         self.histogrammer.histogramming_stopped = True
@@ -189,7 +241,7 @@ class TestHistogramProcessLowLevel:
         assert self.histogrammer.histogramming_stopped
 
     def test_processing_does_not_request_stop_if_histogrammer_says_time_exceeded_but_event_source_does_not(
-        self
+        self,
     ):
         self.event_source.stop_time = StopTimeStatus.NOT_EXCEEDED
         self.histogrammer.histogramming_stopped = True
@@ -198,6 +250,74 @@ class TestHistogramProcessLowLevel:
 
         assert not self.processor.processing_finished
 
+    def test_if_pulse_time_cut_then_stop_decided_by_histogrammer_not_kafka(self):
+        self.histogrammer.time_cut = "pulse"
+        self.event_source.stop_time = StopTimeStatus.EXCEEDED
+
+        self.processor.run_processing()
+        assert not self.processor.processing_finished
+
+        self.histogrammer.histogramming_stopped = True
+        self.processor.run_processing()
+        assert self.processor.processing_finished
+
+    def _create_historical_pulse_processor(self):
+        # A window that finished long ago.
+        now_ms = time.time_ns() // 1_000_000
+        self.start_ms = now_ms - 3_600_000
+        self.stop_ms = now_ms - 1_800_000
+        histogrammer = Histogrammer(
+            HistogramSink(SpyProducer()),
+            [Histogram1d("topic", 10, (0, 10))],
+            self.start_ms,
+            self.stop_ms,
+            "pulse",
+        )
+        self.event_source.progress = 0.1
+        self.event_source.lag = [{"messages": 1000}]
+        return Processor(
+            histogrammer,
+            self.event_source,
+            self.msg_queue,
+            self.stats_queue,
+            publish_interval=500,
+        )
+
+    def _pulse_message(self, pulse_time_ms):
+        pulse_time = pulse_time_ms * 1_000_000
+        return (0, 0, EventData("source", 0, pulse_time, [1], [1], None))
+
+    def test_if_pulse_time_cut_then_historical_window_not_stopped_by_wall_clock(
+        self,
+    ):
+        processor = self._create_historical_pulse_processor()
+        self.event_source.data = [self._pulse_message(self.start_ms + 1000)]
+
+        processor.run_processing()
+
+        assert not processor.processing_finished
+
+    def test_if_pulse_time_cut_then_historical_window_stops_after_later_pulse(self):
+        processor = self._create_historical_pulse_processor()
+        self.event_source.data = [self._pulse_message(self.stop_ms + 1)]
+        processor.run_processing()
+        self.event_source.data = []
+
+        processor.run_processing()
+
+        assert processor.processing_finished
+
+    def test_if_pulse_time_cut_and_at_end_of_topic_then_stopped_by_wall_clock(
+        self,
+    ):
+        processor = self._create_historical_pulse_processor()
+        self.event_source.progress = None
+        self.event_source.lag = [{"messages": 0}]
+
+        processor.run_processing()
+
+        assert processor.processing_finished
+
     def test_processing_requests_does_not_flag_stopped_if_no_reason_to_stop(self):
         self.event_source.stop_time = StopTimeStatus.NOT_EXCEEDED
 
@@ -213,15 +333,210 @@ class TestHistogramProcessLowLevel:
 
         assert self.histogrammer.data_received
 
+    def test_if_timer_supplied_then_binning_and_counts_are_in_stats(self):
+        processor = Processor(
+            self.histogrammer,
+            self.event_source,
+            self.msg_queue,
+            self.stats_queue,
+            publish_interval=1,
+            timer=StageTimer(),
+        )
+        self.event_source.data = [
+            (0, 0, EventData("source", 0, 0, [1, 2, 3], [1, 2, 3], None)),
+            (1, 1, EventData("source", 1, 1, [1, 2], [1, 2], None)),
+        ]
+        time.sleep(0.01)
+
+        processor.run_processing()
+        time.sleep(0.1)
+        stats = None
+        while not self.stats_queue.empty():
+            stats = self.stats_queue.get(block=True)
+
+        assert "binning-wall-ms" in stats["process"]
+        assert stats["process"]["messages"] == 2
+        assert stats["process"]["events"] == 5
+
+    def test_lag_is_published_with_the_stats(self):
+        self.event_source.lag = [
+            {"messages": 10, "time-ms": 500},
+            {"messages": 5},
+        ]
+
+        self.processor.publish_data(time.time_ns())
+        time.sleep(0.1)
+        stats = None
+        while not self.stats_queue.empty():
+            stats = self.stats_queue.get(block=True)
+
+        assert stats["process"]["lag-0-messages"] == 10
+        assert stats["process"]["lag-0-time-ms"] == 500
+        assert stats["process"]["lag-1-messages"] == 5
+        assert stats["process"]["lag-messages"] == 15
+        assert stats["process"]["lag-time-ms"] == 500
+
+    def test_if_behind_with_load_shedder_then_dropped_events_recorded(self):
+        processor = Processor(
+            self.histogrammer,
+            self.event_source,
+            self.msg_queue,
+            self.stats_queue,
+            publish_interval=500,
+            load_shedder=LoadShedder("sample", max_lag=10, fraction=0.5),
+        )
+        self.event_source.lag = [{"messages": 100}]
+        self.event_source.data = [
+            (0, 0, EventData("source", 0, 0, [1, 2, 3, 4], [1, 2, 3, 4], None))
+        ]
+
+        processor.run_processing()
+
+        _, _, msg = self.histogrammer.data_received[0][0]
+        assert len(msg.detector_id) == 2
+        assert self.histogrammer.dropped_events == 2
+
+    def test_if_catching_up_then_data_is_batched_and_progress_published(self):
+        self.event_source.progress = 0.5
+        processor = Processor(
+            self.histogrammer,
+            self.event_source,
+            self.msg_queue,
+            self.stats_queue,
+            publish_interval=500,
+            catch_up_batch=5,
+        )
+        message = (0, 0, EventData("source", 0, 0, [1], [1], None))
+        self.event_source.data = [message, message]
+
+        processor.run_processing()
+
+        assert processor.catching_up
+        # Polled until the batch was full
+        assert len(self.histogrammer.data_received[0]) == 6
+        assert self.histogrammer.catch_up_progress == 0.5
+        time.sleep(0.1)
+        stats = None
+        while not self.stats_queue.empty():
+            stats = self.stats_queue.get(block=True)
+        assert stats["process"]["catch-up-progress"] == 0.5
+
+    def test_if_catching_up_then_only_rest_of_batch_is_requested(self):
+        self.event_source.progress = 0.5
+        processor = Processor(
+            self.histogrammer,
+            self.event_source,
+            self.msg_queue,
+            self.stats_queue,
+            publish_interval=500,
+            catch_up_batch=5,
+        )
+        message = (0, 0, EventData("source", 0, 0, [1], [1], None))
+        self.event_source.data = [message, message]
+
+        processor.run_processing()
+
+        assert self.event_source.max_records_requested == [5, 3, 1]
+
+    def test_if_end_of_backlog_reached_then_stops_polling_for_batch(self):
+        self.event_source.progress = 0.5
+        processor = Processor(
+            self.histogrammer,
+            self.event_source,
+            self.msg_queue,
+            self.stats_queue,
+            publish_interval=500,
+            catch_up_batch=5,
+        )
+        message = (0, 0, EventData("source", 0, 0, [1], [1], None))
+        self.event_source.data = [message, message]
+        self.event_source.progress = 1.0
+
+        processor.run_processing()
+
+        assert len(self.histogrammer.data_received[0]) == 2
+        assert not processor.catching_up
+
+    def test_if_catching_up_then_stop_time_not_checked_every_time(self):
+        self.event_source.progress = 0.5
+        processor = Processor(
+            self.histogrammer,
+            self.event_source,
+            self.msg_queue,
+            self.stats_queue,
+            publish_interval=500,
+        )
+
+        for _ in range(3):
+            processor.run_processing()
+
+        assert self.event_source.stop_time_checks == 1
+
+    def test_if_live_then_stop_time_checked_every_time(self):
+        processor = Processor(
+            self.histogrammer,
+            self.event_source,
+            self.msg_queue,
+            self.stats_queue,
+            publish_interval=500,
+        )
+
+        for _ in range(3):
+            processor.run_processing()
+
+        assert self.event_source.stop_time_checks == 3
+
+    def test_once_caught_up_then_switches_to_live(self):
+        self.event_source.progress = 0.5
+        processor = Processor(
+            self.histogrammer,
+            self.event_source,
+            self.msg_queue,
+            self.stats_queue,
+            publish_interval=500,
+        )
+
+        self.event_source.progress = 1.0
+        processor.run_processing()
+
+        assert not processor.catching_up
+        assert self.histogrammer.catch_up_progress is None
+
+    def test_if_checkpoint_due_then_histograms_and_positions_saved(self, tmp_path):
+        histograms = [Histogram1d("topic", 10, (0, 10))]
+        self.histogrammer.histograms = histograms
+        self.event_source.positions = [123]
+        checkpointer = Checkpointer(str(tmp_path / "hist.npz"), "hash", 60_000)
+        processor = Processor(
+            self.histogrammer,
+            self.event_source,
+            self.msg_queue,
+            self.stats_queue,
+            publish_interval=500,
+            checkpointer=checkpointer,
+        )
+        histograms[0].add_data(1000, [1, 2, 3])
+
+        processor.run_processing()
+
+        restored = [Histogram1d("topic", 10, (0, 10))]
+        assert checkpointer.restore(restored) == [123]
+        assert restored[0].data.sum() == 3
+        assert not checkpointer.is_due(time.time_ns() // 1_000_000)
+
 
 @contextmanager
 def _create_mocked_histogram_process(monkeypatch, publish_interval=1):
     import just_bin_it.histograms.histogram_process as jbi
 
-    def mock_create_histogrammer(configuration, start, stop):
+    def mock_create_histogrammer(
+        configuration, start, stop, timer=None, producers=None
+    ):
         return MockHistogrammer()
 
-    def mock_create_event_source(configuration, start, stop):
+    def mock_create_event_source(
+        configuration, start, stop, timer=None, offsets=None, consumers=None
+    ):
         return MockEventSource()
 
     monkeypatch.setattr(jbi, "create_histogrammer", mock_create_histogrammer)
@@ -254,6 +569,18 @@ def test_no_stats_message_waiting_then_get_none(monkeypatch):
         assert process.get_stats() is None
 
 
+def test_process_stats_are_retrieved_with_histogram_stats(monkeypatch):
+    with _create_mocked_histogram_process(monkeypatch) as process:
+        # Give initial stats message time to arrive.
+        time.sleep(0.1)
+
+        process.get_stats()
+
+        assert "interval-ms" in process.get_process_stats()
+        # Only returned once
+        assert process.get_process_stats() is None
+
+
 def test_on_clear_message_histograms_are_cleared(monkeypatch):
     with _create_mocked_histogram_process(monkeypatch) as process:
         # Give it time to get going.
@@ -265,3 +592,47 @@ def test_on_clear_message_histograms_are_cleared(monkeypatch):
         # Hacky way to get whether the histogrammer has been cleared
         stats = process.get_stats()
         assert stats["cleared"]
+
+
+def test_reconfigure_reuses_backing_file_and_starts_from_zero(tmp_path):
+    backing_file = str(tmp_path / "hist.dat")
+    config = dict(VALID_CONFIG, backing_file=backing_file)
+    histogrammer = Histogrammer(
+        HistogramSink(SpyProducer()), HistogramFactory.generate([config])
+    )
+    processor = Processor(
+        histogrammer, MockEventSource(), Queue(), Queue(), publish_interval=500
+    )
+    histogrammer.histograms[0].add_data(0, [100, 200], source="source1")
+    old_data = histogrammer.histograms[0].data
+
+    # Same number of bins, different range.
+    processor.reconfigure(dict(config, tof_range=[0, 4000]))
+    new_hist = histogrammer.histograms[0]
+    new_hist.add_data(0, [3000], source="source1")
+    processor.publish_data(time.time_ns())
+
+    assert new_hist.tof_range == (0, 4000)
+    assert new_hist.data.sum() == 1
+    # The file is shared rather than truncated underneath the old histogram.
+    assert os.path.getsize(backing_file) == 50 * 8
+    assert np.array_equal(old_data, new_hist.data)
+    assert np.fromfile(backing_file, dtype=np.float64).sum() == 1
+
+
+class SpyConsumer:
+    def __init__(self):
+        self.assigned_topics = None
+
+    def assign_topics(self, topics):
+        self.assigned_topics = topics
+
+
+def test_event_source_reuses_consumer_for_same_brokers():
+    consumer = SpyConsumer()
+    consumers = {tuple(VALID_CONFIG["data_brokers"]): consumer}
+
+    event_source = create_event_source(VALID_CONFIG, None, None, consumers=consumers)
+
+    assert event_source.consumer is consumer
+    assert consumer.assigned_topics == VALID_CONFIG["data_topics"]
@@ -1,6 +1,7 @@
 import pytest
 
 from just_bin_it.endpoints.histogram_sink import HistogramSink
+from just_bin_it.utilities.stage_timer import StageTimer
 from tests.doubles.producers import SpyProducer, StubProducerThatThrows
 
 TEST_MESSAGE = "this is a message"
@@ -41,3 +42,14 @@ class TestHistogramSink:
         with pytest.raises(Exception):
             sink = HistogramSink(StubProducerThatThrows())
             sink.send_histogram(TEST_TOPIC, TEST_MESSAGE)
+
+    def test_if_timer_supplied_then_serialise_and_publish_are_timed(self):
+        timer = StageTimer()
+        sink = HistogramSink(self.producer, lambda x, y, z: (x, y, z), timer=timer)
+
+        sink.send_histogram(TEST_TOPIC, TEST_MESSAGE)
+        stats = timer.get_stats()
+
+        assert len(self.producer.messages) == 1
+        assert "serialise-wall-ms" in stats
+        assert "publish-wall-ms" in stats
@@ -5,8 +5,14 @@ import pytest
 
 from just_bin_it.endpoints.histogram_sink import HistogramSink
 from just_bin_it.endpoints.serialisation import EventData, deserialise_hs00
+from just_bin_it.histograms.histogram1d import Histogram1d
 from just_bin_it.histograms.histogram_factory import HistogramFactory, parse_config
-from just_bin_it.histograms.histogrammer import HISTOGRAM_STATES, Histogrammer
+from just_bin_it.histograms.histogrammer import (
+    HISTOGRAM_STATES,
+    TIME_CUTS,
+    Histogrammer,
+)
+from just_bin_it.histograms.rate_histogram import RateHistogram
 from tests.doubles.producers import SpyProducer
 
 START_CONFIG = {
@@ -344,6 +350,20 @@ class TestHistogrammer:
         assert stats[1]["sum"] == 0
         assert stats[1]["diff"] == 0
 
+    def test_replace_histograms_swaps_in_new_histograms_and_resets_statistics(self):
+        histogrammer = create_histogrammer(self.hist_sink, START_CONFIG)
+        histogrammer.add_data(EVENT_DATA)
+        histogrammer.get_histogram_stats()
+        new_histograms = HistogramFactory.generate(START_2D_CONFIG["histograms"][:1])
+
+        histogrammer.replace_histograms(new_histograms)
+        stats = histogrammer.get_histogram_stats()
+
+        assert histogrammer.histograms == new_histograms
+        assert len(stats) == 1
+        assert stats[0]["sum"] == 0
+        assert stats[0]["diff"] == 0
+
     def test_if_no_data_after_start_time_and_stop_time_exceeded_histogram_is_finished(
         self
     ):
@@ -407,3 +427,116 @@ class TestHistogrammer:
 
         assert "start" in info
         assert "stop" in info
+
+    def test_if_events_dropped_then_count_is_in_the_info(self):
+        config = copy.deepcopy(START_CONFIG)
+        del config["start"]
+
+        histogrammer = create_histogrammer(self.hist_sink, config)
+        histogrammer.dropped_events = 1234
+        info = histogrammer._generate_info(histogrammer.histograms[0])
+
+        assert info["dropped_events"] == 1234
+
+    def test_if_no_events_dropped_then_count_is_not_in_the_info(self):
+        histogrammer = create_histogrammer(self.hist_sink, START_CONFIG)
+        info = histogrammer._generate_info(histogrammer.histograms[0])
+
+        assert "dropped_events" not in info
+
+    def test_if_pyramid_configured_then_rebinned_levels_are_published(self):
+        config = copy.deepcopy(START_CONFIG)
+        del config["histograms"][1]
+        config["histograms"][0]["pyramid"] = [{"factor": 5, "topic": "coarse"}]
+        histogrammer = create_histogrammer(self.hist_sink, config)
+        histogrammer.add_data(EVENT_DATA)
+
+        histogrammer.publish_histograms()
+
+        assert [topic for topic, _ in self.spy_producer.messages] == [
+            "hist-topic1",
+            "coarse",
+        ]
+        data = deserialise_hs00(self.spy_producer.messages[1][1])
+        info = json.loads(data["info"])
+        assert data["current_shape"] == [10]
+        assert data["data"].sum() == 28
+        assert info["rebin_factor"] == 5
+        assert info["id"] == "abcdef"
+
+    def test_batched_data_gives_same_histograms_as_unbatched(self):
+        histogrammer = create_histogrammer(self.hist_sink, START_CONFIG)
+        batched_histogrammer = create_histogrammer(self.hist_sink, START_CONFIG)
+
+        histogrammer.add_data(EVENT_DATA)
+        batched_histogrammer.add_data(EVENT_DATA, batch=True)
+
+        assert batched_histogrammer.histograms[0].data.sum() == 28
+        assert (
+            histogrammer.histograms[0].data == batched_histogrammer.histograms[0].data
+        ).all()
+        assert (
+            histogrammer.histograms[0].last_pulse_time
+            == batched_histogrammer.histograms[0].last_pulse_time
+        )
+
+    def test_if_pulse_time_cut_then_start_and_stop_apply_to_pulse_time(self):
+        histogram = Histogram1d("topic", 10, (0, 10))
+        histogrammer = Histogrammer(
+            self.hist_sink,
+            [histogram],
+            start=1000 * 10 ** 3,
+            stop=1001 * 10 ** 3,
+            time_cut=TIME_CUTS["PULSE"],
+        )
+        # Messages are sent 0.5 s after the pulse.
+        event_data = [
+            (t * 10 ** 3 + 500, i, EventData("source", i, t * 10 ** 9, [1], [1], None))
+            for i, t in enumerate([999, 1000, 1001, 1002])
+        ]
+
+        histogrammer.add_data(event_data)
+
+        # Only the pulses at 1000 and 1001 are within the window.
+        assert histogram.data.sum() == 2
+        assert histogrammer.check_stop_time_exceeded(0)
+
+    def test_if_message_time_cut_then_start_and_stop_apply_to_message_time(self):
+        histogram = Histogram1d("topic", 10, (0, 10))
+        histogrammer = Histogrammer(
+            self.hist_sink, [histogram], start=1000 * 10 ** 3, stop=1001 * 10 ** 3
+        )
+        event_data = [
+            (t * 10 ** 3 + 500, i, EventData("source", i, t * 10 ** 9, [1], [1], None))
+            for i, t in enumerate([999, 1000, 1001, 1002])
+        ]
+
+        histogrammer.add_data(event_data)
+
+        # Only the message sent at 1000.5 is within the window.
+        assert histogram.data.sum() == 1
+
+    def test_batched_data_is_not_combined_for_rate_histograms(self):
+        histogram = RateHistogram("rate", 10, 10 ** 9)
+        histogrammer = Histogrammer(self.hist_sink, [histogram])
+        event_data = [
+            (i, i, EventData("source", i, (1000 + i) * 10 ** 9, [1, 2], [1, 2], None))
+            for i in range(3)
+        ]
+
+        histogrammer.add_data(event_data, batch=True)
+
+        assert histogram.data.tolist() == [0, 0, 0, 0, 0, 0, 0, 2, 2, 2]
+
+    def test_if_catching_up_then_progress_is_in_the_info(self):
+        histogrammer = create_histogrammer(self.hist_sink, START_CONFIG)
+        histogrammer.catch_up_progress = 0.25
+        info = histogrammer._generate_info(histogrammer.histograms[0])
+
+        assert info["catch_up_progress"] == 0.25
+
+    def test_if_not_catching_up_then_progress_is_not_in_the_info(self):
+        histogrammer = create_histogrammer(self.hist_sink, START_CONFIG)
+        info = histogrammer._generate_info(histogrammer.histograms[0])
+
+        assert "catch_up_progress" not in info
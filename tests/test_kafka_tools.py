@@ -0,0 +1,111 @@
+import pytest
+from kafka.errors import KafkaError
+
+from just_bin_it.endpoints.kafka_tools import (
+    TopicMetadataCache,
+    are_kafka_settings_valid,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class SpyMetadataConsumer:
+    def __init__(self, topics):
+        self.existing_topics = topics
+        self.times_topics_called = 0
+        self.closed = False
+        self.fail = False
+
+    def topics(self):
+        if self.fail:
+            raise KafkaError("metadata request failed")
+        self.times_topics_called += 1
+        return set(self.existing_topics)
+
+    def close(self):
+        self.closed = True
+
+
+class TestTopicMetadataCache:
+    @pytest.fixture(autouse=True)
+    def prepare(self):
+        self.clock = FakeClock()
+        self.consumers = []
+        self.cache = TopicMetadataCache(
+            ttl=30, consumer_factory=self._create_consumer, clock=self.clock
+        )
+
+    def _create_consumer(self, brokers):
+        consumer = SpyMetadataConsumer({"topic1", "topic2"})
+        self.consumers.append(consumer)
+        return consumer
+
+    def test_many_checks_need_one_connection_and_one_metadata_request(self):
+        for _ in range(10):
+            assert are_kafka_settings_valid(["broker:9092"], ["topic1"], self.cache)
+
+        assert len(self.consumers) == 1
+        assert self.consumers[0].times_topics_called == 1
+
+    def test_brokers_in_any_order_share_cache(self):
+        are_kafka_settings_valid(["b1:9092", "b2:9092"], ["topic1"], self.cache)
+        are_kafka_settings_valid(["b2:9092", "b1:9092"], ["topic1"], self.cache)
+
+        assert len(self.consumers) == 1
+
+    def test_different_brokers_are_cached_separately(self):
+        are_kafka_settings_valid(["b1:9092"], ["topic1"], self.cache)
+        are_kafka_settings_valid(["b2:9092"], ["topic1"], self.cache)
+
+        assert len(self.consumers) == 2
+
+    def test_topics_fetched_again_on_same_connection_after_ttl(self):
+        are_kafka_settings_valid(["broker:9092"], ["topic1"], self.cache)
+        self.clock.now += 31
+
+        are_kafka_settings_valid(["broker:9092"], ["topic1"], self.cache)
+
+        assert len(self.consumers) == 1
+        assert self.consumers[0].times_topics_called == 2
+
+    def test_missing_topic_causes_refresh_so_new_topics_are_found(self):
+        are_kafka_settings_valid(["broker:9092"], ["topic1"], self.cache)
+        self.consumers[0].existing_topics.add("new_topic")
+
+        assert are_kafka_settings_valid(["broker:9092"], ["new_topic"], self.cache)
+
+    def test_topic_that_does_not_exist_is_invalid(self):
+        assert not are_kafka_settings_valid(
+            ["broker:9092"], ["topic1", "missing"], self.cache
+        )
+
+    def test_on_error_connection_is_closed_and_recreated(self):
+        are_kafka_settings_valid(["broker:9092"], ["topic1"], self.cache)
+        self.consumers[0].fail = True
+
+        assert self.cache.get_topics(["broker:9092"], refresh=True) is None
+        assert self.consumers[0].closed
+        assert are_kafka_settings_valid(["broker:9092"], ["topic1"], self.cache)
+        assert len(self.consumers) == 2
+
+    def test_if_brokers_not_available_then_invalid(self):
+        def fail_to_connect(brokers):
+            raise KafkaError("no brokers available")
+
+        cache = TopicMetadataCache(consumer_factory=fail_to_connect)
+
+        assert not are_kafka_settings_valid(["broker:9092"], ["topic1"], cache)
+
+    def test_close_closes_connections(self):
+        are_kafka_settings_valid(["b1:9092"], ["topic1"], self.cache)
+        are_kafka_settings_valid(["b2:9092"], ["topic1"], self.cache)
+
+        self.cache.close()
+
+        assert all(consumer.closed for consumer in self.consumers)
@@ -0,0 +1,101 @@
+import pytest
+
+from just_bin_it.endpoints.serialisation import EventData
+from just_bin_it.endpoints.sources import EventSource
+from just_bin_it.exceptions import JustBinItException
+from just_bin_it.histograms.histogram_process import create_load_shedder
+from just_bin_it.histograms.load_shedding import LoadShedder
+from tests.doubles.consumer import StubConsumer
+
+
+def generate_event_buffer(num_messages, events_per_message=10):
+    event_buffer = []
+    for i in range(num_messages):
+        data = list(range(events_per_message))
+        event_buffer.append((i, i, EventData("source", i, i, data, data, None)))
+    return event_buffer
+
+
+class TestLoadShedder:
+    def test_unknown_policy_raises(self):
+        with pytest.raises(JustBinItException):
+            LoadShedder("not a policy")
+
+    def test_invalid_fraction_raises(self):
+        with pytest.raises(JustBinItException):
+            LoadShedder("sample", fraction=0)
+
+    def test_if_policy_is_none_then_nothing_dropped(self):
+        shedder = LoadShedder("none", max_lag=0)
+        event_buffer = generate_event_buffer(5)
+
+        assert shedder.shed(event_buffer, 1000, None) == event_buffer
+        assert shedder.dropped_events == 0
+
+    def test_if_not_behind_then_nothing_dropped(self):
+        shedder = LoadShedder("sample", max_lag=100, fraction=0.5)
+        event_buffer = generate_event_buffer(5)
+
+        assert shedder.shed(event_buffer, 100, None) == event_buffer
+        assert shedder.dropped_events == 0
+
+    def test_if_behind_then_sampling_keeps_fraction_of_events(self):
+        shedder = LoadShedder("sample", max_lag=100, fraction=0.5)
+
+        result = shedder.shed(generate_event_buffer(5), 101, None)
+
+        assert len(result) == 5
+        _, _, msg = result[0]
+        assert msg.time_of_flight.tolist() == [0, 2, 4, 6, 8]
+        assert msg.detector_id.tolist() == [0, 2, 4, 6, 8]
+        assert shedder.dropped_events == 25
+
+    def test_if_behind_then_skipping_moves_to_latest_and_estimates_dropped(self):
+        consumer = StubConsumer(["broker"], ["topic"])
+        consumer.add_messages(generate_event_buffer(50))
+        event_source = EventSource(consumer, None, deserialise_function=lambda x: x)
+        shedder = LoadShedder("skip", max_lag=10)
+
+        # Only read the first 20 messages then be 30 behind.
+        consumer.seek_by_offsets([20])
+        event_buffer = generate_event_buffer(20)
+        result = shedder.shed(event_buffer, 30, event_source)
+
+        assert result == event_buffer
+        assert consumer.get_positions() == [50]
+        assert shedder.dropped_messages == 30
+        assert shedder.dropped_events == 300
+
+    def test_reset_counts_zeroes_dropped(self):
+        shedder = LoadShedder("sample", max_lag=0, fraction=0.5)
+        shedder.shed(generate_event_buffer(5), 1, None)
+
+        shedder.reset_counts()
+
+        assert shedder.dropped_events == 0
+        assert shedder.dropped_messages == 0
+
+
+class TestCreateLoadShedder:
+    def test_no_overload_config_gives_no_shedder(self):
+        assert create_load_shedder({}, None, None) is None
+
+    def test_none_policy_gives_no_shedder(self):
+        config = {"overload": {"policy": "none"}}
+
+        assert create_load_shedder(config, None, None) is None
+
+    def test_not_live_histogram_gives_no_shedder(self):
+        config = {"overload": {"policy": "skip"}}
+
+        assert create_load_shedder(config, 1000, None) is None
+        assert create_load_shedder(config, None, 1000) is None
+
+    def test_live_histogram_with_policy_gives_shedder(self):
+        config = {"overload": {"policy": "sample", "max_lag": 50, "fraction": 0.25}}
+
+        shedder = create_load_shedder(config, None, None)
+
+        assert shedder.policy == "sample"
+        assert shedder.max_lag == 50
+        assert shedder.step == 4
@@ -0,0 +1,188 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from just_bin_it.endpoints.serialisation import deserialise_ev42, serialise_ev42
+from just_bin_it.exceptions import JustBinItException
+from just_bin_it.histograms.nd_histogram import AXIS_QUANTITIES, Axis, NdHistogram
+
+
+class TestAxis:
+    def test_edges_cover_range(self):
+        axis = Axis(AXIS_QUANTITIES["TOF"], 5, (0, 10))
+
+        assert axis.edges.tolist() == [0, 2, 4, 6, 8, 10]
+
+    def test_upper_edge_is_in_last_bin(self):
+        axis = Axis(AXIS_QUANTITIES["TOF"], 5, (0, 10))
+
+        indices, valid = axis.get_indices(0, np.array([0, 1.9, 2, 10, 10.1, -1]), None)
+
+        assert indices[valid].tolist() == [0, 0, 1, 4]
+        assert valid.tolist() == [True, True, True, True, False, False]
+
+    def test_upper_edge_can_be_excluded(self):
+        axis = Axis(AXIS_QUANTITIES["TOF"], 5, (0, 10), include_upper_edge=False)
+
+        indices, valid = axis.get_indices(0, np.array([9.9, 10]), None)
+
+        assert valid.tolist() == [True, False]
+        assert indices[valid].tolist() == [4]
+
+    def test_values_next_to_edges_are_binned_the_same_as_numpy(self):
+        # Without correcting for rounding, some values on the edges end up in
+        # the bin below for this range.
+        axis = Axis(AXIS_QUANTITIES["TOF"], 874, (280, 35851966))
+        rng = np.random.default_rng(0)
+        values = np.concatenate(
+            [
+                axis.edges,
+                np.nextafter(axis.edges, -np.inf),
+                rng.uniform(0, 36_000_000, 10_000),
+            ]
+        )
+
+        indices, valid = axis.get_indices(0, values, None)
+
+        expected, _ = np.histogram(values, 874, (280, 35851966))
+        assert np.array_equal(np.bincount(indices[valid], minlength=874), expected)
+
+    def test_nan_values_are_out_of_range_without_warnings(self):
+        axis = Axis(AXIS_QUANTITIES["TOF"], 5, (0, 10))
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            indices, valid = axis.get_indices(0, np.array([np.nan, 5, 1e300]), None)
+
+        assert valid.tolist() == [False, True, False]
+        assert indices[valid].tolist() == [2]
+
+    def test_pulse_phase_works_with_real_event_data(self):
+        pulse_time = 1_600_000_000_123_456_789
+        buf = serialise_ev42("source", 1, pulse_time, [10, 60, 130], [1, 2, 3])
+        data = deserialise_ev42(buf)
+        assert data.time_of_flight.dtype == np.uint32
+        axis = Axis(AXIS_QUANTITIES["PULSE_PHASE"], 4, period=100)
+
+        values = axis.get_values(data.pulse_time, data.time_of_flight, None)
+
+        assert values.tolist() == [(pulse_time + tof) % 100 for tof in [10, 60, 130]]
+
+    def test_pixel_axes_use_detector_layout(self):
+        x_axis = Axis(AXIS_QUANTITIES["PIXEL_X"], width=3)
+        y_axis = Axis(AXIS_QUANTITIES["PIXEL_Y"], width=3, height=2)
+        det_ids = np.array([1, 3, 4, 6])
+
+        assert x_axis.get_indices(0, None, det_ids)[0].tolist() == [0, 2, 0, 2]
+        assert y_axis.get_indices(0, None, det_ids)[0].tolist() == [0, 0, 1, 1]
+
+    def test_pixel_axes_ignore_detector_zero(self):
+        axis = Axis(AXIS_QUANTITIES["PIXEL_X"], width=3)
+
+        _, valid = axis.get_indices(0, None, np.array([0, 1]))
+
+        assert valid.tolist() == [False, True]
+
+    def test_pulse_phase_folds_arrival_time(self):
+        axis = Axis(AXIS_QUANTITIES["PULSE_PHASE"], 4, period=100)
+
+        indices, _ = axis.get_indices(1000, np.array([10, 60, 130]), None)
+
+        assert indices.tolist() == [0, 2, 1]
+
+    def test_unknown_quantity_raises(self):
+        with pytest.raises(JustBinItException):
+            Axis("energy", 5, (0, 10))
+
+    def test_invalid_range_raises(self):
+        with pytest.raises(JustBinItException):
+            Axis(AXIS_QUANTITIES["TOF"], 5, (10, 0))
+
+    def test_invalid_num_bins_raises(self):
+        with pytest.raises(JustBinItException):
+            Axis(AXIS_QUANTITIES["TOF"], 0, (0, 10))
+
+    def test_pulse_phase_without_period_raises(self):
+        with pytest.raises(JustBinItException):
+            Axis(AXIS_QUANTITIES["PULSE_PHASE"], 5)
+
+
+class TestNdHistogram:
+    @pytest.fixture(autouse=True)
+    def prepare(self):
+        self.axes = [
+            Axis(AXIS_QUANTITIES["TOF"], 5, (0, 10)),
+            Axis(AXIS_QUANTITIES["DET_ID"], 2, (1, 5)),
+            Axis(AXIS_QUANTITIES["PULSE_PHASE"], 2, period=100),
+        ]
+        self.hist = NdHistogram("topic", self.axes)
+
+    def test_on_construction_histogram_is_empty(self):
+        assert self.hist.shape == (5, 2, 2)
+        assert len(self.hist.edges) == 3
+        assert self.hist.y_edges.tolist() == [1, 3, 5]
+        assert self.hist.data.sum() == 0
+
+    def test_data_is_binned_along_all_axes(self):
+        self.hist.add_data(0, np.array([1, 3, 9, 60]), np.array([1, 4, 5, 1]))
+
+        assert self.hist.data[0, 0, 0] == 1
+        assert self.hist.data[1, 1, 0] == 1
+        assert self.hist.data[4, 1, 0] == 1
+        # Out of TOF range
+        assert self.hist.data.sum() == 3
+
+    def test_same_result_as_numpy(self):
+        rng = np.random.default_rng(1)
+        tofs = rng.uniform(-1, 11, 1000)
+        det_ids = rng.integers(0, 7, 1000)
+        hist = NdHistogram("topic", self.axes[:2])
+
+        hist.add_data(0, tofs, det_ids)
+
+        expected, _, _ = np.histogram2d(
+            tofs, det_ids, bins=(5, 2), range=((0, 10), (1, 5))
+        )
+        assert np.array_equal(hist.data, expected)
+
+    def test_det_range_filters_events(self):
+        hist = NdHistogram("topic", self.axes[:1], det_range=(2, 3))
+
+        hist.add_data(0, np.array([1, 1, 1, 1]), np.array([1, 2, 3, 4]))
+
+        assert hist.data.tolist() == [2, 0, 0, 0, 0]
+
+    def test_few_events_in_many_bins_are_added(self):
+        hist = NdHistogram(
+            "topic",
+            [
+                Axis(AXIS_QUANTITIES["PIXEL_X"], width=100),
+                Axis(AXIS_QUANTITIES["PIXEL_Y"], width=100, height=100),
+            ],
+        )
+
+        hist.add_data(0, [], np.array([1, 1, 102]))
+
+        assert hist.data[0, 0] == 2
+        assert hist.data[1, 1] == 1
+        assert hist.data.sum() == 3
+
+    def test_only_data_with_specified_source_is_added(self):
+        hist = NdHistogram("topic", self.axes[:1], source="source1")
+
+        hist.add_data(0, np.array([1]), source="source1")
+        hist.add_data(0, np.array([1]), source="OTHER")
+
+        assert hist.data.sum() == 1
+
+    def test_clearing_histogram_data_clears_histogram(self):
+        self.hist.add_data(0, np.array([1]), np.array([1]))
+
+        self.hist.clear_data()
+
+        assert self.hist.data.sum() == 0
+
+    def test_without_axes_raises(self):
+        with pytest.raises(JustBinItException):
+            NdHistogram("topic", [])
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from just_bin_it.utilities.periodic_thread import PeriodicThread
+
+
+def wait_until(condition, timeout=5):
+    give_up = time.monotonic() + timeout
+    while time.monotonic() < give_up:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+class TestPeriodicThread:
+    @pytest.fixture(autouse=True)
+    def prepare(self):
+        self.calls = 0
+        self.threads = []
+        yield
+        for thread in self.threads:
+            thread.stop(timeout=5)
+
+    def _count(self):
+        self.calls += 1
+
+    def _create(self, function, interval):
+        thread = PeriodicThread("test", function, interval)
+        self.threads.append(thread)
+        return thread
+
+    def test_function_is_called_repeatedly(self):
+        thread = self._create(self._count, 0.001)
+        thread.start()
+
+        assert wait_until(lambda: self.calls >= 5)
+
+    def test_calls_are_spaced_by_interval(self):
+        thread = self._create(self._count, 10)
+        thread.start()
+        time.sleep(0.1)
+
+        assert self.calls == 1
+
+    def test_no_more_calls_after_stopping(self):
+        thread = self._create(self._count, 0.001)
+        thread.start()
+        wait_until(lambda: self.calls > 0)
+
+        thread.stop()
+        calls = self.calls
+        time.sleep(0.05)
+
+        assert not thread.is_alive()
+        assert self.calls == calls
+
+    def test_exception_does_not_stop_thread(self):
+        def fail():
+            self.calls += 1
+            raise Exception("failed")
+
+        thread = self._create(fail, 0.001)
+        thread.start()
+
+        assert wait_until(lambda: self.calls >= 2)
+        assert thread.is_alive()
+
+    def test_durations_are_recorded(self):
+        thread = self._create(lambda: time.sleep(0.02), 0.001)
+        thread.start()
+        wait_until(lambda: thread.get_stats())
+
+        # Wait for at least one whole call.
+        time.sleep(0.05)
+        stats = thread.get_stats()
+
+        assert stats["duration-ms"] >= 20
+        assert stats["max-duration-ms"] >= 20
+
+    def test_no_stats_before_first_call(self):
+        thread = self._create(self._count, 0.001)
+
+        assert thread.get_stats() == {}
+
+    def test_slow_function_does_not_delay_another_thread(self):
+        blocker = threading.Event()
+        slow = self._create(lambda: blocker.wait(5), 0.01)
+        fast = self._create(self._count, 0.01)
+
+        slow.start()
+        fast.start()
+
+        assert wait_until(lambda: self.calls >= 5, timeout=1)
+        blocker.set()
+
+    def test_overrunning_calls_are_not_counted_as_late(self):
+        thread = self._create(lambda: time.sleep(0.03), 0.01)
+        thread.start()
+        time.sleep(0.1)
+
+        assert thread.get_stats()["max-lateness-ms"] < 30
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from just_bin_it.endpoints.serialisation import deserialise_hs00, serialise_hs00
+from just_bin_it.histograms.rate_histogram import RateHistogram
+
+NUM_BINS = 5
+BIN_WIDTH = 1000
+# Pulse times are ns since epoch
+PULSE_TIME = 1_000_000
+
+
+class TestRateHistogram:
+    @pytest.fixture(autouse=True)
+    def prepare(self):
+        self.hist = RateHistogram("topic", NUM_BINS, BIN_WIDTH)
+
+    def test_on_construction_histogram_is_empty(self):
+        assert self.hist.shape == (NUM_BINS,)
+        assert self.hist.data.sum() == 0
+        assert len(self.hist.x_edges) == NUM_BINS + 1
+
+    def test_first_pulse_goes_in_last_bin(self):
+        self.hist.add_data(PULSE_TIME, [1, 2, 3], [1, 2, 3])
+
+        assert self.hist.data.tolist() == [0, 0, 0, 0, 3]
+        assert self.hist.x_edges[-2] <= PULSE_TIME < self.hist.x_edges[-1]
+        assert self.hist.last_pulse_time == PULSE_TIME
+
+    def test_pulses_in_same_bin_are_summed(self):
+        self.hist.add_data(PULSE_TIME, [1, 2, 3], [1, 2, 3])
+        self.hist.add_data(PULSE_TIME + BIN_WIDTH // 2, [1, 2], [1, 2])
+
+        assert self.hist.data.tolist() == [0, 0, 0, 0, 5]
+
+    def test_later_pulses_slide_the_bins_along(self):
+        self.hist.add_data(PULSE_TIME, [1], [1])
+        self.hist.add_data(PULSE_TIME + BIN_WIDTH, [1, 2], [1, 2])
+        self.hist.add_data(PULSE_TIME + 3 * BIN_WIDTH, [1, 2, 3], [1, 2, 3])
+
+        assert self.hist.data.tolist() == [0, 1, 2, 0, 3]
+        assert self.hist.x_edges[0] == PULSE_TIME - BIN_WIDTH
+
+    def test_if_gap_longer_than_histogram_then_old_bins_are_dropped(self):
+        self.hist.add_data(PULSE_TIME, [1], [1])
+
+        self.hist.add_data(PULSE_TIME + 10 * BIN_WIDTH, [1, 2], [1, 2])
+
+        assert self.hist.data.tolist() == [0, 0, 0, 0, 2]
+
+    def test_pulses_older_than_first_bin_are_ignored(self):
+        self.hist.add_data(PULSE_TIME, [1], [1])
+
+        self.hist.add_data(PULSE_TIME - 10 * BIN_WIDTH, [1, 2], [1, 2])
+
+        assert self.hist.data.sum() == 1
+
+    def test_only_data_from_specified_source_is_added(self):
+        hist = RateHistogram("topic", NUM_BINS, BIN_WIDTH, source="source1")
+
+        hist.add_data(PULSE_TIME, [1], [1], source="source1")
+        hist.add_data(PULSE_TIME, [1], [1], source="source2")
+
+        assert hist.data.sum() == 1
+
+    def test_clearing_keeps_the_edges(self):
+        self.hist.add_data(PULSE_TIME, [1], [1])
+        edges = self.hist.x_edges.copy()
+
+        self.hist.clear_data()
+
+        assert self.hist.data.sum() == 0
+        assert np.array_equal(self.hist.x_edges, edges)
+
+    def test_can_be_serialised(self):
+        self.hist.add_data(PULSE_TIME, [1, 2], [1, 2])
+
+        result = deserialise_hs00(serialise_hs00(self.hist))
+
+        assert result["data"].tolist() == [0, 0, 0, 0, 2]
+        assert len(result["dim_metadata"]) == 1
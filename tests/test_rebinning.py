@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from just_bin_it.endpoints.serialisation import deserialise_hs00, serialise_hs00
+from just_bin_it.histograms.histogram1d import Histogram1d
+from just_bin_it.histograms.histogram2d import Histogram2d
+from just_bin_it.histograms.rebinning import create_pyramid, rebin, rebin_edges
+
+
+def test_rebinning_1d_sums_blocks():
+    data = np.arange(8)
+
+    assert rebin(data, 2).tolist() == [1, 5, 9, 13]
+    assert rebin(data, 4).tolist() == [6, 22]
+
+
+def test_rebinning_2d_sums_blocks_on_both_axes():
+    data = np.arange(16).reshape(4, 4)
+
+    assert rebin(data, 2).tolist() == [[10, 18], [42, 50]]
+
+
+def test_if_not_a_multiple_of_factor_then_last_block_is_smaller():
+    data = np.arange(5)
+
+    assert rebin(data, 2).tolist() == [1, 5, 4]
+
+
+def test_rebinned_edges_match_blocks():
+    edges = np.arange(6)
+
+    assert rebin_edges(edges, 2).tolist() == [0, 2, 4, 5]
+    assert rebin_edges(np.arange(5), 2).tolist() == [0, 2, 4]
+
+
+def test_total_counts_are_preserved():
+    data = np.random.default_rng(0).integers(0, 100, (30, 7))
+
+    assert rebin(data, 4).sum() == data.sum()
+
+
+class TestPyramid:
+    @pytest.fixture(autouse=True)
+    def prepare(self):
+        self.hist = Histogram2d("topic", 10, (0, 10), (1, 10))
+        self.hist.identifier = "abc"
+        self.hist.add_data(1000, np.arange(10), np.arange(1, 11))
+
+    def test_each_level_has_own_topic_and_resolution(self):
+        pyramid = create_pyramid(self.hist, [(4, "coarse"), (2, "medium")])
+
+        assert [level.topic for level in pyramid] == ["medium", "coarse"]
+        assert pyramid[0].shape == (5, 5)
+        assert pyramid[1].shape == (3, 3)
+        assert pyramid[1].identifier == "abc"
+        assert pyramid[1].last_pulse_time == 1000
+
+    def test_levels_derived_from_previous_level_match_full_resolution(self):
+        pyramid = create_pyramid(self.hist, [(2, "medium"), (4, "coarse")])
+
+        assert np.array_equal(pyramid[1].data, rebin(self.hist.data, 4))
+
+    def test_level_that_is_not_multiple_of_previous_uses_full_resolution(self):
+        pyramid = create_pyramid(self.hist, [(2, "medium"), (3, "other")])
+
+        assert np.array_equal(pyramid[1].data, rebin(self.hist.data, 3))
+
+    def test_rebinned_histogram_can_be_serialised(self):
+        rebinned = create_pyramid(self.hist, [(2, "medium")])[0]
+
+        result = deserialise_hs00(serialise_hs00(rebinned))
+
+        assert result["data"].sum() == self.hist.data.sum()
+        assert result["dim_metadata"][0]["length"] == 5
+        assert len(result["dim_metadata"][1]["bin_boundaries"]) == 6
+
+    def test_1d_rebinned_histogram_has_no_y_edges(self):
+        hist = Histogram1d("topic", 10, (0, 10))
+
+        rebinned = create_pyramid(hist, [(2, "medium")])[0]
+
+        assert not hasattr(rebinned, "y_edges")
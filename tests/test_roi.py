@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from just_bin_it.exceptions import JustBinItException
+from just_bin_it.histograms.det_histogram import DetHistogram
+from just_bin_it.histograms.histogram1d import Histogram1d
+from just_bin_it.histograms.histogram2d import Histogram2d
+from just_bin_it.histograms.rate_histogram import RateHistogram
+from just_bin_it.histograms.roi import apply_roi, compile_roi
+
+TOFS = [1, 2, 3, 4, 5, 6]
+DETS = [1, 2, 3, 4, 5, 6]
+
+
+class TestCompileRoi:
+    def test_included_ids_and_ranges_are_true(self):
+        table = compile_roi({"include": [[2, 3], 5]})
+
+        assert table.tolist() == [False, False, True, True, False, True, False]
+
+    def test_excluded_ids_are_removed_from_included(self):
+        table = compile_roi({"include": [[1, 5]], "exclude": [3]})
+
+        assert np.flatnonzero(table).tolist() == [1, 2, 4, 5]
+
+    def test_if_only_excludes_then_everything_else_is_included(self):
+        table = compile_roi({"exclude": [[2, 3]]})
+
+        assert table.tolist() == [True, True, False, False, True]
+
+    @pytest.mark.parametrize(
+        "roi",
+        [
+            {},
+            {"include": [[3, 1]]},
+            {"include": [-1]},
+            {"include": [[1, 2, 3]]},
+            {"exclude": ["a"]},
+        ],
+    )
+    def test_if_invalid_then_throws(self, roi):
+        with pytest.raises(JustBinItException):
+            compile_roi(roi)
+
+
+class TestApplyRoi:
+    def test_only_events_in_roi_are_kept(self):
+        table = compile_roi({"include": [[2, 3], 5]})
+
+        tofs, dets = apply_roi(table, [10, 20, 30, 40, 50], [1, 2, 3, 5, 6])
+
+        assert tofs.tolist() == [20, 30, 40]
+        assert dets.tolist() == [2, 3, 5]
+
+    def test_ids_beyond_table_use_default(self):
+        include_table = compile_roi({"include": [2]})
+        exclude_table = compile_roi({"exclude": [2]})
+
+        _, included = apply_roi(include_table, [1, 2], [2, 1000])
+        _, excluded = apply_roi(exclude_table, [1, 2], [2, 1000])
+
+        assert included.tolist() == [2]
+        assert excluded.tolist() == [1000]
+
+    def test_if_no_tofs_then_only_detectors_filtered(self):
+        table = compile_roi({"include": [2]})
+
+        tofs, dets = apply_roi(table, [], [1, 2, 3])
+
+        assert len(tofs) == 0
+        assert dets.tolist() == [2]
+
+
+@pytest.mark.parametrize(
+    "histogram",
+    [
+        Histogram1d("topic", 10, (0, 10)),
+        Histogram2d("topic", 10, (0, 10), (1, 10)),
+        DetHistogram("topic", (0, 10), (1, 9), 3, 3),
+        RateHistogram("topic", 10, 10 ** 9),
+    ],
+)
+def test_roi_applies_to_all_histogram_types(histogram):
+    histogram.roi = compile_roi({"include": [[2, 3]], "exclude": [3]})
+
+    histogram.add_data(1000, TOFS, DETS)
+
+    assert histogram.data.sum() == 1
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from just_bin_it.endpoints.histogram_sink import HistogramSink
+from just_bin_it.endpoints.serialisation import (
+    EventData,
+    deserialise_hs00,
+    serialise_hs00,
+)
+from just_bin_it.exceptions import JustBinItException
+from just_bin_it.histograms.histogram1d import Histogram1d
+from just_bin_it.histograms.histogram2d import Histogram2d
+from just_bin_it.histograms.histogrammer import Histogrammer
+from just_bin_it.histograms.rolling_histogram import RollingHistogram
+from tests.doubles.producers import SpyProducer
+
+SLICE_LENGTH = 1000
+NUM_SLICES = 4
+WINDOW_LENGTH = SLICE_LENGTH * NUM_SLICES
+
+
+class TestRollingHistogram:
+    @pytest.fixture(autouse=True)
+    def prepare(self):
+        self.hist = RollingHistogram(
+            Histogram1d("topic", 10, (0, 10)), WINDOW_LENGTH, NUM_SLICES
+        )
+
+    def test_if_window_length_not_positive_then_throws(self):
+        with pytest.raises(JustBinItException):
+            RollingHistogram(Histogram1d("topic", 10, (0, 10)), 0, NUM_SLICES)
+
+    def test_if_number_of_slices_less_than_one_then_throws(self):
+        with pytest.raises(JustBinItException):
+            RollingHistogram(Histogram1d("topic", 10, (0, 10)), WINDOW_LENGTH, 0)
+
+    def test_binning_comes_from_wrapped_histogram(self):
+        assert self.hist.topic == "topic"
+        assert self.hist.shape == (10,)
+        assert np.array_equal(self.hist.x_edges, np.arange(11))
+        assert not hasattr(self.hist, "y_edges")
+
+    def test_data_within_window_is_accumulated(self):
+        for i in range(NUM_SLICES):
+            self.hist.add_data(i * SLICE_LENGTH, [i])
+
+        assert self.hist.data.sum() == NUM_SLICES
+        assert self.hist.last_pulse_time == (NUM_SLICES - 1) * SLICE_LENGTH
+
+    def test_data_older_than_window_expires(self):
+        for i in range(NUM_SLICES + 2):
+            self.hist.add_data(i * SLICE_LENGTH, [i])
+
+        assert self.hist.data.sum() == NUM_SLICES
+        # The first two slices have expired
+        assert self.hist.data[:2].sum() == 0
+        assert self.hist.data[2:6].tolist() == [1, 1, 1, 1]
+
+    def test_if_gap_longer_than_window_then_everything_expires(self):
+        self.hist.add_data(0, [1, 2, 3])
+
+        self.hist.add_data(WINDOW_LENGTH * 10, [4])
+
+        assert self.hist.data.tolist() == [0, 0, 0, 0, 1, 0, 0, 0, 0, 0]
+
+    def test_late_data_is_added_to_current_slice(self):
+        self.hist.add_data(SLICE_LENGTH * 2, [1])
+
+        self.hist.add_data(0, [2])
+
+        assert self.hist.data.sum() == 2
+
+    def test_batched_data_is_windowed_by_each_message_pulse_time(self):
+        event_buffer = []
+        for i in range(NUM_SLICES * 2):
+            msg = EventData("source", i, i * SLICE_LENGTH, [i], [i], None)
+            event_buffer.append((0, i, msg))
+        histogrammer = Histogrammer(HistogramSink(SpyProducer()), [self.hist])
+
+        histogrammer.add_data(event_buffer, batch=True)
+
+        # Only the messages in the last window are kept.
+        assert self.hist.data.tolist() == [0, 0, 0, 0, 1, 1, 1, 1, 0, 0]
+
+    def test_clearing_removes_all_data(self):
+        self.hist.add_data(0, [1])
+        self.hist.add_data(SLICE_LENGTH, [2])
+
+        self.hist.clear_data()
+
+        assert self.hist.data.sum() == 0
+
+    def test_2d_histogram_can_be_serialised(self):
+        hist = RollingHistogram(
+            Histogram2d("topic", 5, (0, 10), (1, 5)), WINDOW_LENGTH, NUM_SLICES
+        )
+        hist.add_data(0, [1, 2], [1, 2])
+
+        result = deserialise_hs00(serialise_hs00(hist))
+
+        assert result["data"].sum() == 2
+        assert len(result["dim_metadata"]) == 2
@@ -0,0 +1,89 @@
+import pytest
+
+from just_bin_it.endpoints.sources import SimulatedEventSource
+from just_bin_it.exceptions import SourceException
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSimulatedEventSource:
+    @pytest.fixture(autouse=True)
+    def prepare(self):
+        self.clock = FakeClock()
+        self.config = {
+            "type": "hist1d",
+            "tof_range": [0, 1000],
+            "det_range": [1, 100],
+            "simulation": {"event_rate": 10_000, "message_rate": 10},
+        }
+        self.source = SimulatedEventSource(self.config, 0, None, clock=self.clock)
+
+    def test_first_call_generates_one_message(self):
+        data = self.source.get_new_data()
+
+        assert len(data) == 1
+        assert len(data[0][2].time_of_flight) == 1000
+        assert len(data[0][2].detector_id) == 1000
+
+    def test_messages_generated_at_configured_rate(self):
+        self.source.get_new_data()
+
+        self.clock.now += 0.5
+        data = self.source.get_new_data()
+
+        assert len(data) == 5
+
+    def test_fractions_of_messages_carried_over(self):
+        self.source.get_new_data()
+
+        self.clock.now += 0.06
+        assert len(self.source.get_new_data()) == 0
+        self.clock.now += 0.06
+        assert len(self.source.get_new_data()) == 1
+
+    def test_at_most_one_second_of_messages_generated(self):
+        self.source.get_new_data()
+
+        self.clock.now += 10
+        assert len(self.source.get_new_data()) == 10
+        self.clock.now += 0.1
+        assert len(self.source.get_new_data()) == 1
+
+    def test_message_times_are_in_ms_and_pulse_times_in_ns(self):
+        self.source.get_new_data()
+
+        self.clock.now += 0.2
+        data = self.source.get_new_data()
+
+        assert [msg_time for msg_time, _, _ in data] == [1000_100, 1000_200]
+        assert data[1][2].pulse_time == 1000_200_000_000
+
+    def test_events_are_numpy_arrays_within_range(self):
+        self.config["simulation"]["tof_distribution"] = "uniform"
+        source = SimulatedEventSource(self.config, 0, None, clock=self.clock)
+
+        tofs = source.get_new_data()[0][2].time_of_flight
+
+        assert tofs.min() >= 0
+        assert tofs.max() < 1000
+
+    def test_dethist_data_within_detector(self):
+        config = {"type": "dethist", "width": 10, "height": 5}
+        source = SimulatedEventSource(config, 0, None, clock=self.clock)
+
+        dets = source.get_new_data()[0][2].detector_id
+
+        assert dets.min() >= 1
+        assert dets.max() <= 50
+
+    def test_invalid_rate_raises(self):
+        self.config["simulation"]["message_rate"] = 0
+
+        with pytest.raises(SourceException):
+            SimulatedEventSource(self.config, 0, None)
@@ -0,0 +1,47 @@
+import time
+
+from just_bin_it.utilities.stage_timer import StageTimer
+
+
+class TestStageTimer:
+    def test_time_spent_in_stage_is_recorded(self):
+        timer = StageTimer()
+
+        started = timer.start()
+        time.sleep(0.01)
+        timer.stop("poll", started)
+        stats = timer.get_stats()
+
+        assert stats["poll-wall-ms"] >= 10
+        assert "poll-cpu-ms" in stats
+        assert stats["interval-ms"] >= stats["poll-wall-ms"]
+
+    def test_times_for_same_stage_accumulate(self):
+        timer = StageTimer()
+
+        for _ in range(2):
+            started = timer.start()
+            time.sleep(0.01)
+            timer.stop("decode", started)
+
+        assert timer.get_stats()["decode-wall-ms"] >= 20
+
+    def test_counts_accumulate(self):
+        timer = StageTimer()
+
+        timer.add_count("events", 10)
+        timer.add_count("events", 5)
+
+        assert timer.get_stats()["events"] == 15
+
+    def test_getting_stats_resets_values_but_keeps_names(self):
+        timer = StageTimer()
+        timer.stop("binning", timer.start())
+        timer.add_count("messages", 3)
+        timer.get_stats()
+
+        stats = timer.get_stats()
+
+        assert stats["binning-wall-ms"] == 0
+        assert stats["binning-cpu-ms"] == 0
+        assert stats["messages"] == 0
@@ -1,9 +1,11 @@
 import copy
+import time
 
 import mock
 import pytest
 
 from just_bin_it.endpoints.statistics_publisher import (
+    BatchedGraphiteSender,
     GraphiteSender,
     StatisticsPublisher,
 )
@@ -161,3 +163,173 @@ class TestStatisticsPublisher:
 
         # Messages sent for both publish
         assert self.sender.send.call_count == 4
+
+    def test_process_stats_are_sent_under_per_process_names(self):
+        histogram_processes = []
+        for i in range(2):
+            mock_process = mock.create_autospec(HistogramProcess)
+            mock_process.get_stats.return_value = None
+            mock_process.get_process_stats.return_value = {
+                "poll-wall-ms": 10 + i,
+                "events": 100 * i,
+            }
+            histogram_processes.append(mock_process)
+
+        self.publisher.publish_histogram_stats(
+            histogram_processes, current_time_ms=1234 * 10 ** 3
+        )
+
+        calls = [
+            mock.call(f"{self.metric}0-poll-wall-ms", 10, timestamp=1234),
+            mock.call(f"{self.metric}0-events", 0, timestamp=1234),
+            mock.call(f"{self.metric}1-poll-wall-ms", 11, timestamp=1234),
+            mock.call(f"{self.metric}1-events", 100, timestamp=1234),
+        ]
+        self.sender.send.assert_has_calls(calls)
+
+    def test_control_stats_are_sent_with_current_time(self):
+        control_stats = {
+            "heartbeat": {"max-duration-ms": 1.5},
+            "commands": {"max-duration-ms": 250},
+        }
+
+        self.publisher.publish_control_stats(control_stats, current_time_ms=2000)
+
+        calls = [
+            mock.call(
+                f"{self.metric}control-heartbeat-max-duration-ms", 1.5, timestamp=2
+            ),
+            mock.call(
+                f"{self.metric}control-commands-max-duration-ms", 250, timestamp=2
+            ),
+        ]
+        self.sender.send.assert_has_calls(calls)
+
+
+class SpyConnection:
+    def __init__(self):
+        self.data = b""
+        self.closed = False
+        self.fail = False
+
+    def sendall(self, data):
+        if self.fail:
+            raise OSError("connection reset")
+        self.data += data
+
+    def close(self):
+        self.closed = True
+
+
+class TestBatchedGraphiteSender:
+    @pytest.fixture(autouse=True)
+    def prepare(self):
+        self.connections = []
+        self.refuse_connection = False
+        self.sender = BatchedGraphiteSender(
+            "graphite",
+            2003,
+            "prefix",
+            interval=0,
+            max_buffer=5,
+            connection_factory=self._connect,
+        )
+
+    def _connect(self, address, timeout=None):
+        if self.refuse_connection:
+            raise ConnectionRefusedError()
+        self.connections.append(SpyConnection())
+        return self.connections[-1]
+
+    def _sent_lines(self):
+        data = b"".join(connection.data for connection in self.connections)
+        return data.decode().splitlines()
+
+    def test_nothing_sent_until_flushed(self):
+        self.sender.send("metric", 1, timestamp=10)
+
+        assert not self.connections
+
+    def test_all_metrics_sent_in_one_write_in_plaintext_format(self):
+        self.sender.send("metric-sum", 1000, timestamp=10)
+        self.sender.send("metric-diff", 200, timestamp=10.4)
+
+        self.sender.flush()
+
+        assert len(self.connections) == 1
+        assert self._sent_lines() == [
+            "prefix.metric-sum 1000 10",
+            "prefix.metric-diff 200 10",
+        ]
+
+    def test_connection_is_reused(self):
+        for i in range(3):
+            self.sender.send("metric", i, timestamp=10)
+            self.sender.flush()
+
+        assert len(self.connections) == 1
+        assert len(self._sent_lines()) == 3
+
+    def test_on_failure_metrics_are_kept_and_sent_after_reconnecting(self):
+        self.sender.send("metric", 1, timestamp=10)
+        self.sender.flush()
+        self.connections[0].fail = True
+        self.sender.send("metric", 2, timestamp=11)
+
+        self.sender.flush()
+        self.sender.flush()
+
+        assert self.connections[0].closed
+        assert len(self.connections) == 2
+        assert self.connections[1].data.decode() == "prefix.metric 2 11\n"
+
+    def test_if_cannot_connect_then_oldest_metrics_dropped_when_buffer_full(self):
+        self.refuse_connection = True
+        for i in range(4):
+            self.sender.send("metric", i, timestamp=10)
+        self.sender.flush()
+        for i in range(4, 7):
+            self.sender.send("metric", i, timestamp=10)
+
+        self.refuse_connection = False
+        self.sender.flush()
+
+        assert self.sender.dropped == 2
+        assert [line.split()[1] for line in self._sent_lines()] == [
+            "2",
+            "3",
+            "4",
+            "5",
+            "6",
+        ]
+
+    def test_metrics_sent_in_background(self):
+        sender = BatchedGraphiteSender(
+            "graphite", 2003, "prefix", interval=0.01, connection_factory=self._connect
+        )
+        try:
+            sender.send("metric", 1, timestamp=10)
+            give_up = time.monotonic() + 5
+            while not self.connections and time.monotonic() < give_up:
+                time.sleep(0.01)
+        finally:
+            sender.close()
+
+        assert self._sent_lines() == ["prefix.metric 1 10"]
+
+    def test_close_sends_remaining_metrics_and_disconnects(self):
+        self.sender.send("metric", 1, timestamp=10)
+
+        self.sender.close()
+
+        assert self._sent_lines() == ["prefix.metric 1 10"]
+        assert self.connections[0].closed
+
+    def test_close_stops_background_thread(self):
+        sender = BatchedGraphiteSender(
+            "graphite", 2003, "prefix", interval=0.01, connection_factory=self._connect
+        )
+
+        sender.close()
+
+        assert not sender._thread.is_alive()
@@ -0,0 +1,95 @@
+import json
+
+import numpy as np
+import pytest
+
+from just_bin_it.exceptions import JustBinItException
+from just_bin_it.histograms.histogram1d import Histogram1d
+from just_bin_it.histograms.unit_conversion import (
+    UNITS,
+    convert_tofs,
+    create_conversion_factors,
+    load_geometry,
+)
+
+GEOMETRY = {
+    "l1": 10.0,
+    "detector_ids": [1, 2, 4],
+    "l2": [1.0, 2.0, 5.0],
+    "two_theta": [90.0, 60.0, 180.0],
+}
+
+
+class TestUnitConversion:
+    def test_wavelength_factors(self):
+        table = create_conversion_factors(GEOMETRY, UNITS["WAVELENGTH"])
+
+        assert table[1] == pytest.approx(3956.034e-9 / 11)
+        assert table[2] == pytest.approx(3956.034e-9 / 12)
+        assert table[4] == pytest.approx(3956.034e-9 / 15)
+
+    def test_d_spacing_factors(self):
+        table = create_conversion_factors(GEOMETRY, UNITS["D_SPACING"])
+
+        assert table[1] == pytest.approx(3956.034e-9 / 11 / (2 * np.sin(np.pi / 4)))
+        # sin(30 degrees) = 0.5
+        assert table[2] == pytest.approx(3956.034e-9 / 12)
+        assert table[4] == pytest.approx(3956.034e-9 / 15 / 2)
+
+    def test_unknown_detectors_are_nan(self):
+        table = create_conversion_factors(GEOMETRY, UNITS["WAVELENGTH"])
+
+        values = convert_tofs(table, np.array([1e6, 1e6, 1e6]), np.array([0, 3, 100]))
+
+        assert np.isnan(values).all()
+
+    def test_converts_each_event_with_its_detector_factor(self):
+        table = create_conversion_factors(GEOMETRY, UNITS["WAVELENGTH"])
+
+        values = convert_tofs(table, np.array([11e6, 12e6]), np.array([1, 2]))
+
+        assert values == pytest.approx([3.956034, 3.956034])
+
+    def test_d_spacing_without_two_theta_raises(self):
+        geometry = {k: v for k, v in GEOMETRY.items() if k != "two_theta"}
+
+        with pytest.raises(JustBinItException):
+            create_conversion_factors(geometry, UNITS["D_SPACING"])
+
+    def test_mismatched_lengths_raises(self):
+        geometry = dict(GEOMETRY, l2=[1.0])
+
+        with pytest.raises(JustBinItException):
+            create_conversion_factors(geometry, UNITS["WAVELENGTH"])
+
+    def test_unknown_units_raises(self):
+        with pytest.raises(JustBinItException):
+            create_conversion_factors(GEOMETRY, "energy")
+
+    def test_load_geometry(self, tmp_path):
+        filename = tmp_path / "geometry.json"
+        filename.write_text(json.dumps(GEOMETRY))
+
+        assert load_geometry(str(filename)) == GEOMETRY
+
+    def test_load_geometry_with_missing_field_raises(self, tmp_path):
+        filename = tmp_path / "geometry.json"
+        filename.write_text(json.dumps({"l1": 10}))
+
+        with pytest.raises(JustBinItException):
+            load_geometry(str(filename))
+
+    def test_load_missing_geometry_file_raises(self, tmp_path):
+        with pytest.raises(JustBinItException):
+            load_geometry(str(tmp_path / "missing.json"))
+
+    def test_wavelength_histogram(self):
+        table = create_conversion_factors(GEOMETRY, UNITS["WAVELENGTH"])
+        hist = Histogram1d("topic", 4, (0, 4), conversion=table)
+
+        # 1 Å and 3.5 Å, plus an event from an unknown detector.
+        hist.add_data(
+            0, np.array([11e6 / 3.956034, 12e6 * 3.5 / 3.956034, 1e6]), [1, 2, 3]
+        )
+
+        assert hist.data.tolist() == [0, 1, 0, 1]
@@ -0,0 +1,182 @@
+import os
+import queue
+import time
+
+import pytest
+
+from just_bin_it.histograms.worker_pool import AssignmentQueue, WorkerPool
+
+
+def fake_processing(
+    msg_queue,
+    stats_queue,
+    configuration,
+    start,
+    stop,
+    publish_interval,
+    simulation,
+    collect_timings,
+    producers=None,
+    consumers=None,
+):
+    # Remember something between assignments, like a producer.
+    producers.setdefault("count", 0)
+    producers["count"] += 1
+    stats_queue.put(
+        {
+            "histograms": [{"id": configuration["id"], "pid": os.getpid()}],
+            "process": {"assignments": producers["count"]},
+        }
+    )
+    while True:
+        msg = msg_queue.get()
+        if msg == "stop":
+            return
+        if msg == "clear":
+            stats_queue.put({"histograms": [{"cleared": True}], "process": {}})
+        if msg == "crash":
+            raise Exception("crashed")
+        if isinstance(msg, dict) and msg["cmd"] == "reconfigure":
+            stats_queue.put(
+                {"histograms": [{"id": msg["config"]["id"]}], "process": {}}
+            )
+
+
+def wait_for_stats(process, timeout=5):
+    give_up = time.monotonic() + timeout
+    while time.monotonic() < give_up:
+        stats = process.get_stats()
+        if stats is not None:
+            return stats
+        time.sleep(0.01)
+    return None
+
+
+class TestAssignmentQueue:
+    @pytest.fixture(autouse=True)
+    def prepare(self):
+        self.shared = queue.Queue()
+
+    def test_only_messages_for_assignment_are_received(self):
+        AssignmentQueue(self.shared, 1).put("old")
+        AssignmentQueue(self.shared, 2).put("new")
+
+        received = AssignmentQueue(self.shared, 2)
+
+        assert not received.empty()
+        assert received.get() == "new"
+        assert received.empty()
+
+    def test_get_times_out_if_only_old_messages(self):
+        AssignmentQueue(self.shared, 1).put("old")
+
+        with pytest.raises(queue.Empty):
+            AssignmentQueue(self.shared, 2).get(timeout=0.01)
+
+    def test_get_without_blocking(self):
+        received = AssignmentQueue(self.shared, 2)
+
+        with pytest.raises(queue.Empty):
+            received.get(False)
+
+
+class TestWorkerPool:
+    @pytest.fixture(autouse=True)
+    def prepare(self):
+        self.pool = WorkerPool(1, target=fake_processing)
+        yield
+        self.pool.shutdown()
+
+    def test_assignment_runs_on_worker(self):
+        process = self.pool.create_process({"id": "hist1"}, None, None, False)
+
+        stats = wait_for_stats(process)
+        process.stop()
+
+        assert stats[0]["id"] == "hist1"
+        assert process.get_process_stats() == {"assignments": 1}
+
+    def test_worker_is_reused_after_stop(self):
+        first = self.pool.create_process({"id": "hist1"}, None, None, False)
+        first_pid = wait_for_stats(first)[0]["pid"]
+        first.stop()
+
+        second = self.pool.create_process({"id": "hist2"}, None, None, False)
+        stats = wait_for_stats(second)
+        second.stop()
+
+        assert stats[0] == {"id": "hist2", "pid": first_pid}
+        assert second.get_process_stats() == {"assignments": 2}
+
+    def test_worker_busy_until_stopped(self):
+        process = self.pool.create_process({"id": "hist1"}, None, None, False)
+        wait_for_stats(process)
+
+        assert self.pool.num_idle == 0
+        process.stop()
+        assert self.pool.num_idle == 1
+
+    def test_new_worker_started_if_none_idle(self):
+        first = self.pool.create_process({"id": "hist1"}, None, None, False)
+        second = self.pool.create_process({"id": "hist2"}, None, None, False)
+
+        first_pid = wait_for_stats(first)[0]["pid"]
+        second_pid = wait_for_stats(second)[0]["pid"]
+        first.stop()
+        second.stop()
+
+        assert first_pid != second_pid
+        assert self.pool.num_idle == 2
+
+    def test_clear_is_passed_to_assignment(self):
+        process = self.pool.create_process({"id": "hist1"}, None, None, False)
+        wait_for_stats(process)
+
+        process.clear()
+
+        assert wait_for_stats(process) == [{"cleared": True}]
+        process.stop()
+
+    def test_worker_still_usable_after_assignment_fails(self):
+        process = self.pool.create_process({"id": "hist1"}, None, None, False)
+        wait_for_stats(process)
+        process._msg_queue.put("crash")
+        process._worker.idle.wait(5)
+        process.stop()
+
+        second = self.pool.create_process({"id": "hist2"}, None, None, False)
+
+        assert wait_for_stats(second)[0]["id"] == "hist2"
+        second.stop()
+
+    def test_stopping_twice_is_harmless(self):
+        process = self.pool.create_process({"id": "hist1"}, None, None, False)
+        process.stop()
+        process.stop()
+
+        assert self.pool.num_idle == 1
+
+    def test_stop_straight_after_start(self):
+        for i in range(10):
+            process = self.pool.create_process({"id": i}, None, None, False)
+            process.stop()
+
+        process = self.pool.create_process({"id": "last"}, None, None, False)
+        assert wait_for_stats(process)[0]["id"] == "last"
+        process.stop()
+
+    def test_reconfigure_is_sent_to_running_assignment(self):
+        process = self.pool.create_process({"id": "first"}, None, None, False)
+        wait_for_stats(process)
+
+        assert process.reconfigure({"id": "second"})
+        assert wait_for_stats(process)[0]["id"] == "second"
+        assert process.configuration == {"id": "second"}
+        process.stop()
+
+    def test_cannot_reconfigure_after_stopping(self):
+        process = self.pool.create_process({"id": "first"}, None, None, False)
+        process.stop()
+
+        assert not process.reconfigure({"id": "second"})
+        assert not process.is_alive()